@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -54,6 +55,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # รวมการเขียนใน request แล้วเพิ่มตัวนับ DataVersion ครั้งเดียว (ETag ของ timetable/lookup)
+    'scheduler.versions.DataVersionMiddleware',
 ]
 
 ROOT_URLCONF = 'schedule_project.urls'
@@ -151,6 +154,59 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 WKHTMLTOPDF_CMD = "/usr/bin/wkhtmltopdf"
 
+# engine ค่าเริ่มต้น: "ga" (ห้องอยู่ใน gene), "ga_matching" (หาเวลาก่อน แล้วจัดห้องด้วย matching)
+# หรือ "sa" (simulated annealing บนตารางเดียว)
+GA_ENGINE = "ga"
+
+# GA portfolio: จำนวนรอบ (seed ต่างกัน) ที่รันขนานกันต่อการกด generate 1 ครั้ง
+GA_PORTFOLIO_RUNS = 1
+GA_PORTFOLIO_MAX_RUNS = 8
+GA_PORTFOLIO_WORKERS = None   # None = ตามจำนวน CPU
+
+# จำนวนประวัติ GenerationRun (พร้อมผลแบบ blob) ที่เก็บไว้ต่อ user — run ที่ใช้งานอยู่ไม่ถูกลบ
+GA_RUN_HISTORY = 20
+
+# solve cache: ถ้าข้อมูล+params ไม่เปลี่ยน ตอบจากผลเดิมทันที
+# N = เก็บผลต่างกันได้ N ชุด (กดซ้ำจะ solve จนครบ N แล้ววนแสดงชุดที่มี), 0 = ปิด cache
+GA_CACHE_ALTERNATIVES = 1
+
+# คิวงาน solve (scheduler.jobs): user ละ 1 งานที่รันพร้อมกัน, วนคิวแบบ round-robin ข้าม user
+# "inline" = web process รันงานเองใน request (ไม่ต้องมี worker)
+# "queue"  = generate ตอบ 202 แล้วให้ worker รัน: python manage.py solver_workers
+GA_SOLVER_MODE = "inline"
+GA_SOLVER_WORKERS = 2          # จำนวน worker process ของ solver_workers
+GA_SOLVER_POLL = 1.0           # วินาที: รอบเช็คคิว / heartbeat / คำขอยกเลิก
+GA_SOLVER_STALE_SEC = 120      # heartbeat ขาดเกินนี้ = worker ตาย → คืนงานเข้าคิว
+GA_SOLVER_MAX_ATTEMPTS = 2     # คืนเข้าคิวได้กี่ครั้งก่อนถือว่า failed
+GA_BATCH_TIME_BUDGET = 300     # วินาทีต่อ user ของ batch regenerate จาก admin (None = ไม่จำกัด)
+
+# รายการ GeneratedSchedule (/api/schedule/generated/, /api/schedule/view-generated/): แถวต่อหน้า (keyset pagination)
+GENERATED_PAGE_SIZE = 200
+GENERATED_PAGE_MAX = 1000
+
+# log ของ engine (logger "scheduler.solver"): start/generation/restart/finish/saved พร้อม run_id
+# event ราย generation ส่งไม่เกิน 1 ครั้ง/วินาที — ปิดได้ด้วย GA_LOG_LEVEL=WARNING
+# เขียนผ่านคิว (thread แยก) ไม่บล็อก solver; GA_LOG_FORMAT=json = JSON บรรทัดละ event (run_id/event/fields)
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "run": {"format": "%(asctime)s %(levelname)s %(name)s %(message)s"},
+        "json": {"()": "scheduler.runlog.JsonRunFormatter"},
+    },
+    "handlers": {
+        "console": {"()": "scheduler.runlog.QueueLogHandler",
+                    "formatter": "json" if os.environ.get("GA_LOG_FORMAT") == "json" else "run"},
+    },
+    "loggers": {
+        "scheduler.solver": {
+            "handlers": ["console"],
+            "level": os.environ.get("GA_LOG_LEVEL", "INFO"),
+            "propagate": False,
+        },
+    },
+}
+
 # settings.py
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
@@ -1,10 +1,14 @@
-from django.contrib import admin
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.auth.admin import UserAdmin
+from django.contrib.auth.models import User
+
 from .models import (
 
     CourseSchedule, PreSchedule, WeekActivity, ScheduleInfo, Timedata,
 
     Subject, Teacher, GroupType, StudentGroup, TimeSlot, GroupAllow,
-    RoomType, Room
+    RoomType, Room, GenerationRun, GenerationAlternative, ConstraintProfile, SolveJob
 )
 
 @admin.register(CourseSchedule)
@@ -77,3 +81,43 @@ class RoomAdmin(admin.ModelAdmin):
     list_display = ['name', 'room_type']
     list_filter  = ['room_type']
     search_fields = ['name']
+
+@admin.register(GenerationRun)
+class GenerationRunAdmin(admin.ModelAdmin):
+    list_display = ['id', 'created_by', 'engine', 'is_active', 'best_fitness', 'hard_violations', 'unassigned', 'duration_sec', 'created_at']
+    exclude = ['result_blob']
+    list_filter  = ['engine', 'is_active', 'created_by']
+
+@admin.register(GenerationAlternative)
+class GenerationAlternativeAdmin(admin.ModelAdmin):
+    list_display = ['id', 'run', 'rank', 'fitness', 'hard_violations', 'unassigned', 'total_entries']
+    exclude = ['result_blob']
+
+@admin.register(ConstraintProfile)
+class ConstraintProfileAdmin(admin.ModelAdmin):
+    list_display = ['id', 'created_by', 'room_type_enabled', 'lab_order_enabled', 'contiguity_enabled', 'full_coverage_enabled', 'updated_at']
+
+@admin.register(SolveJob)
+class SolveJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'created_by', 'status', 'priority', 'round', 'engine', 'worker', 'attempts', 'created_at', 'started_at', 'finished_at']
+    list_filter  = ['status', 'engine', 'created_by']
+
+
+class SchedulerUserAdmin(UserAdmin):
+    actions = ['regenerate_schedules']
+
+    @admin.action(description="Regenerate schedules (เข้าคิว solve ของ user ที่เลือก)")
+    def regenerate_schedules(self, request, queryset):
+        from .jobs import enqueue_batch   # โหลด solver (pandas/numpy) เฉพาะตอนใช้ action
+        jobs = enqueue_batch(
+            list(queryset.filter(is_active=True)),
+            engine=getattr(settings, "GA_ENGINE", "ga"),
+            time_budget=getattr(settings, "GA_BATCH_TIME_BUDGET", None),
+        )
+        msg = f"เข้าคิว {len(jobs)} งาน (ข้าม user ที่มีงานค้างอยู่)"
+        if getattr(settings, "GA_SOLVER_MODE", "inline") != "queue":
+            msg += " — โหมด inline ไม่มี worker ประจำ: รัน python manage.py solver_workers --once เพื่อทำงานในคิว"
+        self.message_user(request, msg, messages.SUCCESS)
+
+admin.site.unregister(User)
+admin.site.register(User, SchedulerUserAdmin)
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 class SchedulerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'scheduler'
+
+    def ready(self):
+        from .versions import connect_signals
+        connect_signals()
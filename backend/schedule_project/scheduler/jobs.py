@@ -0,0 +1,326 @@
+"""
+คิวงาน solve แบบเก็บใน DB (SolveJob) + worker ที่ดึงงานไปรัน
+
+- ลำดับการดึงงาน: priority มากก่อน → round น้อยก่อน → มาก่อนได้ก่อน
+  (round = จำนวนงานค้างของ user เดียวกันตอนเข้าคิว → วนให้ทุก user ได้คนละงานก่อน = round-robin)
+- แต่ละ user มีงาน running ได้ครั้งละ 1 งาน: ตอน claim ตั้ง user_slot = user id (unique)
+  ถ้ามีงานของ user นั้นรันอยู่แล้ว DB จะปฏิเสธ (IntegrityError) → ข้ามไปงานถัดไป
+- ยกเลิก/heartbeat ผ่าน DB: ระหว่างรัน มี thread คอยอัปเดต heartbeat_at และเช็ค cancel_requested
+  งานที่ heartbeat ขาดเกิน GA_SOLVER_STALE_SEC (worker ตาย) ถูกคืนเข้าคิว
+- GA_SOLVER_MODE = "inline": web process รันงานเองทันที (ไม่ต้องมี worker, user ต่างกันรันพร้อมกันได้)
+  GA_SOLVER_MODE = "queue" : เข้าคิวแล้วตอบ 202; เปิด worker ด้วย manage.py solver_workers
+- batch: เข้าคิวงานของหลาย user ในครั้งเดียว (manage.py regenerate_schedules / action ใน admin)
+- solver (scheduler.main → pandas/numpy) import ตอนรันงานเท่านั้น: view ที่แค่ถามสถานะ/ยกเลิกไม่ต้องโหลด
+"""
+import os
+import socket
+import threading
+from datetime import timedelta
+from time import sleep
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import GenerationRun, SolveJob
+
+# คีย์จากผล run_genetic_algorithm_from_db ที่เก็บใน SolveJob.result (ตาราง/trace ดูได้จาก GenerationRun)
+JOB_RESULT_KEYS = (
+    "status", "message", "cached", "run_id", "log_id", "best_fitness", "total_entries", "unassigned",
+    "hard_violations", "seed", "duration_sec", "timings", "alternatives", "persisted",
+)
+ACTIVE_STATUSES = (SolveJob.QUEUED, SolveJob.RUNNING)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def worker_name(index: int | None = None, pid: int | None = None) -> str:
+    """ชื่อ worker ที่บันทึกใน SolveJob.worker (pid = ของ process อื่น เช่น process แม่ตั้งชื่อให้ลูก)"""
+    name = f"{socket.gethostname()}:{pid or os.getpid()}"
+    return name if index is None else f"{name}/{index}"
+
+
+# ================== enqueue / status ==================
+
+def enqueue_job(user, engine: str = "ga", params: dict | None = None, priority: int = 0) -> SolveJob:
+    """เพิ่มงานเข้าคิว: round = จำนวนงาน queued/running ของ user นี้ที่ค้างอยู่"""
+    pending = SolveJob.objects.filter(created_by=user, status__in=ACTIVE_STATUSES).count()
+    return SolveJob.objects.create(
+        created_by=user, engine=engine, params=params or {}, priority=priority, round=pending,
+    )
+
+
+def enqueue_user_job(user, engine: str = "ga", params: dict | None = None, priority: int = 0) -> tuple:
+    """
+    งานจากหน้าเว็บ (โหมด queue): user ละไม่เกิน 1 งานที่ค้าง — มีงาน queued/running อยู่แล้วคืนงานนั้น
+    (แบบเดียวกับ enqueue_batch ที่ข้าม user ที่มีงานค้าง) คืน (job, created)
+    """
+    from django.contrib.auth.models import User
+
+    with transaction.atomic():
+        # lock แถว user กันกดซ้อนกันสองครั้งแล้วได้สองงาน (DB ที่ไม่มี row lock เช่น sqlite เขียนทีละ transaction อยู่แล้ว)
+        User.objects.select_for_update().filter(pk=user.pk).first()
+        existing = (SolveJob.objects.filter(created_by=user, status__in=ACTIVE_STATUSES)
+                    .order_by("created_at", "id").first())
+        if existing is not None:
+            return existing, False
+        return enqueue_job(user, engine=engine, params=params, priority=priority), True
+
+
+def start_inline_job(user, engine: str = "ga", params: dict | None = None, worker: str = "") -> SolveJob | None:
+    """สร้างงานในสถานะ running ทันที (โหมด inline) — None ถ้า user นี้มีงานรันอยู่แล้ว"""
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            return SolveJob.objects.create(
+                created_by=user, engine=engine, params=params or {}, status=SolveJob.RUNNING,
+                user_slot=user.pk, worker=worker or worker_name(), attempts=1,
+                started_at=now, heartbeat_at=now,
+            )
+    except IntegrityError:
+        return None
+
+
+def _ahead_q(job: SolveJob) -> Q:
+    """เงื่อนไข 'อยู่ก่อน job นี้' ตามลำดับการดึงงาน (-priority, round, created_at, id)"""
+    return (
+        Q(priority__gt=job.priority)
+        | Q(priority=job.priority, round__lt=job.round)
+        | Q(priority=job.priority, round=job.round, created_at__lt=job.created_at)
+        | Q(priority=job.priority, round=job.round, created_at=job.created_at, id__lt=job.id)
+    )
+
+
+def queue_position(job: SolveJob) -> int:
+    """ลำดับในคิว (1 = งานถัดไป); 0 = ไม่ได้อยู่ในคิวแล้ว"""
+    if job.status != SolveJob.QUEUED:
+        return 0
+    return SolveJob.objects.filter(_ahead_q(job), status=SolveJob.QUEUED).count() + 1
+
+
+def job_status(job: SolveJob) -> dict:
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "engine": job.engine,
+        "priority": job.priority,
+        "position": queue_position(job),
+        "cancel_requested": job.cancel_requested,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "run_id": job.run_id,
+        "result": job.result,
+        "error": job.error,
+    }
+
+
+def request_cancel(user, job_id: int | None = None) -> int:
+    """ยกเลิกงานของ user (ทุกงานที่ค้าง หรือเฉพาะ job_id): queued → cancelled ทันที, running → ตั้งธง"""
+    qs = SolveJob.objects.filter(created_by=user, status__in=ACTIVE_STATUSES)
+    if job_id is not None:
+        qs = qs.filter(pk=job_id)
+    now = timezone.now()
+    n = qs.filter(status=SolveJob.QUEUED).update(status=SolveJob.CANCELLED, finished_at=now, cancel_requested=True)
+    return n + qs.filter(status=SolveJob.RUNNING).update(cancel_requested=True)
+
+
+def user_has_running_job(user) -> bool:
+    return SolveJob.objects.filter(created_by=user, status=SolveJob.RUNNING).exists()
+
+
+# ================== batch (หลาย user พร้อมกัน) ==================
+
+def inputs_changed(user) -> bool:
+    """โจทย์ปัจจุบันของ user ต่างจากโจทย์ของ run ที่ใช้งานอยู่ (หรือยังไม่เคยมี run) — ไม่มีวิชาเลย = False"""
+    from .main import compile_problem, fetch_all_from_db, problem_fingerprint
+
+    data = compile_problem(fetch_all_from_db(user))
+    if data["courses"].empty:
+        return False
+    active = (GenerationRun.objects.filter(created_by=user, is_active=True)
+              .values_list("input_fingerprint", flat=True).first())
+    return active != problem_fingerprint(data)
+
+
+def enqueue_batch(users, engine: str = "ga", time_budget: float | None = None, fresh: bool = False,
+                  priority: int = 0) -> list:
+    """เข้าคิวงาน regenerate ของหลาย user (ข้าม user ที่มีงานค้างอยู่แล้ว); time_budget ใช้ต่อ user"""
+    params = {"fresh": fresh}
+    if time_budget:
+        params["time_budget"] = time_budget
+    busy = set(SolveJob.objects.filter(status__in=ACTIVE_STATUSES).values_list("created_by_id", flat=True))
+    return [enqueue_job(user, engine=engine, params=params, priority=priority)
+            for user in users if user.pk not in busy]
+
+
+def cancel_batch(job_ids) -> int:
+    """ยกเลิกงานของ batch: queued → cancelled ทันที, running → ตั้งธง (worker หยุดที่รอบเช็คถัดไป)"""
+    qs = SolveJob.objects.filter(pk__in=job_ids, status__in=ACTIVE_STATUSES)
+    n = qs.filter(status=SolveJob.QUEUED).update(status=SolveJob.CANCELLED, finished_at=timezone.now(),
+                                                 cancel_requested=True)
+    return n + qs.filter(status=SolveJob.RUNNING).update(cancel_requested=True)
+
+
+def batch_pending(job_ids) -> int:
+    return SolveJob.objects.filter(pk__in=job_ids, status__in=ACTIVE_STATUSES).count()
+
+
+def batch_summary(job_ids) -> list:
+    """แถวสรุปของงานใน batch (เรียงตาม username) สำหรับพิมพ์เป็นตาราง"""
+    rows = []
+    for job in SolveJob.objects.filter(pk__in=job_ids).select_related("created_by").order_by("created_by__username"):
+        result = job.result or {}
+        rows.append({
+            "user": job.created_by.username,
+            "job": job.id,
+            "status": job.status,
+            "run": job.run_id,
+            "fitness": result.get("best_fitness"),
+            "unassigned": result.get("unassigned"),
+            "hard": result.get("hard_violations"),
+            "duration_sec": result.get("duration_sec"),
+            "error": job.error,
+        })
+    return rows
+
+
+# ================== worker side ==================
+
+def _release_running(qs, max_attempts: int, error: str) -> int:
+    """
+    งาน running ที่ worker ไม่อยู่แล้ว: ขอยกเลิกไว้ → cancelled, ลองครบ max_attempts แล้ว → failed,
+    นอกนั้นคืนเข้าคิว (ทุกกรณีปล่อย user_slot)
+    """
+    now = timezone.now()
+    n = qs.filter(cancel_requested=True).update(status=SolveJob.CANCELLED, user_slot=None, finished_at=now)
+    n += qs.filter(attempts__gte=max_attempts).update(
+        status=SolveJob.FAILED, user_slot=None, finished_at=now, error=error,
+    )
+    return n + qs.update(status=SolveJob.QUEUED, user_slot=None, worker="")
+
+
+def requeue_stale_jobs(timeout: float | None = None, max_attempts: int | None = None) -> int:
+    """งาน running ที่ heartbeat ขาดเกิน timeout: คืนเข้าคิว (หรือ failed ถ้าลองครบ max_attempts แล้ว)"""
+    timeout = _setting("GA_SOLVER_STALE_SEC", 120) if timeout is None else timeout
+    max_attempts = _setting("GA_SOLVER_MAX_ATTEMPTS", 2) if max_attempts is None else max_attempts
+    stale = SolveJob.objects.filter(
+        status=SolveJob.RUNNING, heartbeat_at__lt=timezone.now() - timedelta(seconds=timeout)
+    )
+    return _release_running(stale, max_attempts, "worker หยุดตอบสนอง")
+
+
+def release_worker_jobs(worker: str, max_attempts: int | None = None) -> int:
+    """งาน running ของ worker ที่รู้แน่ว่าตายแล้ว (process จบไป) — ไม่ต้องรอ heartbeat ขาดครบ timeout"""
+    max_attempts = _setting("GA_SOLVER_MAX_ATTEMPTS", 2) if max_attempts is None else max_attempts
+    running = SolveJob.objects.filter(status=SolveJob.RUNNING, worker=worker)
+    return _release_running(running, max_attempts, "worker process หยุดกลางงาน")
+
+
+def claim_next_job(worker: str, batch: int = 20) -> SolveJob | None:
+    """
+    ดึงงานถัดไปตามลำดับคิว โดยข้าม user ที่มีงานรันอยู่
+    claim ด้วย UPDATE แบบมีเงื่อนไข (status=queued) + user_slot unique จึงปลอดภัยเมื่อมีหลาย worker
+    """
+    busy = SolveJob.objects.filter(status=SolveJob.RUNNING).values("created_by")
+    candidates = (SolveJob.objects.filter(status=SolveJob.QUEUED).exclude(created_by__in=busy)
+                  .order_by("-priority", "round", "created_at", "id")
+                  .values_list("id", "created_by_id")[:batch])
+    seen_users = set()
+    for job_id, user_id in candidates:
+        if user_id in seen_users:
+            continue
+        seen_users.add(user_id)
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                claimed = SolveJob.objects.filter(pk=job_id, status=SolveJob.QUEUED).update(
+                    status=SolveJob.RUNNING, user_slot=user_id, worker=worker,
+                    started_at=now, heartbeat_at=now, attempts=F("attempts") + 1,
+                )
+        except IntegrityError:
+            continue   # worker อื่นเพิ่ง claim งานของ user นี้ไป
+        if claimed:
+            return SolveJob.objects.select_related("created_by").get(pk=job_id)
+    return None
+
+
+def _watch(job_id: int, cancel_event: threading.Event, done: threading.Event, interval: float):
+    """thread คู่กับงานที่รันอยู่: อัปเดต heartbeat และส่งต่อคำขอยกเลิกจาก DB ไปที่ cancel_event"""
+    try:
+        while not done.wait(interval):
+            SolveJob.objects.filter(pk=job_id).update(heartbeat_at=timezone.now())
+            if SolveJob.objects.filter(pk=job_id, cancel_requested=True).exists():
+                cancel_event.set()
+    finally:
+        connections.close_all()   # ปิดเฉพาะ connection ของ thread นี้
+
+
+def run_job(job: SolveJob) -> dict:
+    """
+    รันงานที่ claim แล้ว (status=running) จนจบ แล้วบันทึกผล/ปล่อย user_slot
+    คืนผลเต็มของ run_genetic_algorithm_from_db (รวม best_schedule) ถ้าสำเร็จ
+    """
+    from .main import GenerationCancelled, RunLog, logger, run_genetic_algorithm_from_db
+
+    cancel_event, done = threading.Event(), threading.Event()
+    watcher = threading.Thread(
+        target=_watch, args=(job.id, cancel_event, done, _setting("GA_SOLVER_POLL", 1.0)), daemon=True,
+    )
+    watcher.start()
+    log = RunLog(job=job.id, user=job.created_by_id)
+    log.event("job_start", worker=job.worker, engine=job.engine, priority=job.priority, attempts=job.attempts)
+    params = job.params or {}
+    # ถ้าถูกขัดจังหวะ (เช่น worker ถูกหยุดกลางงาน) คืนงานเข้าคิวให้ worker อื่นรันต่อ
+    result, fields = {}, {"status": SolveJob.QUEUED, "worker": "", "started_at": None}
+    try:
+        result = run_genetic_algorithm_from_db(
+            job.created_by, cancel_event=cancel_event, runs=params.get("runs", 1), workers=params.get("workers"),
+            engine=job.engine, keep_runs=_setting("GA_RUN_HISTORY", 20),
+            cache_alternatives=0 if params.get("fresh") else _setting("GA_CACHE_ALTERNATIVES", 1),
+            time_budget=params.get("time_budget"),
+        )
+        fields = {
+            "status": SolveJob.DONE,
+            "run_id": result.get("run_id"),
+            "result": {k: result[k] for k in JOB_RESULT_KEYS if k in result},
+        }
+        if "seed" in fields["result"]:
+            fields["result"]["seed"] = str(fields["result"]["seed"])
+    except GenerationCancelled:
+        fields = {"status": SolveJob.CANCELLED}
+        result = {"status": "cancelled"}
+    except Exception as e:
+        logger.exception("job %s failed", job.id)
+        fields = {"status": SolveJob.FAILED, "error": str(e)}
+        result = {"status": "error", "message": str(e)}
+    finally:
+        done.set()
+        watcher.join()
+        if fields["status"] != SolveJob.QUEUED:
+            fields["finished_at"] = timezone.now()
+        SolveJob.objects.filter(pk=job.id).update(user_slot=None, **fields)
+        log.event("job_finish", status=fields["status"])
+    return result
+
+
+def worker_loop(name: str | None = None, poll: float | None = None, stop_event=None, max_jobs: int | None = None) -> int:
+    """วนดึงงานจากคิวมารันทีละงาน จนกว่า stop_event ถูก set หรือครบ max_jobs; คืนจำนวนงานที่รัน"""
+    name = name or worker_name()
+    poll = _setting("GA_SOLVER_POLL", 1.0) if poll is None else poll
+    done = 0
+    while not (stop_event and stop_event.is_set()) and (max_jobs is None or done < max_jobs):
+        requeue_stale_jobs()
+        job = claim_next_job(name)
+        if job is None:
+            if stop_event:
+                stop_event.wait(poll)
+            else:
+                sleep(poll)
+            continue
+        run_job(job)
+        done += 1
+    return done
@@ -0,0 +1,117 @@
+import multiprocessing as mp
+from time import perf_counter, sleep
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from tabulate import tabulate
+
+from scheduler.jobs import (
+    batch_pending, batch_summary, cancel_batch, enqueue_batch, inputs_changed, release_worker_jobs, worker_name,
+)
+from scheduler.models import SolveJob
+from scheduler.solver import ENGINES
+
+from .solver_workers import _worker_process
+
+
+class Command(BaseCommand):
+    help = "Regenerate schedules for many users at once through the solve queue and a pool of worker processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("usernames", nargs="*", help="username ที่จะ regenerate")
+        parser.add_argument("--all", action="store_true", help="ทุก user ที่ active")
+        parser.add_argument("--changed", action="store_true",
+                            help="เฉพาะ user ที่ข้อมูลเปลี่ยนจาก run ที่ใช้งานอยู่ (หรือยังไม่เคย generate)")
+        parser.add_argument("--engine", default=getattr(settings, "GA_ENGINE", "ga"), choices=sorted(ENGINES))
+        parser.add_argument("--time-budget", type=float, default=getattr(settings, "GA_BATCH_TIME_BUDGET", None),
+                            help="วินาทีต่อ user: ครบแล้วหยุดและใช้ผลดีที่สุดที่มี (ค่าเริ่มต้น settings.GA_BATCH_TIME_BUDGET)")
+        parser.add_argument("--workers", type=int, default=None,
+                            help="จำนวน worker process (ค่าเริ่มต้น settings.GA_SOLVER_WORKERS)")
+        parser.add_argument("--priority", type=int, default=0, help="priority ของงานในคิว")
+        parser.add_argument("--fresh", action="store_true", help="ไม่ใช้ผลจาก solve cache")
+        parser.add_argument("--no-wait", action="store_true",
+                            help="เข้าคิวแล้วจบ (ให้ solver_workers ที่รันอยู่ทำต่อ)")
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(is_active=True).order_by("username")
+        if options["usernames"]:
+            users = users.filter(username__in=options["usernames"])
+            missing = set(options["usernames"]) - set(users.values_list("username", flat=True))
+            if missing:
+                raise CommandError(f"ไม่พบ user: {', '.join(sorted(missing))}")
+        elif not (options["all"] or options["changed"]):
+            raise CommandError("ระบุ username หรือ --all / --changed")
+        users = list(users)
+        if options["changed"]:
+            users = [u for u in users if inputs_changed(u)]
+        if not users:
+            self.stdout.write("ไม่มี user ที่ต้อง regenerate")
+            return
+
+        jobs = enqueue_batch(users, engine=options["engine"], time_budget=options["time_budget"],
+                             fresh=options["fresh"], priority=options["priority"])
+        job_ids = [j.id for j in jobs]
+        skipped = len(users) - len(jobs)
+        self.stdout.write(f"เข้าคิว {len(jobs)} งาน" + (f" (ข้าม {skipped} user ที่มีงานค้างอยู่)" if skipped else ""))
+        if options["no_wait"] or not jobs:
+            return
+
+        workers = max(1, min(options["workers"] or getattr(settings, "GA_SOLVER_WORKERS", 2), len(jobs)))
+        poll = getattr(settings, "GA_SOLVER_POLL", 1.0)
+        ctx = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else mp.get_context()
+        stop_event = ctx.Event()
+
+        def start(i):
+            connections.close_all()
+            p = ctx.Process(target=_worker_process, args=(i, poll, stop_event), name=f"regenerate-{i}")
+            p.start()
+            return p
+
+        # worker ตายได้กี่ครั้งรวมกันก่อนเลิกเปิดใหม่ (งานที่ทำให้ตายซ้ำ ๆ จะ failed เมื่อลองครบ max_attempts เอง)
+        restarts_left = workers * getattr(settings, "GA_SOLVER_MAX_ATTEMPTS", 2)
+        t0 = perf_counter()
+        procs = [start(i) for i in range(workers)]
+        interrupted = False
+        try:
+            left = len(job_ids)
+            while left:
+                sleep(poll)
+                for i, p in enumerate(procs):
+                    if p is None or p.is_alive():
+                        continue
+                    # process จบไปแล้ว: งานที่ค้างเป็น running ของมันคืนเข้าคิว/failed ทันที ไม่ต้องรอ heartbeat
+                    released = release_worker_jobs(worker_name(i, pid=p.pid))
+                    self.stderr.write(self.style.WARNING(
+                        f"{p.name} หยุด (exit {p.exitcode}), ปล่อยงานที่ค้าง {released} งาน"))
+                    procs[i] = None
+                    if restarts_left > 0:
+                        restarts_left -= 1
+                        procs[i] = start(i)
+                now_left = batch_pending(job_ids)
+                if now_left != left:
+                    left = now_left
+                    self.stdout.write(f"{len(job_ids) - left}/{len(job_ids)} เสร็จ ({perf_counter() - t0:.0f}s)")
+                if left and not any(procs):
+                    self.stderr.write(self.style.ERROR(
+                        f"worker หยุดหมดแล้ว เหลือ {left} งานในคิว (ให้ manage.py solver_workers ทำต่อได้)"))
+                    break
+        except KeyboardInterrupt:
+            interrupted = True
+            n = cancel_batch(job_ids)
+            self.stderr.write(self.style.WARNING(f"ยกเลิก batch: ขอยกเลิก {n} งาน รอ worker หยุด..."))
+        finally:
+            stop_event.set()
+            for i, p in enumerate(procs):
+                if p is not None:
+                    p.join()
+                    release_worker_jobs(worker_name(i, pid=p.pid))
+            if interrupted:
+                cancel_batch(job_ids)   # งานที่ worker คืนเข้าคิวตอนโดน Ctrl+C ไปพร้อมกัน
+
+        rows = batch_summary(job_ids)
+        self.stdout.write(tabulate(rows, headers="keys"))
+        failed = [r for r in rows if r["status"] != SolveJob.DONE]
+        style = self.style.WARNING if failed else self.style.SUCCESS
+        self.stdout.write(style(f"{len(rows) - len(failed)}/{len(rows)} สำเร็จ ใน {perf_counter() - t0:.1f}s"))
@@ -0,0 +1,62 @@
+import multiprocessing as mp
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+def _worker_process(index: int, poll: float, stop_event):
+    # start method แบบ spawn (Windows) ไม่ได้ setup Django มาให้ — import models หลัง setup เท่านั้น
+    import django
+    django.setup()
+    from scheduler.jobs import worker_loop, worker_name
+
+    connections.close_all()   # ไม่ใช้ connection ที่ได้มาจาก process แม่ (fork)
+    try:
+        worker_loop(worker_name(index), poll=poll, stop_event=stop_event)
+    except KeyboardInterrupt:
+        pass
+
+
+class Command(BaseCommand):
+    help = "Run solver worker processes that pull SolveJob entries from the fair multi-tenant queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=None,
+                            help="จำนวน worker process (ค่าเริ่มต้น settings.GA_SOLVER_WORKERS)")
+        parser.add_argument("--poll", type=float, default=None,
+                            help="วินาทีระหว่างการเช็คคิวเมื่อไม่มีงาน (ค่าเริ่มต้น settings.GA_SOLVER_POLL)")
+        parser.add_argument("--once", action="store_true",
+                            help="รันใน process นี้จนคิวว่างแล้วจบ (ไม่เปิด worker process)")
+
+    def handle(self, *args, **options):
+        from django.conf import settings
+        from scheduler.jobs import claim_next_job, requeue_stale_jobs, run_job, worker_name
+
+        workers = options["workers"] or getattr(settings, "GA_SOLVER_WORKERS", 2)
+        poll = options["poll"] if options["poll"] is not None else getattr(settings, "GA_SOLVER_POLL", 1.0)
+
+        if options["once"]:
+            name, done = worker_name(), 0
+            requeue_stale_jobs()
+            while (job := claim_next_job(name)) is not None:
+                result = run_job(job)
+                done += 1
+                self.stdout.write(f"job {job.id} ({job.created_by}): {result.get('status')}")
+            self.stdout.write(self.style.SUCCESS(f"queue empty, {done} job(s) run"))
+            return
+
+        ctx = mp.get_context("fork") if "fork" in mp.get_all_start_methods() else mp.get_context()
+        stop_event = ctx.Event()
+        connections.close_all()
+        procs = [ctx.Process(target=_worker_process, args=(i, poll, stop_event), name=f"solver-{i}")
+                 for i in range(workers)]
+        for p in procs:
+            p.start()
+        self.stdout.write(self.style.SUCCESS(f"{workers} solver worker(s) started (poll {poll}s), Ctrl+C to stop"))
+        try:
+            for p in procs:
+                p.join()
+        except KeyboardInterrupt:
+            stop_event.set()
+            for p in procs:
+                p.join()
@@ -0,0 +1,63 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from tabulate import tabulate
+
+# module หนักที่ไม่ควรถูกโหลดตอน process เริ่ม (โหลดเฉพาะ endpoint/คำสั่งที่ใช้)
+HEAVY_MODULES = ("pandas", "numpy", "tabulate", "pdfkit", "scheduler.solver", "scheduler.main")
+
+# รันใน interpreter ใหม่ทุกครั้ง (cold start จริง): django.setup() + import module ที่กำหนด
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import django
+django.setup()
+t1 = time.perf_counter()
+for name in sys.argv[2:]:
+    __import__(name)
+t2 = time.perf_counter()
+print(json.dumps({"setup": t1 - t0, "import": t2 - t1,
+                  "heavy": [m for m in json.loads(sys.argv[1]) if m in sys.modules]}))
+"""
+
+
+def probe(modules, repeat: int = 5) -> dict:
+    """เวลา import (ms, median ของ repeat รอบ) ของ modules ใน process ใหม่ + module หนักที่ถูกโหลดติดมา"""
+    samples = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", _PROBE, json.dumps(HEAVY_MODULES), *modules],
+            capture_output=True, text=True, check=True, env=os.environ.copy(), cwd=settings.BASE_DIR,
+        )
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {
+        "setup_ms": round(statistics.median(s["setup"] for s in samples) * 1000, 1),
+        "import_ms": round(statistics.median(s["import"] for s in samples) * 1000, 1),
+        "heavy": samples[-1]["heavy"],
+    }
+
+
+class Command(BaseCommand):
+    help = "Measure cold-start import time of the web entry points versus the solver stack"
+
+    def add_arguments(self, parser):
+        parser.add_argument("modules", nargs="*", default=["scheduler.urls", "scheduler.admin"],
+                            help="module ที่ process ต้อง import ตอนเริ่ม (ค่าเริ่มต้น URLconf + admin)")
+        parser.add_argument("--repeat", type=int, default=5, help="จำนวนรอบต่อแถว (ใช้ median)")
+
+    def handle(self, *args, **options):
+        rows = []
+        for label, modules in (
+            ("startup", options["modules"]),
+            ("solver (ตอนเรียก generate)", ["scheduler.main"]),
+            ("startup + solver", [*options["modules"], "scheduler.main"]),
+        ):
+            r = probe(modules, options["repeat"])
+            rows.append({"case": label, "modules": " ".join(modules), "django.setup ms": r["setup_ms"],
+                         "import ms": r["import_ms"], "heavy loaded": ", ".join(r["heavy"]) or "-"})
+        self.stdout.write(tabulate(rows, headers="keys"))
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0002_room_is_active'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenerationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('engine', models.CharField(default='ga', max_length=20)),
+                ('best_fitness', models.FloatField(blank=True, null=True)),
+                ('hard_violations', models.IntegerField(default=0)),
+                ('unassigned', models.IntegerField(default=0)),
+                ('total_entries', models.IntegerField(default=0)),
+                ('duration_sec', models.FloatField(default=0)),
+                ('trace', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='generation_runs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0003_generationrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationrun',
+            name='input_fingerprint',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='generationrun',
+            name='is_active',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='generationrun',
+            name='params',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='generationrun',
+            name='result_blob',
+            field=models.BinaryField(blank=True, default=b''),
+        ),
+        migrations.AddField(
+            model_name='generationrun',
+            name='seed',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='generationrun',
+            name='timings',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
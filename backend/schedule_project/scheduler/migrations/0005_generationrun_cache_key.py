@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0004_generationrun_versioning'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationrun',
+            name='cache_key',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0005_generationrun_cache_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConstraintProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('unassigned_penalty', models.IntegerField(default=50)),
+                ('invalid_time_penalty', models.IntegerField(default=100)),
+                ('teacher_conflict_penalty', models.IntegerField(default=120)),
+                ('student_conflict_penalty', models.IntegerField(default=120)),
+                ('room_conflict_penalty', models.IntegerField(default=120)),
+                ('group_allow_penalty', models.IntegerField(default=120)),
+                ('room_type_penalty', models.IntegerField(default=110)),
+                ('placed_reward', models.IntegerField(default=90)),
+                ('lab_before_theory_penalty', models.IntegerField(default=90)),
+                ('lab_without_theory_penalty', models.IntegerField(default=0)),
+                ('contig_adjacent_bonus', models.IntegerField(default=50)),
+                ('contig_gap_penalty', models.IntegerField(default=30)),
+                ('contig_segment_penalty', models.IntegerField(default=20)),
+                ('contig_same_room', models.BooleanField(default=False)),
+                ('missing_unit_penalty', models.IntegerField(default=400)),
+                ('teacher_conflict_enabled', models.BooleanField(default=True)),
+                ('student_conflict_enabled', models.BooleanField(default=True)),
+                ('room_conflict_enabled', models.BooleanField(default=True)),
+                ('group_allow_enabled', models.BooleanField(default=True)),
+                ('room_type_enabled', models.BooleanField(default=True)),
+                ('lab_order_enabled', models.BooleanField(default=True)),
+                ('contiguity_enabled', models.BooleanField(default=True)),
+                ('full_coverage_enabled', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='constraint_profile', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0006_constraintprofile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationrun',
+            name='violations',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0007_generationrun_violations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationrun',
+            name='diversity',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
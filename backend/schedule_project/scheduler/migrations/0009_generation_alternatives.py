@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0008_generationrun_diversity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generationrun',
+            name='active_alternative',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='generationrun',
+            name='genome_fingerprint',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+        migrations.CreateModel(
+            name='GenerationAlternative',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveIntegerField()),
+                ('fitness', models.FloatField(blank=True, null=True)),
+                ('hard_violations', models.IntegerField(default=0)),
+                ('unassigned', models.IntegerField(default=0)),
+                ('total_entries', models.IntegerField(default=0)),
+                ('genome_fingerprint', models.CharField(blank=True, default='', max_length=40)),
+                ('result_blob', models.BinaryField(blank=True, default=b'')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='alternatives', to='scheduler.generationrun')),
+            ],
+            options={
+                'ordering': ['run', 'rank'],
+                'unique_together': {('run', 'rank')},
+            },
+        ),
+    ]
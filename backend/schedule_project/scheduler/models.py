@@ -255,3 +255,170 @@ class GeneratedSchedule(models.Model):
 
     def __str__(self):
         return f"[GA] {self.subject_code} {self.day_of_week} {self.start_time}-{self.stop_time}"
+
+class GenerationRun(models.Model):
+    """
+    ประวัติการรัน GA หนึ่งครั้ง (ผลสรุป + anytime trace + ผลลัพธ์แบบ packed)
+    run ที่ is_active=True คือชุดที่ถูก materialize ลง GeneratedSchedule อยู่ตอนนี้
+    """
+    engine = models.CharField(max_length=20, default="ga")
+    params = models.JSONField(default=dict, blank=True)
+    seed = models.CharField(max_length=20, blank=True, default="")   # 64-bit unsigned เก็บเป็นข้อความ
+    input_fingerprint = models.CharField(max_length=64, blank=True, default="", db_index=True)
+    # sha256(input_fingerprint + engine + params) — คีย์ของ solve cache
+    cache_key = models.CharField(max_length=64, blank=True, default="", db_index=True)
+    best_fitness = models.FloatField(null=True, blank=True)
+    hard_violations = models.IntegerField(default=0)
+    unassigned = models.IntegerField(default=0)
+    total_entries = models.IntegerField(default=0)
+    duration_sec = models.FloatField(default=0)
+    # [[elapsed_sec, generation, best_fitness, hard_violations, unassigned], ...] ทุกครั้งที่ผลดีขึ้น
+    trace = models.JSONField(default=list, blank=True)
+    # [[generation, unique_genomes, mean_hamming, injected], ...] ทุก generation
+    diversity = models.JSONField(default=list, blank=True)
+    # ผลแยกตามข้อบังคับของตารางที่ได้: {"terms": {ชื่อเทอม: {count, penalty, units}}, "reward", "contiguity"}
+    violations = models.JSONField(default=dict, blank=True)
+    # {"fetch": ..., "compile": ..., "solve": ..., "persist": ...} (วินาที)
+    timings = models.JSONField(default=dict, blank=True)
+    # ตารางที่วางแล้วแบบบีบอัด (ดู main.pack_schedule / unpack_schedule)
+    result_blob = models.BinaryField(blank=True, default=b"")
+    genome_fingerprint = models.CharField(max_length=40, blank=True, default="")
+    is_active = models.BooleanField(default=False)
+    # ตารางที่ materialize อยู่เมื่อ is_active: 0 = ผลหลัก, n = GenerationAlternative rank n
+    active_alternative = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    created_by = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="generation_runs",
+        null=True, blank=True
+    )
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+
+    def __str__(self):
+        return f"[Run {self.id}] {self.created_by} fitness={self.best_fitness}"
+
+
+class GenerationAlternative(models.Model):
+    """
+    ตารางทางเลือกที่ดีรองจากผลหลักของการรันหนึ่งครั้ง (hall of fame, genome ไม่ซ้ำกัน)
+    สลับไปใช้ได้ผ่าน main.activate_generation_run(run, alternative=rank) โดยไม่ต้อง solve ใหม่
+    """
+    run = models.ForeignKey(GenerationRun, on_delete=models.CASCADE, related_name="alternatives")
+    rank = models.PositiveIntegerField()   # 1 = ดีรองจากผลหลัก
+    fitness = models.FloatField(null=True, blank=True)
+    hard_violations = models.IntegerField(default=0)
+    unassigned = models.IntegerField(default=0)
+    total_entries = models.IntegerField(default=0)
+    genome_fingerprint = models.CharField(max_length=40, blank=True, default="")
+    result_blob = models.BinaryField(blank=True, default=b"")
+
+    class Meta:
+        ordering = ["run", "rank"]
+        unique_together = ("run", "rank")
+
+    def __str__(self):
+        return f"[GA run {self.run_id}] alternative #{self.rank} fitness={self.fitness}"
+
+
+class ConstraintProfile(models.Model):
+    """
+    น้ำหนักโทษ/รางวัลและสวิตช์เปิด-ปิดของ fitness ต่อ user
+    (ค่าเริ่มต้นตรงกับ main.DEFAULT_CONSTRAINTS; เทอมที่ปิดจะไม่ถูกคำนวณเลย)
+    """
+    unassigned_penalty = models.IntegerField(default=50)
+    invalid_time_penalty = models.IntegerField(default=100)
+    teacher_conflict_penalty = models.IntegerField(default=120)
+    student_conflict_penalty = models.IntegerField(default=120)
+    room_conflict_penalty = models.IntegerField(default=120)
+    group_allow_penalty = models.IntegerField(default=120)
+    room_type_penalty = models.IntegerField(default=110)
+    placed_reward = models.IntegerField(default=90)
+    lab_before_theory_penalty = models.IntegerField(default=90)
+    lab_without_theory_penalty = models.IntegerField(default=0)
+    contig_adjacent_bonus = models.IntegerField(default=50)
+    contig_gap_penalty = models.IntegerField(default=30)
+    contig_segment_penalty = models.IntegerField(default=20)
+    contig_same_room = models.BooleanField(default=False)
+    missing_unit_penalty = models.IntegerField(default=400)
+
+    teacher_conflict_enabled = models.BooleanField(default=True)
+    student_conflict_enabled = models.BooleanField(default=True)
+    room_conflict_enabled = models.BooleanField(default=True)
+    group_allow_enabled = models.BooleanField(default=True)
+    room_type_enabled = models.BooleanField(default=True)
+    lab_order_enabled = models.BooleanField(default=True)
+    contiguity_enabled = models.BooleanField(default=True)
+    full_coverage_enabled = models.BooleanField(default=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+    created_by = models.OneToOneField(
+        User, on_delete=models.CASCADE, related_name="constraint_profile"
+    )
+
+    def __str__(self):
+        return f"ConstraintProfile({self.created_by})"
+
+
+class SolveJob(models.Model):
+    """
+    คิวงาน solve ที่ worker (scheduler.jobs / manage.py solver_workers) ดึงไปรัน
+    ลำดับการดึง: priority มากก่อน → round น้อยก่อน (round-robin ข้าม user) → มาก่อนได้ก่อน
+    แต่ละ user มีงานที่กำลังรันได้ครั้งละ 1 งาน (บังคับด้วย user_slot ที่ unique)
+    """
+    QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+    STATUS_CHOICES = [
+        (QUEUED, "queued"),
+        (RUNNING, "running"),
+        (DONE, "done"),
+        (FAILED, "failed"),
+        (CANCELLED, "cancelled"),
+    ]
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED, db_index=True)
+    priority = models.IntegerField(default=0)
+    # จำนวนงานค้าง (queued/running) ของ user เดียวกันตอนเข้าคิว — งานแรกของทุก user ได้ round 0
+    round = models.PositiveIntegerField(default=0)
+    engine = models.CharField(max_length=20, default="ga")
+    # {"runs", "workers", "fresh", "time_budget"} ตามที่ส่งมากับ generate / batch regenerate
+    params = models.JSONField(default=dict, blank=True)
+    # = created_by_id ระหว่าง running, NULL เมื่อไม่ได้รัน (NULL ซ้ำกันได้) — กัน 1 user รัน 2 งานพร้อมกัน
+    user_slot = models.PositiveIntegerField(null=True, blank=True, unique=True)
+    cancel_requested = models.BooleanField(default=False)
+    attempts = models.PositiveIntegerField(default=0)
+    worker = models.CharField(max_length=64, blank=True, default="")
+    # สรุปผลของ run_genetic_algorithm_from_db (ไม่รวม best_schedule)
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True, default="")
+    run = models.ForeignKey(GenerationRun, on_delete=models.SET_NULL, null=True, blank=True, related_name="jobs")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="solve_jobs")
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+        indexes = [models.Index(fields=["status", "-priority", "round", "created_at"])]
+
+    def __str__(self):
+        return f"[Job {self.id}] {self.created_by} {self.status}"
+
+
+class DataVersion(models.Model):
+    """
+    ตัวนับเวอร์ชันของข้อมูลต่อ user ต่อกลุ่ม (scope) — เพิ่มทุกครั้งที่ model ในกลุ่มถูกเขียน (scheduler.versions)
+    ใช้ทำ ETag/Last-Modified ของ endpoint อ่านอย่างเดียว: ข้อมูลไม่เปลี่ยน = ตอบ 304 โดยไม่ต้อง query จริง
+    """
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="data_versions")
+    scope = models.CharField(max_length=20)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("created_by", "scope")
+
+    def __str__(self):
+        return f"DataVersion({self.created_by}, {self.scope}={self.version})"
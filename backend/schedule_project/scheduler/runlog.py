@@ -0,0 +1,89 @@
+"""
+ปลายทางของ log จาก RunLog (logger "scheduler.solver") ใช้ใน settings.LOGGING
+  - QueueLogHandler : record เข้าคิว แล้ว thread แยก (QueueListener) เขียนออก — sink ช้าไม่บล็อก solver
+  - JsonRunFormatter: ใช้ extra ของ RunLog (run_id, event, generation, fields) เขียนเป็น JSON บรรทัดละ record
+ไม่ import solver/Django (settings โหลด module นี้ตอน process เริ่ม ต้องเบา)
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+# ชื่อ thread ของ listener — solver.portfolio ไม่นับ thread นี้ตอนตัดสินใจใช้ fork (ชื่อต้องตรงกัน)
+LISTENER_THREAD_NAME = "runlog-listener"
+
+class _Listener(QueueListener):
+    def start(self):
+        self._thread = threading.Thread(target=self._monitor, name=LISTENER_THREAD_NAME, daemon=True)
+        self._thread.start()
+
+class QueueLogHandler(QueueHandler):
+    """
+    handler ที่ไม่บล็อกผู้เรียก: emit แค่ใส่คิว ส่วน sink (ค่าเริ่มต้น StreamHandler) เขียนใน thread ของ listener
+      - คิวเต็ม (sink ค้าง/ช้ากว่าที่ log เข้ามา) → ทิ้ง record นั้นแล้วนับใน dropped ไม่รอ
+      - formatter ที่ตั้งให้ handler นี้ถูกใช้ที่ sink (จัดรูปใน thread ของ listener ไม่ใช่ใน solver)
+      - process ที่ fork ออกไป (worker ของ portfolio) ได้คิว + listener ชุดใหม่ของตัวเอง
+    """
+
+    def __init__(self, maxsize: int = 10000, sink: logging.Handler | None = None):
+        super().__init__(queue.Queue(maxsize))
+        self.maxsize = maxsize
+        self.sink = sink or logging.StreamHandler()
+        self.dropped = 0
+        self._start()
+        atexit.register(self.close)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._restart)
+
+    def _start(self):
+        self.listener = _Listener(self.queue, self.sink, respect_handler_level=True)
+        self.listener.start()
+        self._running = True
+
+    def _restart(self):
+        # thread ของ listener ไม่ตามมาใน process ลูก → คิวเดิมไม่มีใครอ่าน (และ lock ของคิวอาจค้าง)
+        self.queue = queue.Queue(self.maxsize)
+        self._start()
+
+    def setFormatter(self, fmt):
+        self.sink.setFormatter(fmt)
+
+    def prepare(self, record):
+        # คิวอยู่ใน process เดียวกัน ไม่ต้องจัดรูป/ตัด args ก่อนส่ง — sink จัดรูปเองพร้อม extra ครบ
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        if self._running:
+            self._running = False
+            try:
+                self.listener.stop()
+            except queue.Full:
+                pass
+            self.sink.close()
+        super().close()
+
+class JsonRunFormatter(logging.Formatter):
+    """
+    record → JSON บรรทัดเดียว {time, level, logger, run_id, event, generation, fields}
+    record จาก RunLog ใช้ extra ที่แนบมา ส่วน record อื่นเก็บข้อความไว้ใน "message"
+    """
+
+    def format(self, record):
+        doc = {"time": self.formatTime(record), "level": record.levelname, "logger": record.name}
+        fields = getattr(record, "fields", None)
+        if isinstance(fields, dict):
+            doc.update(run_id=record.run_id, event=record.event, generation=record.generation, fields=fields)
+        else:
+            doc["message"] = record.getMessage()
+        if record.exc_info:
+            doc["exc"] = self.formatException(record.exc_info)
+        return json.dumps(doc, ensure_ascii=False, default=str)
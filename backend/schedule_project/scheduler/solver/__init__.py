@@ -0,0 +1,23 @@
+"""
+แกนของตัวจัดตาราง (compile → solve → evaluate) แบบไม่พึ่ง Django/DB
+
+    from scheduler.solver import compile_problem, run_portfolio
+    problem = compile_problem({"courses": [...], "rooms": [...], "groupallows": [...], ...})
+    result = run_portfolio(problem, runs=1, engine="ga")
+
+ตารางดิบ/คอลัมน์ดูที่ PROBLEM_TABLES; ฝั่ง Django (ดึงจาก ORM + บันทึกผล) อยู่ที่ scheduler.main
+"""
+from .common import GenerationCancelled, RunLog
+from .problem import (
+    PROBLEM_TABLES, SlotIndex, apply_groupallow_blocking, build_slot_index, compile_problem,
+    explode_courses_to_units, problem_fingerprint, problem_table, solve_cache_key,
+)
+from .fitness import (
+    DEFAULT_CONSTRAINTS, VIOLATION_TERMS, compile_evaluator, count_hard_violations, evaluate_individual,
+)
+from .placement import make_allow_set
+from .operators import MUTATION_OPERATORS
+from .ga import genome_fingerprint, run_genetic_algorithm
+from .sa import run_simulated_annealing
+from .portfolio import DEFAULT_GA_PARAMS, DEFAULT_SA_PARAMS, ENGINES, run_engine, run_portfolio
+from .packing import PERSIST_FIELDS, pack_schedule, unpack_schedule
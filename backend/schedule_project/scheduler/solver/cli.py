@@ -0,0 +1,184 @@
+"""
+ตัวจัดตารางแบบ command line บน snapshot (ไม่ต้องมี DB/Django)
+
+    python -m scheduler.solver problem.npz --engine sa --time-budget 30 --seed 1 \
+        --format csv --output schedule.csv --report report.json
+
+ฝั่ง Django ใช้ตัวเลือกชุดเดียวกันผ่าน manage.py generate_schedule (เพิ่ม --user / --save)
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+from datetime import time
+from time import perf_counter
+from typing import List, Dict, Any
+
+from tabulate import tabulate
+
+from .common import RunLog
+from .packing import PERSIST_FIELDS, _row_values
+from .placement import _is_unassigned
+from .portfolio import ENGINES, run_portfolio
+from .problem import _preflight_capacity_check, compile_problem, problem_fingerprint
+from .snapshot import load_snapshot
+
+OUTPUT_FORMATS = ("json", "csv", "table")
+
+def _param_value(text: str):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+def parse_params(items: List[str] | None, engine: str | None = None) -> Dict[str, Any]:
+    """
+    ["generations=50", "restart_mode=\"fresh\""] → {"generations": 50, "restart_mode": "fresh"}
+    ระบุ engine → key ที่ engine นั้นไม่มี (ดู ENGINES) เป็น ValueError ตั้งแต่ตอน parse
+    """
+    params = {}
+    for item in items or []:
+        key, sep, value = item.partition("=")
+        if not sep or not key.strip():
+            raise ValueError(f"--param ต้องอยู่ในรูป key=value: {item}")
+        params[key.strip()] = _param_value(value.strip())
+    if engine is not None:
+        unknown = sorted(set(params) - set(ENGINES[engine][1]))
+        if unknown:
+            raise ValueError(f"engine {engine} ไม่มี param: {', '.join(unknown)} "
+                             f"(ที่ใช้ได้: {', '.join(sorted(ENGINES[engine][1]))})")
+    return params
+
+def add_solve_arguments(parser: argparse.ArgumentParser) -> argparse.ArgumentParser:
+    """ตัวเลือกของการ solve/ผลลัพธ์ (ใช้ร่วมกันระหว่าง CLI นี้กับ manage.py generate_schedule)"""
+    parser.add_argument("--engine", default="ga", choices=sorted(ENGINES), help="engine (ค่าเริ่มต้น ga)")
+    parser.add_argument("--runs", type=int, default=1, help="จำนวนรอบ (seed ต่างกัน) ใน portfolio")
+    parser.add_argument("--workers", type=int, default=None, help="จำนวน worker process (ค่าเริ่มต้น = จำนวน CPU)")
+    parser.add_argument("--seed", type=int, default=None, help="seed ของ portfolio (ไม่ระบุ = สุ่มแล้วบันทึกใน report)")
+    parser.add_argument("--time-budget", type=float, default=None,
+                        help="วินาที: ครบแล้วหยุดและใช้ผลดีที่สุดที่มี")
+    parser.add_argument("--param", action="append", default=[], metavar="KEY=VALUE",
+                        help="ทับ params ของ engine เช่น --param generations=50 (ระบุซ้ำได้)")
+    parser.add_argument("--format", default="json", choices=OUTPUT_FORMATS, help="รูปแบบตารางผลลัพธ์")
+    parser.add_argument("--output", default="-", help="ไฟล์ตารางผลลัพธ์ (- = stdout)")
+    parser.add_argument("--report", default=None, help="ไฟล์ run report (JSON)")
+    return parser
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m scheduler.solver",
+                                     description="Solve a timetable snapshot without a database")
+    parser.add_argument("snapshot", help="ไฟล์ snapshot (.json / .npz) หรือโฟลเดอร์ CSV")
+    parser.add_argument("-v", "--verbose", action="store_true", help="แสดง log ของ engine (start/generation/finish)")
+    return add_solve_arguments(parser)
+
+def solve_problem(
+    raw: Dict[str, Any],
+    engine: str = "ga",
+    runs: int = 1,
+    workers: int | None = None,
+    seed: int | None = None,
+    time_budget: float | None = None,
+    params: Dict[str, Any] | None = None,
+    cancel_event=None,
+) -> Dict[str, Any]:
+    """
+    ตารางดิบ (หรือโจทย์ที่ compile แล้วจาก .npz) → compile → preflight → run_portfolio; คืน {"schedule": แถวที่วางแล้ว, "report": {...}}
+    report มีทุกอย่างที่ต้องใช้รันซ้ำ/เปรียบเทียบ (engine, seed, params, fingerprint) + ผลและเวลาแต่ละช่วง
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"ไม่รู้จัก engine: {engine}")
+    if seed is None:
+        seed = int.from_bytes(os.urandom(8), "big")
+    t0 = perf_counter()
+    data = compile_problem(raw)
+    log = RunLog(source="cli")
+    data["log"] = log
+    fingerprint = problem_fingerprint(data)
+    deficits = _preflight_capacity_check(data)
+    t_compile = perf_counter()
+    result = run_portfolio(data, runs=runs, workers=workers, seed=seed, cancel_event=cancel_event,
+                           engine=engine, params=params, time_budget=time_budget)
+    t_solve = perf_counter()
+
+    placed = [r for r in result["schedule"] if not _is_unassigned(r)]
+    report = {
+        "engine": engine,
+        "seed": str(seed),
+        "run_seed": str(result["seed"]),
+        "runs": runs,
+        "params": {**ENGINES[engine][1], **(params or {})},
+        "time_budget": time_budget,
+        "input_fingerprint": fingerprint,
+        "log_id": log.run_id,
+        "fitness": result["fitness"] if result["fitness"] != float("-inf") else None,
+        "hard_violations": result["hard_violations"],
+        "total_entries": len(placed),
+        "unassigned": len(result["schedule"]) - len(placed),
+        "preflight": deficits,
+        "violations": result["violations"],
+        "portfolio": [{**p, "seed": str(p["seed"])} for p in result["portfolio"]],
+        "restarts": result.get("restarts", []),
+        "trace": result["trace"],
+        "timings": {"compile": round(t_compile - t0, 3), "solve": round(t_solve - t_compile, 3)},
+    }
+    return {"schedule": placed, "report": report}
+
+def schedule_records(rows) -> List[Dict[str, Any]]:
+    """แถวผลลัพธ์ → dict ตาม PERSIST_FIELDS (เวลาเป็น "HH:MM:SS")"""
+    out = []
+    for row in rows:
+        vals = [v.isoformat() if isinstance(v, time) else v for v in _row_values(row)]
+        out.append(dict(zip(PERSIST_FIELDS, vals)))
+    return out
+
+def write_schedule(rows, fmt: str, stream) -> None:
+    records = schedule_records(rows)
+    if fmt == "json":
+        json.dump(records, stream, ensure_ascii=False, indent=2)
+        stream.write("\n")
+    elif fmt == "csv":
+        writer = csv.DictWriter(stream, fieldnames=list(PERSIST_FIELDS))
+        writer.writeheader()
+        writer.writerows(records)
+    elif fmt == "table":
+        stream.write(tabulate(records, headers="keys") + "\n")
+    else:
+        raise ValueError(f"ไม่รู้จักรูปแบบ: {fmt}")
+
+def write_outputs(solved: Dict[str, Any], fmt: str, output: str, report_path: str | None) -> None:
+    if output in (None, "-"):
+        write_schedule(solved["schedule"], fmt, sys.stdout)
+    else:
+        with open(output, "w", encoding="utf-8", newline="") as f:
+            write_schedule(solved["schedule"], fmt, f)
+    if report_path:
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(solved["report"], f, ensure_ascii=False, indent=2)
+
+def report_summary(report: Dict[str, Any]) -> str:
+    return (f"engine={report['engine']} seed={report['seed']} fitness={report['fitness']} "
+            f"hard={report['hard_violations']} placed={report['total_entries']} "
+            f"unassigned={report['unassigned']} compile={report['timings']['compile']}s "
+            f"solve={report['timings']['solve']}s")
+
+def main(argv: List[str] | None = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    try:
+        params = parse_params(args.param, args.engine)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        raw = load_snapshot(args.snapshot)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    solved = solve_problem(raw, engine=args.engine, runs=args.runs, workers=args.workers, seed=args.seed,
+                           time_budget=args.time_budget, params=params)
+    write_outputs(solved, args.format, args.output, args.report)
+    print(report_summary(solved["report"]), file=sys.stderr)
+    return 0
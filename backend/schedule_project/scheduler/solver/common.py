@@ -0,0 +1,69 @@
+"""
+ยกเลิกการรัน (GenerationCancelled) และ log ของการรัน (RunLog)
+"""
+import copy
+import logging
+import uuid
+from time import perf_counter
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# ================== Cancel & Utils ==================
+
+class GenerationCancelled(Exception):
+    """โยนเมื่อมีการยกเลิกกลางคัน"""
+    pass
+
+def _check_cancel(cancel_event):
+    if cancel_event and cancel_event.is_set():
+        raise GenerationCancelled()
+
+# event ราย generation ส่งได้ไม่เกิน 1 ครั้งต่อกี่วินาที (ต่อ engine/seed)
+RUN_LOG_INTERVAL = 1.0
+
+class RunLog:
+    """
+    ช่องทาง event ของการรันหนึ่งครั้ง ผ่าน logging (logger "scheduler.solver.common"):
+      - ทุก record มี extra: run_id, event, generation, fields (dict) — scheduler.runlog.JsonRunFormatter
+        เขียนออกเป็น JSON (GA_LOG_FORMAT=json) ส่วนรูปแบบข้อความปกติมี fields เป็น key=value ในข้อความ
+      - event ราย generation ถูกจำกัดความถี่ตาม interval (ไม่ใช่ทุกรุ่น)
+      - ปิดได้ด้วยระดับ logger (เช่น GA_LOG_LEVEL=WARNING) — เช็คก่อนจัดรูปข้อความ ไม่มีต้นทุนตอนปิด
+    """
+
+    def __init__(self, run_id: str | None = None, interval: float = RUN_LOG_INTERVAL, **context):
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+        self.interval = interval
+        self.context = context
+        self._last = float("-inf")
+
+    def bind(self, **context) -> "RunLog":
+        """สำเนาที่มี context เพิ่ม (เช่น engine/seed ของแต่ละรอบใน portfolio) นับ rate limit แยกกัน"""
+        child = copy.copy(self)
+        child.context = {**self.context, **context}
+        child._last = float("-inf")
+        return child
+
+    def event(self, event: str, level: int = logging.INFO, **fields) -> None:
+        if not logger.isEnabledFor(level):
+            return
+        fields = {**self.context, **fields}
+        logger.log(
+            level, "run=%s %s %s", self.run_id, event,
+            " ".join(f"{k}={v}" for k, v in fields.items()),
+            extra={"run_id": self.run_id, "event": event, "generation": fields.get("generation"), "fields": fields},
+        )
+
+    def generation(self, generation: int, **fields) -> None:
+        """event ราย generation/iteration: ทิ้งถ้ายังไม่ครบ interval จากครั้งก่อน"""
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        now = perf_counter()
+        if now - self._last < self.interval:
+            return
+        self._last = now
+        self.event("generation", generation=generation, **fields)
+
+def _persist_value(v):
+    return None if v is None or (isinstance(v, float) and pd.isna(v)) else v
@@ -0,0 +1,275 @@
+"""
+ฟังก์ชัน fitness ที่ compile จากน้ำหนัก/สวิตช์ของข้อบังคับ + นับ hard violation
+"""
+from collections import defaultdict
+from datetime import time
+from typing import List, Dict, Any
+
+import pandas as pd
+
+from .problem import MISSING_UNIT_PENALTY, REQUIRE_FULL_COVERAGE
+from .placement import _contiguity_score, _is_unassigned, _slot_order_key, CONTIG_ADJACENT_BONUS, CONTIG_GAP_PENALTY, CONTIG_SEGMENT_PENALTY, REQUIRE_SAME_ROOM_FOR_CONTIG
+
+# ==================== Fitness =======================
+
+# น้ำหนัก/สวิตช์ค่าเริ่มต้นของ fitness (ตรงกับค่า default ของ ConstraintProfile)
+DEFAULT_CONSTRAINTS = {
+    "unassigned_penalty": 50,
+    "invalid_time_penalty": 100,
+    "teacher_conflict_penalty": 120,
+    "student_conflict_penalty": 120,
+    "room_conflict_penalty": 120,
+    "group_allow_penalty": 120,
+    "room_type_penalty": 110,
+    "placed_reward": 90,
+    "lab_before_theory_penalty": 90,
+    "lab_without_theory_penalty": 0,
+    "contig_adjacent_bonus": CONTIG_ADJACENT_BONUS,
+    "contig_gap_penalty": CONTIG_GAP_PENALTY,
+    "contig_segment_penalty": CONTIG_SEGMENT_PENALTY,
+    "contig_same_room": REQUIRE_SAME_ROOM_FOR_CONTIG,
+    "missing_unit_penalty": MISSING_UNIT_PENALTY,
+
+    "teacher_conflict_enabled": True,
+    "student_conflict_enabled": True,
+    "room_conflict_enabled": True,
+    "group_allow_enabled": True,
+    "room_type_enabled": True,
+    "lab_order_enabled": True,
+    "contiguity_enabled": True,
+    "full_coverage_enabled": REQUIRE_FULL_COVERAGE,
+}
+
+def _lab_order_penalty(individual, before_theory: int, without_theory: int, offenders=None) -> int:
+    """บังคับลำดับ Theory → Lab ต่อรายวิชา/เซกชัน (offenders: dict รับ gene ที่ผิดแยกตามชนิด)"""
+    by_course = defaultdict(list)
+    for g in individual:
+        if _is_unassigned(g):
+            continue
+        k = (g["subject_code"], g["section"], g["teacher"], g["student_group"])
+        by_course[k].append(g)
+
+    penalty = 0
+    for k, genes in by_course.items():
+        theory_slots = [g for g in genes if str(g.get("type","")).strip().lower() == "theory"]
+        lab_slots    = [g for g in genes if str(g.get("type","")).strip().lower() == "lab"]
+
+        if not lab_slots:
+            continue
+        if not theory_slots:
+            penalty += without_theory * len(lab_slots)
+            if offenders is not None:
+                offenders["lab_without_theory"].extend(lab_slots)
+            continue
+
+        first_theory_key = min((_slot_order_key(g) for g in theory_slots), default=(99, time(23,59)))
+        for lab in lab_slots:
+            if _slot_order_key(lab) < first_theory_key:
+                penalty += before_theory
+                if offenders is not None:
+                    offenders["lab_before_theory"].append(lab)
+    return penalty
+
+# ชื่อเทอมใน violation breakdown → key น้ำหนักใน DEFAULT_CONSTRAINTS
+VIOLATION_TERMS = {
+    "unassigned": "unassigned_penalty",
+    "invalid_time": "invalid_time_penalty",
+    "teacher_conflict": "teacher_conflict_penalty",
+    "student_conflict": "student_conflict_penalty",
+    "room_conflict": "room_conflict_penalty",
+    "group_allow": "group_allow_penalty",
+    "room_type": "room_type_penalty",
+    "lab_before_theory": "lab_before_theory_penalty",
+    "lab_without_theory": "lab_without_theory_penalty",
+    "missing_unit": "missing_unit_penalty",
+}
+
+def unit_ids(individual) -> List[str]:
+    """
+    id ของแต่ละหน่วยใน individual: "<subject_code>-<section>/<type>#<unit_idx>@<course_id>"
+    อ้างอิง (id วิชา, ประเภท, unit_idx) จาก explode_courses_to_units → หน่วยเดียวกันได้ id เดิมทุกรอบ/ทุก engine
+    gene ที่ไม่มี course_id (ผลเก่าที่โหลดกลับมา) นับลำดับตามตำแหน่งใน individual แทน
+    """
+    seq = defaultdict(int)
+    ids = []
+    for g in individual:
+        k = (g.get("subject_code"), g.get("section"), str(g.get("type", "")).strip().lower())
+        if g.get("course_id") is not None:
+            ids.append(f"{k[0]}-{k[1]}/{k[2]}#{g.get('unit_idx')}@{g['course_id']}")
+            continue
+        seq[k] += 1
+        ids.append(f"{k[0]}-{k[1]}/{k[2]}#{seq[k]}")
+    return ids
+
+def compile_evaluator(constraints: Dict[str, Any] | None = None):
+    """
+    สร้างฟังก์ชัน fitness(individual, allow_set, room_type_of) จากน้ำหนัก/สวิตช์ (ครั้งเดียวต่อรอบ)
+    เทอมที่ปิดไว้จะไม่ถูกคำนวณเลย (ไม่ใช่คูณด้วย 0) — ปิดเทอมที่ไม่ใช้ = เร็วขึ้นฟรี
+    """
+    c = {**DEFAULT_CONSTRAINTS, **(constraints or {})}
+    w_unassigned = c["unassigned_penalty"]
+    w_time       = c["invalid_time_penalty"]
+    w_teacher    = c["teacher_conflict_penalty"]
+    w_student    = c["student_conflict_penalty"]
+    w_room       = c["room_conflict_penalty"]
+    w_allow      = c["group_allow_penalty"]
+    w_room_type  = c["room_type_penalty"]
+    w_reward     = c["placed_reward"]
+    w_missing    = c["missing_unit_penalty"]
+    check_teacher   = c["teacher_conflict_enabled"]
+    check_student   = c["student_conflict_enabled"]
+    check_room      = c["room_conflict_enabled"]
+    check_allow     = c["group_allow_enabled"]
+    check_room_type = c["room_type_enabled"]
+    check_order     = c["lab_order_enabled"]
+    check_contig    = c["contiguity_enabled"]
+    check_coverage  = c["full_coverage_enabled"]
+    order_args = (c["lab_before_theory_penalty"], c["lab_without_theory_penalty"])
+    contig_args = (c["contig_adjacent_bonus"], c["contig_gap_penalty"],
+                   c["contig_segment_penalty"], c["contig_same_room"])
+
+    def evaluate(individual, allow_set, room_type_of=None, detail=False):
+        """
+        detail=False → คะแนน (int)
+        detail=True  → (คะแนน, breakdown) เก็บ gene ที่ผิดระหว่างวนรอบเดียวกัน (ไม่มีรอบเพิ่ม)
+        """
+        penalty = 0
+        reward = 0
+        missing = 0
+        use_room_type = check_room_type and room_type_of is not None
+        bad = defaultdict(list) if detail else None
+
+        seen_t, seen_s, seen_r = set(), set(), set()
+
+        # -------- ส่วนที่ 1: โทษ/รางวัลพื้นฐานต่อ gene --------
+        for g in individual:
+            if _is_unassigned(g):
+                penalty += w_unassigned
+                missing += 1
+                if detail: bad["unassigned"].append(g)
+                continue
+
+            day, st, et = g["day_of_week"], g["start_time"], g["stop_time"]
+            if st >= et:
+                penalty += w_time
+                if detail: bad["invalid_time"].append(g)
+
+            if check_teacher:
+                t = (g["teacher"], day, st, et)
+                if t in seen_t:
+                    penalty += w_teacher
+                    if detail: bad["teacher_conflict"].append(g)
+                seen_t.add(t)
+            if check_student:
+                s = (g["student_group"], day, st, et)
+                if s in seen_s:
+                    penalty += w_student
+                    if detail: bad["student_conflict"].append(g)
+                seen_s.add(s)
+            if check_room:
+                r = (g["room"], day, st, et)
+                if r in seen_r:
+                    penalty += w_room
+                    if detail: bad["room_conflict"].append(g)
+                seen_r.add(r)
+
+            if check_allow:
+                gtype = g.get("group_type_id", None)
+                key = (int(gtype) if pd.notna(gtype) else None, day, st, et, g["room"])
+                if (gtype is None) or (key not in allow_set):
+                    penalty += w_allow
+                    if detail: bad["group_allow"].append(g)
+
+            if use_room_type:
+                req = g.get("room_type_course", None)
+                actual = room_type_of.get(g["room"])
+                if req and actual and str(req).strip() and str(actual).strip():
+                    if str(req).strip() != str(actual).strip():
+                        penalty += w_room_type
+                        if detail: bad["room_type"].append(g)
+
+            reward += w_reward
+
+        # -------- ส่วนที่ 2: บังคับลำดับ Theory → Lab ต่อรายวิชา/เซกชัน --------
+        if check_order:
+            penalty += _lab_order_penalty(individual, *order_args, offenders=bad)
+
+        # -------- ส่วนที่ 3: ให้คะแนนความต่อเนื่อง (contiguity) --------
+        contig = _contiguity_score(individual, *contig_args) if check_contig else 0
+
+        # -------- ส่วนที่ 4: บังคับวางครบ (ถ้าเปิดใช้) --------
+        if check_coverage and missing > 0:
+            penalty += w_missing * missing
+            if detail: bad["missing_unit"] = bad["unassigned"]
+
+        score = reward - penalty + contig
+        if not detail:
+            return score
+        return score, _violation_breakdown(individual, bad, c, reward, contig)
+
+    return evaluate
+
+def _violation_breakdown(individual, bad, weights, reward, contig) -> Dict[str, Any]:
+    """gene ที่ผิดแยกตามเทอม → {"terms": {เทอม: {count, penalty, units}}, "reward", "contiguity"}"""
+    ids = unit_ids(individual)
+    uid = {id(g): u for g, u in zip(individual, ids)}
+    terms = {}
+    for term, wkey in VIOLATION_TERMS.items():
+        genes = bad.get(term) or []
+        if genes:
+            terms[term] = {
+                "count": len(genes),
+                "penalty": weights[wkey] * len(genes),
+                "units": [uid[id(g)] for g in genes],
+            }
+    return {"terms": terms, "reward": reward, "contiguity": contig}
+
+# evaluator ตามค่าเริ่มต้น (ไม่มี ConstraintProfile)
+evaluate_individual = compile_evaluator()
+
+def count_hard_violations(individual, allow_set, room_type_of=None, constraints: Dict[str, Any] | None = None) -> int:
+    """
+    นับการละเมิดข้อบังคับ (hard): คาบที่ยังไม่วาง + ครู/นักศึกษา/ห้องชน + ผิด group_allow + ผิดประเภทห้อง
+    เทอมที่ปิดใน constraints (…_enabled = False) ไม่นับ เหมือน compile_evaluator
+    0 = ตารางใช้ได้จริง (ใช้เป็นเงื่อนไขหยุดก่อนเวลาใน portfolio)
+    """
+    c = {**DEFAULT_CONSTRAINTS, **(constraints or {})}
+    check_teacher, check_student, check_room = (
+        c["teacher_conflict_enabled"], c["student_conflict_enabled"], c["room_conflict_enabled"])
+    check_allow = c["group_allow_enabled"]
+    use_room_type = c["room_type_enabled"] and room_type_of is not None
+    violations = 0
+    seen_t, seen_s, seen_r = set(), set(), set()
+    for g in individual:
+        if _is_unassigned(g):
+            violations += 1
+            continue
+        day, st, et = g["day_of_week"], g["start_time"], g["stop_time"]
+        if check_teacher:
+            t = (g["teacher"], day, st, et)
+            violations += t in seen_t
+            seen_t.add(t)
+        if check_student:
+            s = (g["student_group"], day, st, et)
+            violations += s in seen_s
+            seen_s.add(s)
+        if check_room:
+            r = (g["room"], day, st, et)
+            violations += r in seen_r
+            seen_r.add(r)
+
+        if check_allow:
+            gtype = g.get("group_type_id", None)
+            key = (int(gtype) if pd.notna(gtype) else None, day, st, et, g["room"])
+            if (gtype is None) or (key not in allow_set):
+                violations += 1
+
+        if use_room_type:
+            req = str(g.get("room_type_course") or "").strip()
+            actual = str(room_type_of.get(g["room"]) or "").strip()
+            if req and actual and req != actual:
+                violations += 1
+    return violations
+
+def course_key(g):
+    return (g["subject_code"], g["section"], g["teacher"], g["student_group"], g["type"])
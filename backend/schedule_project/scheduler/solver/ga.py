@@ -0,0 +1,373 @@
+"""
+Genetic Algorithm (diversity re-injection, restart, hall of fame)
+"""
+import hashlib
+import os
+import random
+from collections import Counter
+from time import perf_counter
+from typing import List, Tuple, Dict, Any
+
+import pandas as pd
+
+from .common import _check_cancel, RunLog
+from .placement import _greedy_fill_unassigned, _is_unassigned, make_allow_set
+from .population import initialize_population
+from .problem import SlotIndex
+from .fitness import compile_evaluator, count_hard_violations, course_key
+from .operators import crossover, mutate, MUTATION_OPERATORS
+from .timephase import TimeSpace
+
+# ==================== GA Main =======================
+
+def _trace_point(trace, t0, gen, fitness, individual, hard_violations: int):
+    """
+    เก็บจุด anytime trace ตอนผลดีที่สุดดีขึ้น:
+    [elapsed_sec, generation, best_fitness, hard_violations, unassigned]
+    """
+    trace.append([
+        round(perf_counter() - t0, 3),
+        gen,
+        fitness,
+        hard_violations,
+        sum(1 for g in individual if _is_unassigned(g)),
+    ])
+
+class GeneSpace:
+    """
+    ตัวแทนการค้นหาแบบปกติ: gene = (slot, ห้อง) operator สุ่มทั้งเวลาและห้อง
+    interface เดียวกับ timephase.TimeSpace (ใช้ใน run_genetic_algorithm ตาม room_mode)
+    """
+
+    def __init__(self, courses, slot_index, allow_set, room_type_of, evaluate, constraints=None):
+        self.courses = courses
+        self.constraints = constraints
+        self.slot_index = slot_index
+        self.allow_set = allow_set
+        self.room_type_of = room_type_of
+        self.evaluate = evaluate
+
+    def initialize(self, n, seed, cancel_event=None, dsatur_share: float = 0.0):
+        return initialize_population(self.courses, self.slot_index, n, seed=seed, cancel_event=cancel_event,
+                                     dsatur_share=dsatur_share)
+
+    def fitness(self, individual):
+        return self.evaluate(individual, self.allow_set, self.room_type_of)
+
+    def hard_violations(self, individual) -> int:
+        return count_hard_violations(individual, self.allow_set, self.room_type_of, self.constraints)
+
+    def crossover(self, parent1, parent2, rng, cancel_event=None):
+        return crossover(parent1, parent2, self.allow_set, self.slot_index, rng, self.room_type_of,
+                         cancel_event=cancel_event)
+
+    def mutate(self, individual, mut_rate, rng, cancel_event=None, operators=MUTATION_OPERATORS):
+        return mutate(individual, self.allow_set, self.slot_index, mut_rate, rng, self.room_type_of,
+                      cancel_event=cancel_event, operators=operators)
+
+    def fill(self, individual, rng, cancel_event=None):
+        return _greedy_fill_unassigned(individual, self.slot_index, self.allow_set, self.room_type_of, rng,
+                                       cancel_event=cancel_event)
+
+    def decode(self, individual):
+        return individual
+
+def genome_vector(individual) -> Tuple[str, ...]:
+    """
+    genome แบบ canonical เป็นข้อความ: slot ของแต่ละหน่วยเรียงตามวิชา แล้วตาม slot
+    ใช้ทำ genome_fingerprint ที่บันทึกลงฐานข้อมูล (ไม่ผูกกับ SlotIndex) — ใน loop ใช้ compile_genome_encoder
+    """
+    keyed = sorted(
+        ("|".join(map(str, course_key(g))),
+         "" if _is_unassigned(g) else f"{g['day_of_week']}|{g['start_time']}|{g['stop_time']}|{g['room']}")
+        for g in individual
+    )
+    return tuple(slot for _, slot in keyed)
+
+def compile_genome_encoder(slot_index: SlotIndex):
+    """
+    สร้างฟังก์ชัน individual → genome แบบ canonical เป็น tuple ของ int (ครั้งเดียวต่อรอบ)
+      - ค่าของหน่วย = slot id × ห้อง (0 = ยังไม่วาง) เรียงตามเลขวิชาแล้วตามค่า
+      - ทุก individual มีหน่วยชุดเดียวกัน → ตำแหน่งเดียวกันคือหน่วยของวิชาเดียวกัน (ใช้เทียบ Hamming ได้)
+    เลขวิชาให้ตามลำดับที่พบครั้งแรก (คงที่ภายในรอบ) จึงเทียบได้เฉพาะ genome จาก encoder ตัวเดียวกัน
+    """
+    slot_id_of = slot_index.slot_id_of
+    room_no = {r: i + 1 for i, r in enumerate(slot_index.rooms)}
+    n_slots, n_rooms = len(slot_index.slots), len(slot_index.rooms) + 1
+    n_codes = (n_slots + 1) * n_rooms + 1
+    course_no = {}
+
+    def encode(individual) -> Tuple[int, ...]:
+        keyed = []
+        for g in individual:
+            c = course_no.get(course_key(g))
+            if c is None:
+                c = course_no[course_key(g)] = len(course_no)
+            if _is_unassigned(g):
+                code = 0
+            else:
+                sid = slot_id_of.get((g["day_of_week"], g["start_time"], g["stop_time"]), n_slots)
+                code = 1 + sid * n_rooms + room_no.get(g["room"], 0)
+            keyed.append(c * n_codes + code)
+        keyed.sort()
+        return tuple(k % n_codes for k in keyed)
+
+    return encode
+
+def population_diversity(vectors: List[Tuple[int, ...]]) -> Tuple[int, float]:
+    """
+    (จำนวน genome ไม่ซ้ำ, ค่าเฉลี่ย Hamming distance ทุกคู่)
+    Hamming เฉลี่ยคิดต่อตำแหน่งจากความถี่ของค่า (P² − Σcount²) แทนการเทียบทีละคู่ → O(P·n)
+    """
+    P = len(vectors)
+    unique = len(set(vectors))
+    if P < 2:
+        return unique, 0.0
+    differing = 0
+    for column in zip(*vectors):
+        counts = Counter(column).values()
+        differing += P * P - sum(c * c for c in counts)
+    return unique, differing / (P * (P - 1))
+
+def genome_fingerprint(individual) -> str:
+    """ลายนิ้วมือของ genome (sha1 ของ genome_vector) ใช้ตัดตารางซ้ำใน hall of fame"""
+    return hashlib.sha1("\n".join(genome_vector(individual)).encode("utf-8")).hexdigest()
+
+def _hall_of_fame(entries, size: int) -> List[Dict[str, Any]]:
+    """รวม entry {fitness, schedule, fingerprint, ...} ตัดซ้ำตาม fingerprint เรียง fitness มาก→น้อย ไม่เกิน size"""
+    best = {}
+    for e in entries:
+        cur = best.get(e["fingerprint"])
+        if cur is None or e["fitness"] > cur["fitness"]:
+            best[e["fingerprint"]] = e
+    return sorted(best.values(), key=lambda e: e["fitness"], reverse=True)[:max(1, size)]
+
+def _update_archive(archive, size: int, fitness, individual, vec) -> None:
+    """archive = [(fitness, genome, individual)] เรียงดี→แย่ เก็บเฉพาะ genome ไม่ซ้ำ ไม่เกิน size ตัว"""
+    if size <= 0 or any(v == vec for _, v, _ in archive):
+        return
+    if len(archive) < size or fitness > archive[-1][0]:
+        archive.append((fitness, vec, [dict(g) for g in individual]))
+        archive.sort(key=lambda a: a[0], reverse=True)
+        del archive[size:]
+
+def _restart_population(archive, space, pop_size, mode, strength, rng, mutation_ops, cancel_event=None):
+    """
+    ประชากรใหม่หลังค้าง: ตัวใน archive + ส่วนที่เหลือ
+      - "random" : initialize ใหม่ทั้งหมด
+      - "perturb": สำเนาผลดีที่สุดที่ถูก mutate แรง ๆ (mut_rate = strength)
+      - "mixed"  : ครึ่งต่อครึ่ง
+    """
+    keep = [[dict(g) for g in ind] for _, _, ind in archive]
+    n_new = max(0, pop_size - len(keep))
+    n_perturb = {"random": 0, "perturb": n_new}.get(mode, n_new // 2) if archive else 0
+    fresh = space.initialize(n_new - n_perturb, seed=rng.getrandbits(64), cancel_event=cancel_event)
+    best = archive[0][2] if archive else None
+    perturbed = [
+        space.mutate(best, strength, rng, cancel_event=cancel_event, operators=mutation_ops)
+        for _ in range(n_perturb)
+    ]
+    return keep + fresh + perturbed
+
+def run_genetic_algorithm(
+    data: Dict[str, pd.DataFrame],
+    generations,
+    pop_size,
+    elite_size,
+    cx_rate,
+    mut_rate,
+    seed: int | None = None,   # << seed เป็น optional
+    cancel_event=None,
+    stop_event=None,           # << หยุดแบบคืนผลดีที่สุด (ไม่ใช่ยกเลิก): หมดเวลา / รอบอื่นใน portfolio เจอตารางแล้ว
+    stop_on_feasible: bool = False,  # << portfolio หลายรอบ: ได้ hard_violations == 0 → set stop_event ให้ทุกรอบหยุด
+    room_mode: str = "gene",   # << "gene" = ห้องอยู่ใน gene, "matching" = GA หาเวลา แล้วจัดห้องด้วย matching
+    dsatur_share: float = 0.0, # << สัดส่วนประชากรเริ่มต้นที่สร้างด้วย DSatur
+    diversity_threshold: float = 0.0,  # << genome ไม่ซ้ำ < สัดส่วนนี้ของประชากร → ตัดตัวซ้ำแล้วเติมตัวใหม่ (0 = ปิด)
+    mutation_ops=MUTATION_OPERATORS,   # << operator ของ mutate ที่ใช้
+    restart_after: int = 0,            # << ค้าง (ไม่ดีขึ้น) กี่ generation → restart (0 = ปิด)
+    restart_mode: str = "mixed",       # << "random" | "perturb" | "mixed"
+    restart_strength: float = 0.3,     # << mut_rate ที่ใช้เขย่าผลดีที่สุดตอน restart แบบ perturb
+    archive_size: int = 5,             # << จำนวนผลดีที่สุดที่ไม่ซ้ำกันที่เก็บข้าม restart
+):
+    unknown_ops = set(mutation_ops) - set(MUTATION_OPERATORS)
+    if unknown_ops:
+        raise ValueError(f"ไม่รู้จัก mutation operator: {sorted(unknown_ops)}")
+    if restart_mode not in ("random", "perturb", "mixed"):
+        raise ValueError(f"ไม่รู้จัก restart_mode: {restart_mode}")
+    if room_mode not in ("gene", "matching"):
+        raise ValueError(f"ไม่รู้จัก room_mode: {room_mode}")
+    if seed is None:
+        seed = int.from_bytes(os.urandom(8), "big")  # << สุ่มใหม่ทุกรอบ
+    rng = random.Random(seed)
+    log = (data.get("log") or RunLog()).bind(engine="ga_matching" if room_mode == "matching" else "ga", seed=seed)
+    log.event("start", generations=generations, pop_size=pop_size)
+    t0 = perf_counter()
+
+    courses = data["courses"]
+    slot_index = data["slot_index"]
+
+    # allow_set + room mapping
+    allow_set = make_allow_set(slot_index)
+    rooms_df = data.get("rooms", pd.DataFrame())
+    room_type_of = {}
+    if (not rooms_df.empty) and ("room_name" in rooms_df.columns) and ("room_type" in rooms_df.columns):
+        room_type_of = dict(zip(rooms_df["room_name"], rooms_df["room_type"]))
+
+    constraints = data.get("constraints")
+    evaluate = compile_evaluator(constraints)
+
+    # two-phase: GA ค้นหาเฉพาะเวลา (ไม่มีห้องใน gene) แล้วจัดห้องด้วย matching ครั้งเดียวตอนจบ
+    if room_mode == "matching":
+        space = TimeSpace(courses, slot_index, constraints)
+    else:
+        space = GeneSpace(courses, slot_index, allow_set, room_type_of, evaluate, constraints)
+    fitness = space.fitness
+    encode = compile_genome_encoder(slot_index)
+
+    # 1) ประชากรเริ่มต้น
+    population = space.initialize(pop_size, seed=seed, cancel_event=cancel_event, dsatur_share=dsatur_share)
+
+    if not population:
+        return {"fitness": float("-inf"), "schedule": [], "seed": seed, "hard_violations": 0,
+                "violations": {"terms": {}, "reward": 0, "contiguity": 0}, "trace": [], "diversity": [],
+                "restarts": [], "archive": []}
+
+    best_overall = None
+    stagnant = 0
+    last_best = None
+    trace = []
+    diversity = []   # [[generation, unique_genomes, mean_hamming, injected], ...]
+    memo = {}        # genome → fitness (ตัวซ้ำ/elite ที่ยกมาไม่ต้องประเมินใหม่)
+    archive = []     # ผลดีที่สุดไม่ซ้ำกัน (อยู่รอดข้าม restart)
+    restarts = []    # generation ที่ restart
+
+    for gen in range(generations):
+        _check_cancel(cancel_event)
+
+        vectors = [encode(ind) for ind in population]
+        unique, mean_hamming = population_diversity(vectors)
+        injected = 0
+        if diversity_threshold > 0 and unique < diversity_threshold * len(population):
+            # เก็บตัวแรกของแต่ละ genome แล้วเติมตัวสุ่มใหม่แทนตัวซ้ำ
+            seen, keep = set(), []
+            for ind, vec in zip(population, vectors):
+                if vec not in seen:
+                    seen.add(vec)
+                    keep.append((ind, vec))
+            fresh = space.initialize(len(population) - len(keep), seed=rng.getrandbits(64), cancel_event=cancel_event)
+            injected = len(fresh)
+            population = [ind for ind, _ in keep] + fresh
+            vectors = [vec for _, vec in keep] + [encode(ind) for ind in fresh]
+        diversity.append([gen, unique, round(mean_hamming, 2), injected])
+
+        scores = {}
+        for ind, vec in zip(population, vectors):
+            if vec not in scores:
+                scores[vec] = memo[vec] if vec in memo else fitness(ind)
+        memo = scores
+        scored = [(scores[vec], ind) for ind, vec in zip(population, vectors)]
+        scored.sort(key=lambda x: x[0], reverse=True)
+        vec_of = {id(ind): vec for ind, vec in zip(population, vectors)}
+        for fit, ind in scored[:archive_size]:
+            _update_archive(archive, archive_size, fit, ind, vec_of[id(ind)])
+
+        log.generation(gen, best=scored[0][0], unique=unique, mean_hamming=round(mean_hamming, 1), injected=injected)
+
+        if (best_overall is None) or (scored[0][0] > best_overall[0]):
+            best_overall = (scored[0][0], [dict(g) for g in scored[0][1]])
+            best_hard = space.hard_violations(best_overall[1])
+            _trace_point(trace, t0, gen, best_overall[0], best_overall[1], best_hard)
+
+        # portfolio: รอบไหนได้ตารางที่ไม่ละเมิดข้อบังคับก่อน ให้สัญญาณทุกรอบหยุด
+        if stop_event is not None:
+            if stop_on_feasible and best_hard == 0:
+                stop_event.set()
+            if stop_event.is_set():
+                break
+
+        if last_best is None or scored[0][0] > last_best:
+            last_best = scored[0][0]; stagnant = 0
+        else:
+            stagnant += 1
+
+        # ค้างนานเกินไป → เก็บ archive ไว้ แล้วสร้างประชากรส่วนใหญ่ใหม่ (ยังอยู่ในงบ generation เดิม)
+        if restart_after and stagnant >= restart_after and gen < generations - 1:
+            population = _restart_population(
+                archive, space, pop_size, restart_mode, restart_strength, rng, mutation_ops, cancel_event=cancel_event,
+            )
+            restarts.append(gen)
+            stagnant = 0
+            log.event("restart", generation=gen, mode=restart_mode, archive=len(archive))
+            continue
+
+        cur_mut = mut_rate * (1.3 if stagnant >= 3 else 1.0)
+
+        new_pop = [scored[i][1] for i in range(min(elite_size, len(scored)))]
+
+        top_k = max(2, int(0.4 * pop_size))
+        parent_pool = [ind for _, ind in scored[:top_k]]
+        rest = [ind for _, ind in scored[top_k:]]
+        rng.shuffle(rest)
+        parent_pool += rest[:max(2, int(0.1 * pop_size))]
+        if not parent_pool:
+            parent_pool = [ind for _, ind in scored]
+
+        while len(new_pop) < pop_size:
+            _check_cancel(cancel_event)
+            p1, p2 = rng.sample(parent_pool, 2)
+            if rng.random() < cx_rate:
+                child = space.crossover(p1, p2, rng, cancel_event=cancel_event)
+            else:
+                child = [dict(g) for g in (p1 if rng.random() < 0.5 else p2)]
+            child = space.mutate(child, cur_mut, rng, cancel_event=cancel_event, operators=mutation_ops)
+            new_pop.append(child)
+
+        population = new_pop
+
+    final_best = max([(fitness(ind), ind) for ind in population], key=lambda x: x[0])
+    if best_overall is None or final_best[0] >= best_overall[0]:
+        best_fitness, best_ind = final_best
+    else:
+        best_fitness, best_ind = best_overall
+
+    best_vec = encode(best_ind)
+
+    # Greedy fill รอบสุดท้าย เพื่ออุดหน่วยที่ยังขาด แล้ว decode (matching: จัดห้องตอนนี้ครั้งเดียว)
+    best_after_fill = space.fill(best_ind, rng, cancel_event=cancel_event)
+    if fitness(best_after_fill) > best_fitness:
+        best_ind = best_after_fill
+    best_ind = space.decode(best_ind)
+    best_fitness = evaluate(best_ind, allow_set, room_type_of)
+    # จุดสุดท้ายของ trace = ผลที่คืนจริงเสมอ (matching: จุดระหว่างทางเป็นค่าประมาณของ TimeSpace
+    # ผลหลังจัดห้องอาจต่ำกว่าจุดก่อนหน้าได้ — ห้ามทิ้ง ไม่งั้น trace จบที่ค่าที่ไม่ตรงกับ best_fitness)
+    if not trace or trace[-1][2] != best_fitness:
+        _trace_point(trace, t0, gen + 1 if generations else 0, best_fitness, best_ind,
+                     count_hard_violations(best_ind, allow_set, room_type_of, constraints))
+
+    # hall of fame: ผลหลัก + ตัวใน archive (เติมที่ขาดแบบเดียวกับผลหลัก) ตัดซ้ำหลังเติม/decode แล้ว
+    # ตัวใน archive ที่เป็น genome เดียวกับผลหลักใช้ผลหลักที่เติมแล้ว (ไม่เติมซ้ำด้วย rng ได้ตารางเกือบซ้ำ)
+    hall = [{"fitness": best_fitness, "schedule": best_ind}]
+    for fit, vec, ind in archive:
+        if vec == best_vec:
+            continue
+        filled = space.fill(ind, rng, cancel_event=cancel_event)
+        schedule = space.decode(filled if fitness(filled) > fit else ind)
+        hall.append({"fitness": evaluate(schedule, allow_set, room_type_of), "schedule": schedule})
+    for e in hall:
+        e["fingerprint"] = genome_fingerprint(e["schedule"])
+        e["hard_violations"] = count_hard_violations(e["schedule"], allow_set, room_type_of, constraints)
+    hall = _hall_of_fame(hall, archive_size)
+    log.event("finish", generation=gen + 1 if generations else 0, best=best_fitness,
+              elapsed=round(perf_counter() - t0, 3), restarts=len(restarts))
+
+    return {
+        "fitness": best_fitness,
+        "schedule": best_ind,
+        "seed": seed,
+        "hard_violations": count_hard_violations(best_ind, allow_set, room_type_of, constraints),
+        "violations": evaluate(best_ind, allow_set, room_type_of, detail=True)[1],
+        "trace": trace,
+        "diversity": diversity,
+        "restarts": restarts,
+        "archive": hall,
+    }
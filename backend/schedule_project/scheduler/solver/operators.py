@@ -0,0 +1,318 @@
+"""
+crossover / mutation (fill, move, swap, kempe, block) และการจัดห้องแบบ matching
+"""
+import random
+from collections import defaultdict
+from datetime import time
+from typing import List, Tuple, Dict, Any
+
+import pandas as pd
+
+from .common import _check_cancel
+from .problem import SlotIndex
+from .placement import _is_unassigned, DAY_ORDER, find_slot_for_gene, is_conflict
+from .fitness import course_key
+
+# ==================== Crossover & Mutation ====================
+
+def crossover(parent1, parent2, allow_set, slot_index: SlotIndex, rng: random.Random, room_type_of, cancel_event=None):
+    """one-point by-course + repair (หา slot ใหม่ถ้าผิด/ชน)"""
+    b1, b2 = defaultdict(list), defaultdict(list)
+    for g in parent1: b1[course_key(g)].append(g)
+    for g in parent2: b2[course_key(g)].append(g)
+
+    keys = dict.fromkeys([*b1, *b2])   # ตามลำดับที่พบ (set ของ str วนตาม hash → seed เดียวกันได้ผลต่างกันข้าม process)
+    child_raw = []
+    for k in keys:
+        pick_from_p1 = rng.random() < 0.5
+        src = b1 if pick_from_p1 else b2
+        if k in src:
+            child_raw.extend([dict(x) for x in src[k]])
+
+    child = []
+    for g in child_raw:
+        if _is_unassigned(g):
+            child.append(g); continue
+
+        gtype = g.get("group_type_id", None)
+        key = (
+            int(gtype) if pd.notna(gtype) else None,
+            g["day_of_week"], g["start_time"], g["stop_time"], g["room"]
+        )
+        if (
+            (gtype is None)
+            or (key not in allow_set)
+            or is_conflict(child, g)
+            or (g.get("room_type_course") and room_type_of.get(g["room"]) != g["room_type_course"])
+        ):
+            slot = find_slot_for_gene(g, slot_index, allow_set, rng, cancel_event=cancel_event)
+            if slot is None:
+                g = {**g, "day_of_week": None, "start_time": None, "stop_time": None, "room": None, "assigned": False}
+            else:
+                g = {**g, **slot}
+                if is_conflict(child, g):
+                    g = {**g, "day_of_week": None, "start_time": None, "stop_time": None, "room": None, "assigned": False}
+        child.append(g)
+
+    return child
+
+def _slot_of(g) -> Tuple[str, time, time]:
+    return (g["day_of_week"], g["start_time"], g["stop_time"])
+
+def _kempe_linked(x, y) -> bool:
+    """สองหน่วยอยู่ slot เดียวกันไม่ได้ (ครู/กลุ่มนักศึกษา/ห้องเดียวกัน)"""
+    return x["teacher"] == y["teacher"] or x["student_group"] == y["student_group"] or x["room"] == y["room"]
+
+def kempe_chain_move(out, slot_index: SlotIndex, rng: random.Random) -> bool:
+    """
+    Kempe chain ระหว่างสอง slot เวลา A, B:
+      เริ่มจากหน่วยสุ่ม u (อยู่ A) สุ่ม B จาก slot ที่ group ของ u ใช้ได้
+      ขยาย chain เป็น connected component ของหน่วยใน A ∪ B ที่ชนกัน (ครู/กลุ่ม/ห้อง) แล้วสลับ A↔B ทั้ง chain
+    หน่วยที่ไม่ชนกันก่อนสลับจะไม่ชนกันหลังสลับ — ยกเลิกถ้ามีหน่วยไปลง slot ที่ไม่อนุญาต/ห้องถูกจอง
+    แก้ out ในที่ คืน True ถ้าสลับสำเร็จ
+    """
+    assigned = [i for i, g in enumerate(out) if not _is_unassigned(g)]
+    if not assigned:
+        return False
+    start = rng.choice(assigned)
+    a = _slot_of(out[start])
+    choices = [sid for sid in slot_index.group_slot_ids(out[start].get("group_type_id"))
+               if slot_index.slots[sid] != a]
+    if not choices:
+        return False
+    b = slot_index.slots[rng.choice(choices)]
+
+    in_slot = {a: [], b: []}
+    for i in assigned:
+        sl = _slot_of(out[i])
+        if sl in in_slot:
+            in_slot[sl].append(i)
+
+    chain, stack = {start}, [start]
+    while stack:
+        i = stack.pop()
+        other = b if _slot_of(out[i]) == a else a
+        for j in in_slot[other]:
+            if j not in chain and _kempe_linked(out[i], out[j]):
+                chain.add(j)
+                stack.append(j)
+
+    moved = {}
+    for i in chain:
+        g = out[i]
+        day, st, et = b if _slot_of(g) == a else a
+        if not slot_index.is_allowed(g.get("group_type_id"), day, st, et, g["room"]):
+            return False
+        moved[i] = {**g, "day_of_week": day, "start_time": st, "stop_time": et}
+    for i, g in moved.items():
+        out[i] = g
+    return True
+
+def _consecutive_runs(slot_index: SlotIndex, group_id, length: int) -> List[List[int]]:
+    """ชุด slot id ที่ต่อกัน (stop == start ถัดไป วันเดียวกัน) ยาว length ที่ group นี้ใช้ได้"""
+    sids = sorted(slot_index.group_slot_ids(group_id),
+                  key=lambda sid: (DAY_ORDER.get(slot_index.slots[sid][0], 99), slot_index.slots[sid][1]))
+    runs = []
+    for i in range(len(sids) - length + 1):
+        window = sids[i:i + length]
+        slots = [slot_index.slots[sid] for sid in window]
+        if all(x[0] == y[0] and x[2] == y[1] for x, y in zip(slots, slots[1:])):
+            runs.append(window)
+    return runs
+
+def block_move(out, slot_index: SlotIndex, rng: random.Random, max_tries: int = 20) -> bool:
+    """
+    ย้ายทุกหน่วยของวิชา (course_key เดียวกัน) ที่อยู่วันเดียวกันไปเป็นก้อนต่อเนื่องใหม่ ห้องเดียวกันทั้งก้อน
+    (รักษา contiguity ที่ MOVE ทีละหน่วยทำลาย) แก้ out ในที่ คืน True ถ้าย้ายสำเร็จ
+    """
+    blocks = defaultdict(list)
+    for i, g in enumerate(out):
+        if not _is_unassigned(g):
+            blocks[(course_key(g), g["day_of_week"])].append(i)
+    if not blocks:
+        return False
+    block = sorted(rng.choice(list(blocks.values())), key=lambda i: out[i]["start_time"])
+    g0 = out[block[0]]
+    runs = _consecutive_runs(slot_index, g0.get("group_type_id"), len(block))
+    if not runs:
+        return False
+
+    in_block = set(block)
+    busy_t, busy_s, busy_r = set(), set(), set()
+    for i, g in enumerate(out):
+        if i in in_block or _is_unassigned(g):
+            continue
+        sl = _slot_of(g)
+        busy_t.add((g["teacher"], *sl)); busy_s.add((g["student_group"], *sl)); busy_r.add((g["room"], *sl))
+
+    pool = slot_index.compatible_rooms(g0.get("room_type_course"))
+    if not pool:
+        return False
+    for _ in range(max_tries):
+        run = rng.choice(runs)
+        slots = [slot_index.slots[sid] for sid in run]
+        if any((g0["teacher"], *sl) in busy_t or (g0["student_group"], *sl) in busy_s for sl in slots):
+            continue
+        offset = rng.randrange(len(pool))
+        room = None
+        for k in range(len(pool)):
+            cand = pool[(offset + k) % len(pool)]
+            if all(slot_index.is_room_free(cand, sid) and (cand, *sl) not in busy_r for sid, sl in zip(run, slots)):
+                room = cand
+                break
+        if room is None:
+            continue
+        for i, (day, st, et) in zip(block, slots):
+            out[i] = {**out[i], "day_of_week": day, "start_time": st, "stop_time": et, "room": room}
+        return True
+    return False
+
+def swap_move(individual, allow_set, rng: random.Random) -> bool:
+    """
+    สลับ slot+ห้องของสองหน่วยที่วางแล้ว (แก้ individual ในที่)
+    คืน False ถ้าไม่ได้สลับ (สุ่มได้หน่วยที่ยังไม่วาง / ผิด group_allow / ชน) → individual ไม่เปลี่ยน
+    """
+    if len(individual) < 2:
+        return False
+    i, j = rng.sample(range(len(individual)), 2)
+    gi, gj = individual[i], individual[j]
+    if _is_unassigned(gi) or _is_unassigned(gj):
+        return False
+    gi_swapped = {**gi, "day_of_week": gj["day_of_week"], "start_time": gj["start_time"], "stop_time": gj["stop_time"], "room": gj["room"]}
+    gj_swapped = {**gj, "day_of_week": gi["day_of_week"], "start_time": gi["start_time"], "stop_time": gi["stop_time"], "room": gi["room"]}
+
+    def allow_ok(g):
+        gt = g.get("group_type_id", None)
+        k = (int(gt) if pd.notna(gt) else None, g["day_of_week"], g["start_time"], g["stop_time"], g["room"])
+        return (gt is not None) and (k in allow_set)
+
+    if not (allow_ok(gi_swapped) and allow_ok(gj_swapped)):
+        return False
+    rest = [x for k, x in enumerate(individual) if k not in (i, j)]
+    if is_conflict(rest, gi_swapped) or is_conflict(rest + [gi_swapped], gj_swapped):
+        return False
+    individual[i] = gi_swapped
+    individual[j] = gj_swapped
+    return True
+
+# operator ของ mutate ที่เลือกเปิดได้ (ตามลำดับที่ทำ)
+MUTATION_OPERATORS = ("fill", "move", "swap", "kempe", "block")
+
+def mutate(
+    individual, allow_set, slot_index: SlotIndex, mut_rate: float, rng: random.Random, room_type_of,
+    cancel_event=None, operators=MUTATION_OPERATORS,
+):
+    """
+    FILL (เติม unassigned) → MOVE → SWAP → KEMPE (สลับ Kempe chain ระหว่างสอง slot)
+    → BLOCK (ย้ายก้อนวิชาในวันเดียวกันทั้งก้อน) — เลือกเฉพาะที่อยู่ใน operators
+    """
+    if not individual:
+        return individual
+
+    out = [dict(g) for g in individual]
+
+    # (A) FILL
+    for i, g in enumerate(out):
+        if "fill" not in operators:
+            break
+        if _is_unassigned(g):
+            if rng.random() < max(mut_rate, 0.5):
+                _check_cancel(cancel_event)
+                slot = find_slot_for_gene(g, slot_index, allow_set, rng, cancel_event=cancel_event)
+                if slot:
+                    newg = {**g, **slot, "assigned": True}
+                    if g.get("room_type_course") and room_type_of.get(newg["room"]) != g["room_type_course"]:
+                        continue
+                    if not is_conflict([x for j,x in enumerate(out) if j!=i], newg):
+                        out[i] = newg
+
+    # (B) MOVE
+    for i, g in enumerate(out):
+        if "move" not in operators:
+            break
+        if (not _is_unassigned(g)) and rng.random() < mut_rate:
+            _check_cancel(cancel_event)
+            slot = find_slot_for_gene(g, slot_index, allow_set, rng, cancel_event=cancel_event)
+            if slot:
+                newg = {**g, **slot}
+                if g.get("room_type_course") and room_type_of.get(newg["room"]) != g["room_type_course"]:
+                    continue
+                if not is_conflict([x for j,x in enumerate(out) if j!=i], newg):
+                    out[i] = newg
+
+    # (C) SWAP
+    if "swap" in operators and rng.random() < mut_rate:
+        swap_move(out, allow_set, rng)
+
+    # (D) KEMPE
+    if "kempe" in operators and rng.random() < mut_rate:
+        _check_cancel(cancel_event)
+        kempe_chain_move(out, slot_index, rng)
+
+    # (E) BLOCK
+    if "block" in operators and rng.random() < mut_rate:
+        _check_cancel(cancel_event)
+        block_move(out, slot_index, rng)
+
+    return out
+
+# ==================== Room matching (two-phase) ====================
+
+def _match_rooms_at_slot(units: List[Dict[str, Any]], sid: int, slot_index: SlotIndex) -> List[str | None]:
+    """
+    maximum bipartite matching (Kuhn / augmenting path) ระหว่างคาบใน slot เดียวกัน กับห้องที่
+    ประเภทตรงกันและไม่ถูกจองใน preschedule; ลองห้องเดิมของคาบก่อนเพื่อไม่ให้ห้องเปลี่ยนโดยไม่จำเป็น
+    คืนห้องต่อคาบ (None = จับคู่ไม่ได้)
+    """
+    room_of_unit: List[str | None] = [None] * len(units)
+    unit_of_room: Dict[str, int] = {}
+
+    def candidates(u):
+        cur = units[u].get("room")
+        pool = slot_index.compatible_rooms(units[u].get("room_type_course"))
+        if cur is not None and cur in pool:
+            yield cur
+        for room in pool:
+            if room != cur:
+                yield room
+
+    def augment(u, seen) -> bool:
+        for room in candidates(u):
+            if room in seen or not slot_index.is_room_free(room, sid):
+                continue
+            seen.add(room)
+            owner = unit_of_room.get(room)
+            if owner is None or augment(owner, seen):
+                unit_of_room[room] = u
+                room_of_unit[u] = room
+                return True
+        return False
+
+    for u in range(len(units)):
+        augment(u, set())
+    return room_of_unit
+
+def assign_rooms_by_matching(individual: List[Dict[str, Any]], slot_index: SlotIndex) -> List[Dict[str, Any]]:
+    """
+    เฟสที่ 2 ของ two-phase: เวลามาจากเฟส 1 (timephase) ส่วนห้องจัดทีละ slot ด้วย matching ครั้งเดียวตอนจบ
+      - ไม่มีห้องชนกันแน่นอน และห้องตรงประเภท (ถ้ามีห้องประเภทนั้น)
+      - คาบที่จับคู่ห้องไม่ได้ (slot เกินความจุ) → unassigned
+    """
+    out = [dict(g) for g in individual]
+    by_slot = defaultdict(list)
+    for i, g in enumerate(out):
+        if _is_unassigned(g):
+            continue
+        sid = slot_index.slot_id_of.get((g["day_of_week"], g["start_time"], g["stop_time"]))
+        if sid is None:
+            continue
+        by_slot[sid].append(i)
+
+    for sid, idxs in by_slot.items():
+        rooms = _match_rooms_at_slot([out[i] for i in idxs], sid, slot_index)
+        for i, room in zip(idxs, rooms):
+            if room is None:
+                out[i].update({"day_of_week": None, "start_time": None, "stop_time": None, "room": None, "assigned": False})
+            else:
+                out[i]["room"] = room
+    return out
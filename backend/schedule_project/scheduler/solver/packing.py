@@ -0,0 +1,93 @@
+"""
+แถวผลลัพธ์ ↔ blob บีบอัด (result_blob ของ GenerationRun)
+"""
+import json
+import struct
+import sys
+import zlib
+from array import array
+from datetime import time
+from typing import List, Dict, Any
+
+from .common import _persist_value
+from .placement import _is_unassigned
+
+# คอลัมน์ของแถวผลลัพธ์ (= คอลัมน์ของ GeneratedSchedule ที่มาจากผล GA, ใช้เทียบ diff)
+PERSIST_FIELDS = (
+    "subject_code", "subject_name", "teacher", "student_group", "section", "type",
+    "hours", "day_of_week", "start_time", "stop_time", "room",
+)
+
+def _row_values(row) -> tuple:
+    """แถวผล GA → tuple ตามลำดับ PERSIST_FIELDS"""
+    return (
+        _persist_value(row["subject_code"]),
+        _persist_value(row["subject_name"]),
+        _persist_value(row.get("teacher")),
+        _persist_value(row.get("student_group")),
+        _persist_value(row.get("section")),
+        _persist_value(row.get("type")),
+        _persist_value(row.get("hours", 0)),
+        row["day_of_week"],
+        row["start_time"],
+        row["stop_time"],
+        _persist_value(row.get("room")),
+    )
+
+# รูปแบบ result_blob ของ GenerationRun:
+#   zlib( <u32 ความยาว header> + header JSON {"v", "fields", "values"} + uint32[] little-endian )
+#   ค่าไม่ซ้ำทุกคอลัมน์อยู่ใน "values" ครั้งเดียว แต่ละแถว = index len(PERSIST_FIELDS) ตัว
+RESULT_BLOB_VERSION = 1
+_TIME_FIELDS = {PERSIST_FIELDS.index("start_time"), PERSIST_FIELDS.index("stop_time")}
+
+def _blob_value(v):
+    if isinstance(v, time):
+        return v.isoformat()
+    return v.item() if hasattr(v, "item") else v   # numpy scalar → python
+
+def pack_schedule(schedule_rows) -> bytes:
+    """แถวที่วางแล้ว → blob บีบอัด (แถว unassigned ไม่เก็บ)"""
+    values: List[Any] = []
+    value_id: Dict[Any, int] = {}
+    flat = array("I")
+    for row in schedule_rows:
+        if _is_unassigned(row):
+            continue
+        for v in _row_values(row):
+            v = _blob_value(v)
+            vid = value_id.get(v)
+            if vid is None:
+                vid = value_id[v] = len(values)
+                values.append(v)
+            flat.append(vid)
+    if sys.byteorder == "big":
+        flat.byteswap()
+    header = json.dumps(
+        {"v": RESULT_BLOB_VERSION, "fields": list(PERSIST_FIELDS), "values": values},
+        ensure_ascii=False, separators=(",", ":"),
+    ).encode("utf-8")
+    return zlib.compress(struct.pack("<I", len(header)) + header + flat.tobytes(), 9)
+
+def unpack_schedule(blob) -> List[Dict[str, Any]]:
+    """blob จาก pack_schedule → แถวตาม PERSIST_FIELDS (ใช้กับ save_ga_result ได้ทันที)"""
+    if not blob:
+        return []
+    raw = zlib.decompress(bytes(blob))
+    (n,) = struct.unpack_from("<I", raw)
+    header = json.loads(raw[4:4 + n].decode("utf-8"))
+    if header.get("v") != RESULT_BLOB_VERSION or tuple(header["fields"]) != PERSIST_FIELDS:
+        raise ValueError(f"result_blob ไม่รองรับ (version={header.get('v')})")
+    values = header["values"]
+    flat = array("I")
+    flat.frombytes(raw[4 + n:])
+    if sys.byteorder == "big":
+        flat.byteswap()
+
+    width = len(PERSIST_FIELDS)
+    rows = []
+    for i in range(0, len(flat), width):
+        vals = [values[vid] for vid in flat[i:i + width]]
+        for j in _TIME_FIELDS:
+            vals[j] = time.fromisoformat(vals[j])
+        rows.append({**dict(zip(PERSIST_FIELDS, vals)), "assigned": True})
+    return rows
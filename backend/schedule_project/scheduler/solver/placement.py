@@ -0,0 +1,225 @@
+"""
+ตัวช่วยวาง gene ลง slot/ห้อง, ลำดับวัน-เวลา และคะแนนความต่อเนื่องของคาบ
+"""
+import random
+from collections import defaultdict
+from datetime import time
+from typing import List, Tuple, Dict, Any
+
+import pandas as pd
+
+from .common import _check_cancel
+from .problem import SlotIndex
+
+def _greedy_fill_unassigned(
+    individual: List[Dict[str, Any]],
+    slot_index: SlotIndex,
+    allow_set,
+    room_type_of: Dict[str, str] | None,
+    rng: random.Random,
+    cancel_event=None,
+):
+    """
+    เติมคาบที่ยัง unassigned แบบง่าย: ลองหา slot ถูกต้องที่ยังไม่ชนแล้ววางลงไป
+    """
+    if not individual:
+        return individual
+
+    out = [dict(g) for g in individual]
+
+    # ทำชุด busy จากคาบที่วางแล้ว
+    teacher_busy, student_busy, room_busy = set(), set(), set()
+    for g in out:
+        if _is_unassigned(g):
+            continue
+        t_key = (g["teacher"], g["day_of_week"], g["start_time"], g["stop_time"])
+        s_key = (g["student_group"], g["day_of_week"], g["start_time"], g["stop_time"])
+        r_key = (g["room"], g["day_of_week"], g["start_time"], g["stop_time"])
+        teacher_busy.add(t_key); student_busy.add(s_key); room_busy.add(r_key)
+
+    # เติมทีละตัว
+    for i, g in enumerate(out):
+        if not _is_unassigned(g):
+            continue
+        _check_cancel(cancel_event)
+        slot = find_slot_for_gene(g, slot_index, allow_set, rng, max_tries=600, cancel_event=cancel_event)
+        if not slot:
+            continue
+        newg = {**g, **slot, "assigned": True}
+
+        # เช็ค room type ถ้าจำเป็น
+        if room_type_of and g.get("room_type_course") and room_type_of.get(newg["room"]) != g["room_type_course"]:
+            continue
+
+        t_key = (newg["teacher"], newg["day_of_week"], newg["start_time"], newg["stop_time"])
+        s_key = (newg["student_group"], newg["day_of_week"], newg["start_time"], newg["stop_time"])
+        r_key = (newg["room"], newg["day_of_week"], newg["start_time"], newg["stop_time"])
+        if t_key in teacher_busy or s_key in student_busy or r_key in room_busy:
+            continue
+
+        out[i] = newg
+        teacher_busy.add(t_key); student_busy.add(s_key); room_busy.add(r_key)
+
+    return out
+
+# ==================== GA Helpers ====================
+
+def make_allow_set(slot_index: SlotIndex):
+    """allow_set = SlotIndex เอง (รองรับ `key in allow_set` โดยไม่ต้องสร้าง set ของทุก group×slot×room)"""
+    return slot_index
+
+def is_conflict(existing_rows, g):
+    """ชนไหม? (ครู/นักศึกษา/ห้อง ซ้อนเวลาเดียวกัน)"""
+    t = (g["teacher"], g["day_of_week"], g["start_time"], g["stop_time"])
+    s = (g["student_group"], g["day_of_week"], g["start_time"], g["stop_time"])
+    r = (g["room"], g["day_of_week"], g["start_time"], g["stop_time"])
+    for x in existing_rows:
+        if (x["teacher"], x["day_of_week"], x["start_time"], x["stop_time"]) == t: return True
+        if (x["student_group"], x["day_of_week"], x["start_time"], x["stop_time"]) == s: return True
+        if (x["room"], x["day_of_week"], x["start_time"], x["stop_time"]) == r: return True
+    return False
+
+def _is_unassigned(g: Dict[str, Any]) -> bool:
+    """gene ที่ยังไม่วาง (ไม่มีวัน/เวลา/ห้อง หรือ flagged)"""
+    return (not g.get("assigned")) or any(
+        g.get(k) is None for k in ("day_of_week","start_time","stop_time","room")
+    )
+
+def _make_unassigned_gene(base_info: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "subject_code": base_info["sub_code"],
+        "subject_name": base_info["sub_name"],
+        "teacher": base_info["teacher"],
+        "student_group": base_info["student_group"],
+        "section": base_info["section"],
+        "type": base_info["ctype"],
+        "hours": 1,
+        "day_of_week": None,
+        "start_time": None,
+        "stop_time": None,
+        "room": None,
+        "group_type_id": base_info["gtype_id"],
+        "room_type_course": base_info["room_type"],
+        "unit_idx": base_info["unit_idx"],
+        "unit_total": base_info["unit_total"],
+        "course_id": base_info.get("course_id"),
+        "assigned": False,
+    }
+
+def find_slot_for_gene(
+    gene, slot_index: SlotIndex, allow_set, rng: random.Random, max_tries=300, cancel_event=None
+):
+    """
+    หา slot ที่ถูกต้องสำหรับ gene (สุ่ม slot ของ group ที่ยังมีห้องว่าง แล้วสุ่มห้องจากห้องที่ว่างใน slot นั้น):
+      - group_allow: (group_type_id, day, start, stop, room) ต้องอยู่ใน allow_set
+      - ห้องที่ถูกจองใน preschedule ไม่ถูกสุ่มเลย — มีคู่ (slot, ห้อง) ว่างอยู่ก็ไม่หลุดเป็น None เพราะสุ่มไม่โดน
+      - ไม่ชน (ผู้เรียกจะเช็คเองตอน append)
+      - ไม่บังคับ room_type ที่นี่ (ปล่อยไปลงโทษใน fitness)
+    """
+    gid = gene.get("group_type_id", None)
+    if pd.isna(gid):
+        return None
+    sids = [sid for sid in slot_index.group_slot_ids(gid) if slot_index.free_rooms_at(sid) > 0]
+    if not sids:
+        return None
+
+    for _ in range(max_tries):
+        _check_cancel(cancel_event)
+        sid = rng.choice(sids)
+        day, st, et = slot_index.slots[sid]
+        room = rng.choice(slot_index.free_rooms(sid))
+        if (int(gid), day, st, et, room) in allow_set:
+            return {
+                "day_of_week": day,
+                "start_time": st,
+                "stop_time": et,
+                "room": room,
+                "assigned": True,
+            }
+    return None
+
+# ===== Day/Time ordering helpers (for Theory→Lab order) =====
+DAY_ORDER = {
+    "จันทร์": 1, "อังคาร": 2, "พุธ": 3, "พฤหัสบดี": 4, "ศุกร์": 5, "เสาร์": 6, "อาทิตย์": 7,
+    "Mon": 1, "Tue": 2, "Wed": 3, "Thu": 4, "Fri": 5, "Sat": 6, "Sun": 7,
+}
+
+def _slot_order_key(g: Dict[str, Any]) -> Tuple[int, time]:
+    """แปลง (day, start_time) ให้เรียงได้; unassigned จะไปท้ายสุด"""
+    d = g.get("day_of_week")
+    st = g.get("start_time")
+    if d is None or st is None:
+        return (99, time(23, 59))
+    return (DAY_ORDER.get(str(d).strip(), 99), st)
+
+# ===== Contiguity scoring (same-day back-to-back) =====
+# ใช้ “ต่อชนิด” (type) + “วันเดียวกัน” ภายในคีย์เดียวกัน (subject, section, teacher, group)
+CONTIG_ADJACENT_BONUS = 50      # 70 ต่อ "คู่คาบที่ติดกัน"
+CONTIG_GAP_PENALTY     = 30      # 70 ต่อ "ช่องว่าง" ระหว่างคาบในวันเดียวกัน
+CONTIG_SEGMENT_PENALTY = 20       # 50 ต่อก้อน (segment) ที่เพิ่มในวันเดียวกัน
+
+REQUIRE_SAME_ROOM_FOR_CONTIG = False  # True = ต้องอยู่ห้องเดียวกันถึงจะถือว่าติดกัน
+
+def _contiguity_score(
+    individual: List[Dict[str, Any]],
+    adjacent_bonus: int = CONTIG_ADJACENT_BONUS,
+    gap_penalty: int = CONTIG_GAP_PENALTY,
+    segment_penalty: int = CONTIG_SEGMENT_PENALTY,
+    same_room: bool = REQUIRE_SAME_ROOM_FOR_CONTIG,
+) -> int:
+    """
+    ให้คะแนนความต่อเนื่องรายวิชา/ประเภท ใน 'วันเดียวกัน'
+    group key = (subject_code, section, teacher, student_group, type, day_of_week)
+    - คิดเฉพาะคาบที่ assigned ครบ (day/start/stop/room)
+    - ติดกัน (back-to-back) ได้โบนัส
+    - มีช่องว่าง (gap) ถูกหักคะแนน
+    - หากหนึ่งวันถูกแยกเป็นหลายก้อน (segments) จะโดนหักเพิ่มตามจำนวนก้อน-1
+    """
+    assigned = [
+        g for g in individual
+        if not (
+            (not g.get("assigned"))
+            or g.get("day_of_week") is None
+            or g.get("start_time") is None
+            or g.get("stop_time") is None
+            or g.get("room") is None
+        )
+    ]
+    if not assigned:
+        return 0
+
+    by_key: Dict[Tuple, List[Dict[str, Any]]] = defaultdict(list)
+    for g in assigned:
+        key = (
+            g["subject_code"],
+            g["section"],
+            g["teacher"],
+            g["student_group"],
+            str(g.get("type","")).strip().lower(),
+            g["day_of_week"],
+        )
+        by_key[key].append(g)
+
+    total = 0
+    for key, genes in by_key.items():
+        genes = sorted(genes, key=lambda x: x["start_time"])
+        if len(genes) <= 1:
+            continue
+
+        segments = 1
+        for i in range(len(genes)-1):
+            cur, nxt = genes[i], genes[i+1]
+            same_room_ok = (cur["room"] == nxt["room"]) if same_room else True
+            if cur["stop_time"] == nxt["start_time"] and same_room_ok:
+                total += adjacent_bonus
+            elif cur["stop_time"] < nxt["start_time"]:
+                total -= gap_penalty
+                segments += 1
+            else:
+                # overlap ไม่ให้โบนัส/โทษเพิ่ม (มีบทลงโทษจากกฎ conflict อยู่แล้ว)
+                pass
+
+        if segments > 1:
+            total -= segment_penalty * (segments - 1)
+
+    return total
@@ -0,0 +1,239 @@
+"""
+สร้างประชากรเริ่มต้น (สุ่มแบบกระจาย + DSatur)
+"""
+import heapq
+import random
+from collections import defaultdict
+from typing import List, Dict, Any
+
+import pandas as pd
+
+from .common import _check_cancel, _persist_value
+from .problem import SlotIndex
+from .placement import _make_unassigned_gene
+
+# ================= Initialize (diverse & partial) ==============
+
+def _unit_base_info(gkey, df_units) -> Dict[str, Any]:
+    (sub_code, sub_name, section, teacher, student_group, room_type, gtype_id, ctype) = gkey
+    return {
+        "sub_code": sub_code, "sub_name": sub_name, "section": section,
+        "teacher": teacher, "student_group": student_group, "room_type": room_type,
+        "gtype_id": gtype_id, "ctype": ctype,
+        "unit_idx": int(df_units.iloc[0].get("unit_idx", 1)),
+        "unit_total": int(df_units.iloc[0].get("unit_total", len(df_units))),
+    }
+
+def _unit_infos(gkey, df_units) -> List[Dict[str, Any]]:
+    """ข้อมูลรายหน่วยของกลุ่ม (ตามลำดับแถว): id วิชา + unit_idx ของแถวนั้นเอง ใช้ระบุหน่วยให้คงที่ข้ามรอบ"""
+    base = _unit_base_info(gkey, df_units)
+    ids = df_units["id"].tolist() if "id" in df_units else [None] * len(df_units)
+    idxs = df_units["unit_idx"].tolist() if "unit_idx" in df_units else range(1, len(df_units) + 1)
+    return [{**base, "course_id": _persist_value(c), "unit_idx": int(i)} for c, i in zip(ids, idxs)]
+
+def _make_assigned_gene(base_info: Dict[str, Any], day, st, et, room) -> Dict[str, Any]:
+    return {
+        **_make_unassigned_gene(base_info),
+        "day_of_week": day,
+        "start_time": st,
+        "stop_time": et,
+        "room": room,
+        "assigned": True,
+    }
+
+def dsatur_individual(grouped_units, slot_index: SlotIndex, rng: random.Random, cancel_event=None):
+    """
+    สร้าง individual แบบ constructive ด้วย DSatur บน conflict graph:
+      - node = หน่วยชั่วโมง, edge = หน่วยที่ครูเดียวกันหรือกลุ่มนักศึกษาเดียวกัน (อยู่ slot เดียวกันไม่ได้)
+      - เลือกหน่วยที่ saturation สูงสุดก่อน (จำนวน slot ต่างกันที่เพื่อนบ้านใช้ไปแล้ว)
+        เสมอกันดู degree มากก่อน แล้วดูจำนวน slot ที่อนุญาตน้อยก่อน ที่เหลือสุ่ม
+      - วางลง slot ที่อนุญาต + ครู/กลุ่มยังว่าง + มีห้องว่าง (ห้องตรงประเภทก่อน) วางไม่ได้ = unassigned
+    saturation อัปเดตเฉพาะเพื่อนบ้านของหน่วยที่เพิ่งวาง (heap + ทิ้ง entry เก่า) ไม่ต้องไล่ทุก node ทุกรอบ
+    """
+    units: List[Dict[str, Any]] = []
+    for gkey, df_units in grouped_units:
+        units.extend(_unit_infos(gkey, df_units))
+    if not units:
+        return []
+
+    def _key(v):
+        v = _persist_value(v)
+        return None if v is None or str(v).strip() == "" else v
+
+    teacher_of = [_key(u["teacher"]) for u in units]
+    group_of = [_key(u["student_group"]) for u in units]
+    by_teacher, by_group = defaultdict(list), defaultdict(list)
+    for i in range(len(units)):
+        if teacher_of[i] is not None:
+            by_teacher[teacher_of[i]].append(i)
+        if group_of[i] is not None:
+            by_group[group_of[i]].append(i)
+
+    def neighbours(i):
+        return (by_teacher[teacher_of[i]] if teacher_of[i] is not None else []) + \
+               (by_group[group_of[i]] if group_of[i] is not None else [])
+
+    degree = [len(neighbours(i)) for i in range(len(units))]
+    allowed = [len(slot_index.group_slot_ids(u["gtype_id"])) for u in units]
+    neighbour_slots = [set() for _ in units]
+    heap = [(0, -degree[i], allowed[i], rng.random(), i) for i in range(len(units))]
+    heapq.heapify(heap)
+
+    done = [False] * len(units)
+    teacher_used, group_used = defaultdict(set), defaultdict(set)
+    room_busy = set()
+    individual = []
+    while heap:
+        neg_sat, _, _, _, i = heapq.heappop(heap)
+        if done[i] or -neg_sat != len(neighbour_slots[i]):
+            continue
+        done[i] = True
+        _check_cancel(cancel_event)
+        u = units[i]
+
+        sids = [sid for sid in slot_index.group_slot_ids(u["gtype_id"])
+                if sid not in teacher_used[teacher_of[i]] and sid not in group_used[group_of[i]]]
+        rng.shuffle(sids)
+        placed = None
+        for pool in (slot_index.rooms_of_type(u["room_type"]), slot_index.rooms):
+            if not pool:
+                continue
+            for sid in sids:
+                offset = rng.randrange(len(pool))
+                for k in range(len(pool)):
+                    room = pool[(offset + k) % len(pool)]
+                    if (room, sid) not in room_busy and slot_index.is_room_free(room, sid):
+                        placed = (sid, room)
+                        break
+                if placed:
+                    break
+            if placed:
+                break
+
+        if placed is None:
+            individual.append(_make_unassigned_gene(u))
+            continue
+
+        sid, room = placed
+        room_busy.add((room, sid))
+        if teacher_of[i] is not None:
+            teacher_used[teacher_of[i]].add(sid)
+        if group_of[i] is not None:
+            group_used[group_of[i]].add(sid)
+        individual.append(_make_assigned_gene(u, *slot_index.slots[sid], room))
+
+        for j in neighbours(i):
+            if not done[j] and sid not in neighbour_slots[j]:
+                neighbour_slots[j].add(sid)
+                heapq.heappush(heap, (-len(neighbour_slots[j]), -degree[j], allowed[j], rng.random(), j))
+    return individual
+
+def initialize_population(
+    courses: pd.DataFrame,
+    slot_index: SlotIndex,
+    pop_size,
+    seed=42,
+    cancel_event=None,
+    dsatur_share: float = 0.0,
+):
+    """
+    ประชากรเริ่มต้น (ยอม partial + unassigned):
+      - จัดเป็นก้อนตาม subject+section+teacher+group+type+room_type+group_type
+      - พยายามวางเท่าที่ทำได้ (หลีกเลี่ยงชน)
+      - ชั่วโมงที่เหลือ สร้าง gene 'unassigned' ไว้ให้ GA ซ่อม
+      - soft room_type filter: 70% ใช้ตรงประเภท, 30% ปล่อยหลวมเพื่อกระจาย
+      - (ปรับเล็กน้อย) ดันกลุ่มที่ type="theory" มาก่อน เพื่อช่วยโอกาส Theory→Lab
+      - เดิน slot ของ group แล้วเลือกห้องว่างจาก SlotIndex (ไม่ต้องคัดลอกตาราง slot×ห้อง)
+      - dsatur_share: สัดส่วนประชากรที่สร้างด้วย DSatur (หน่วยที่ติดข้อจำกัดมากวางก่อน) ที่เหลือสุ่มตามเดิม
+    """
+    base_rng = random.Random(seed)
+    population = []
+
+    group_cols = [
+        "subject_code_course","subject_name_course","section_course",
+        "teacher_name_course","student_group_name_course","room_type_course",
+        "group_type_id","type",
+    ]
+
+    # จัดกลุ่มครั้งเดียว (ทุก individual ใช้ก้อนเดียวกัน ต่างกันแค่ลำดับ)
+    grouped_base = [] if courses.empty else list(
+        courses.reset_index(drop=True).groupby(group_cols, dropna=False)
+    )
+
+    n_dsatur = min(pop_size, max(1, round(pop_size * dsatur_share))) if dsatur_share > 0 else 0
+
+    for member in range(pop_size):
+        rng = random.Random(base_rng.getrandbits(64))
+        _check_cancel(cancel_event)
+        if member < n_dsatur:
+            population.append(dsatur_individual(grouped_base, slot_index, rng, cancel_event=cancel_event))
+            continue
+        individual = []
+
+        teacher_busy, student_busy, room_busy = set(), set(), set()
+
+        if not grouped_base:
+            population.append(individual); continue
+
+        grouped = list(grouped_base)
+        rng.shuffle(grouped)
+
+        # ดัน theory ก่อน (ยังสุ่มลำดับกลุ่มอยู่ แต่ให้ priority เล็กน้อย)
+        def _key_theory_first(item):
+            gkey, _df = item
+            _type = str(gkey[-1]).strip().lower()
+            return 0 if _type == "theory" else 1
+        grouped.sort(key=_key_theory_first)
+
+        for gkey, df_units in grouped:
+            _check_cancel(cancel_event)
+            (sub_code, sub_name, section, teacher, student_group, room_type, gtype_id, ctype) = gkey
+            hours_needed = len(df_units)
+            infos = _unit_infos(gkey, df_units)
+
+            sids = slot_index.group_slot_ids(gtype_id)
+            if not sids or not slot_index.rooms:
+                individual.extend(_make_unassigned_gene(u) for u in infos)
+                continue
+
+            strict_rooms = slot_index.rooms_of_type(room_type)
+            if strict_rooms and rng.random() < 0.7:
+                room_pool = strict_rooms
+            else:
+                room_pool = slot_index.rooms
+
+            sids = list(sids)
+            rng.shuffle(sids)
+
+            placed_rows = []
+            for sid in sids:
+                if len(placed_rows) >= hours_needed:
+                    break
+                _check_cancel(cancel_event)
+                day, st, et = slot_index.slots[sid]
+                t_key = (teacher, day, st, et)
+                s_key = (student_group, day, st, et)
+                if (t_key in teacher_busy) or (s_key in student_busy):
+                    continue
+
+                # เริ่มจากห้องสุ่มแล้ววนหาห้องแรกที่ว่าง
+                offset = rng.randrange(len(room_pool))
+                room = None
+                for k in range(len(room_pool)):
+                    cand = room_pool[(offset + k) % len(room_pool)]
+                    if (cand, day, st, et) not in room_busy and slot_index.is_room_free(cand, sid):
+                        room = cand
+                        break
+                if room is None:
+                    continue
+
+                placed_rows.append(_make_assigned_gene(infos[len(placed_rows)], day, st, et, room))
+                teacher_busy.add(t_key); student_busy.add(s_key); room_busy.add((room, day, st, et))
+
+            individual.extend(placed_rows)
+
+            individual.extend(_make_unassigned_gene(u) for u in infos[len(placed_rows):])
+
+        population.append(individual)
+
+    return population
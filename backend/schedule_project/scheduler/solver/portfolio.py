@@ -0,0 +1,191 @@
+"""
+engine ที่เลือกได้ + portfolio หลาย seed ขนานกันใน worker process
+"""
+import os
+import random
+import threading
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from functools import partial
+from typing import List, Dict, Any
+
+from .common import GenerationCancelled
+from .operators import MUTATION_OPERATORS
+from .ga import _hall_of_fame, run_genetic_algorithm
+from .sa import run_simulated_annealing
+
+# ==================== Portfolio (multi-seed) =======================
+
+# พารามิเตอร์ GA ค่าเริ่มต้น (ใช้ทั้งรันเดี่ยวและ portfolio)
+DEFAULT_GA_PARAMS = {
+    "generations": 200,
+    "pop_size": 50,
+    "elite_size": 2,
+    "cx_rate": 0.1,
+    "mut_rate": 0.1,
+    "dsatur_share": 0.2,
+    "diversity_threshold": 0.5,
+    "mutation_ops": list(MUTATION_OPERATORS),
+    "restart_after": 40,
+    "restart_mode": "mixed",
+    "restart_strength": 0.3,
+    "archive_size": 5,
+}
+
+# พารามิเตอร์ simulated annealing ค่าเริ่มต้น (จำนวนการประเมินใกล้เคียง GA 200 รุ่น × 50 ตัว)
+DEFAULT_SA_PARAMS = {
+    "iterations": 10000,
+    "t_start": 200.0,
+    "t_end": 1.0,
+    "cooling": "geometric",
+    "reheat_after": 1500,
+    "reheat_ratio": 0.5,
+    "start": "dsatur",
+    "mutation_ops": list(MUTATION_OPERATORS),
+    "archive_size": 5,
+}
+
+# engine ที่เลือกได้ต่อรอบ: ชื่อ → (ฟังก์ชัน (data, seed, cancel_event, stop_event, **params), params ค่าเริ่มต้น)
+ENGINES = {
+    "ga": (run_genetic_algorithm, DEFAULT_GA_PARAMS),
+    "ga_matching": (partial(run_genetic_algorithm, room_mode="matching"), DEFAULT_GA_PARAMS),
+    "sa": (run_simulated_annealing, DEFAULT_SA_PARAMS),
+}
+
+def run_engine(data, engine="ga", params=None, seed=None, cancel_event=None, stop_event=None,
+               stop_on_feasible=False):
+    """
+    รัน engine ตามชื่อ ด้วย params ที่ทับค่าเริ่มต้น
+    stop_event set → หยุดแล้วคืนผลดีที่สุด; stop_on_feasible → engine set stop_event เองเมื่อได้ตารางที่ไม่ละเมิดข้อบังคับ
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"ไม่รู้จัก engine: {engine}")
+    fn, defaults = ENGINES[engine]
+    result = fn(data, seed=seed, cancel_event=cancel_event, stop_event=stop_event, stop_on_feasible=stop_on_feasible,
+                **{**defaults, **(params or {})})
+    return {**result, "engine": engine}
+
+# state ของ worker process: โจทย์ได้มาครั้งเดียวตอนเริ่ม process (task ส่งแค่ config)
+_PORTFOLIO_STATE: Dict[str, Any] = {}
+
+def _portfolio_init(data, stop_event):
+    """
+    fork     : data คือโจทย์ของแม่ที่ติดมากับ process (copy-on-write ไม่ต้อง pickle/สร้างใหม่)
+    forkserver/spawn : data ถูก pickle มาครั้งเดียวตอนเริ่ม worker (ไม่ใช่ทุก task)
+    """
+    _PORTFOLIO_STATE["data"] = dict(data)
+    _PORTFOLIO_STATE["stop_event"] = stop_event
+
+def _portfolio_task(config: Dict[str, Any]) -> Dict[str, Any]:
+    return run_engine(
+        _PORTFOLIO_STATE["data"],
+        engine=config.get("engine", "ga"),
+        params=config.get("params"),
+        seed=config["seed"],
+        stop_event=_PORTFOLIO_STATE["stop_event"],
+        stop_on_feasible=True,
+    )
+
+# thread ของ scheduler.runlog.QueueLogHandler: สร้างคิว/listener ใหม่เองใน process ลูก จึงไม่ขวางการ fork
+_LOG_LISTENER_THREAD = "runlog-listener"
+
+def _mp_context():
+    """
+    fork เฉพาะเมื่อ process นี้มี thread เดียว (CLI / สคริปต์): worker เริ่มเร็ว ไม่ต้อง import ใหม่
+    มี thread อื่นอยู่ (web process, run_job ที่มี heartbeat thread) → forkserver หรือ spawn
+    (fork จาก process หลาย thread อาจได้ lock ที่ thread อื่นถือค้างไว้ติดไปใน worker)
+    forkserver โหลด solver ไว้ครั้งเดียว worker ถัดไป fork จาก server นั้น; โจทย์ส่งไปกับ initargs
+    """
+    methods = mp.get_all_start_methods()
+    threads = [t for t in threading.enumerate() if t.name != _LOG_LISTENER_THREAD]
+    if "fork" in methods and len(threads) == 1:
+        return mp.get_context("fork")
+    if "forkserver" in methods:
+        ctx = mp.get_context("forkserver")
+        ctx.set_forkserver_preload([__name__])
+        return ctx
+    return mp.get_context("spawn")
+
+def run_portfolio(
+    data: Dict[str, Any],
+    runs: int = 4,
+    workers: int | None = None,
+    configs: List[Dict[str, Any]] | None = None,
+    seed: int | None = None,
+    cancel_event=None,
+    engine: str = "ga",
+    params: Dict[str, Any] | None = None,
+    time_budget: float | None = None,
+):
+    """
+    รันหลายรอบอิสระพร้อมกันใน worker process (seed ต่างกัน / engine หรือ params ต่างกันได้)
+      - configs: [{"engine": "ga", "params": {...}, "seed": ...}, ...] (ไม่ระบุ = engine ค่าเริ่มต้น × runs)
+      - params : ทับค่าเริ่มต้นของ engine ในทุก config ที่ไม่ได้ระบุ params เอง
+      - time_budget : วินาที — ครบแล้วทุกรอบหยุดและคืนผลดีที่สุดที่มี (ไม่ใช่ยกเลิก)
+      - ทุก worker ใช้โจทย์ที่ compile แล้วชุดเดียวกัน: fork = ติดไปกับ process (ไม่สร้างใหม่),
+        forkserver/spawn = pickle ไปครั้งเดียวตอนเริ่ม process (task ส่งแค่ config)
+      - หลายรอบ: รอบใดได้ตาราง hard_violations == 0 → ทุกรอบหยุดและคืนผลดีที่สุดของตัวเอง
+        (รอบเดียวไม่หยุดที่ตารางแรกที่ไม่ละเมิดข้อบังคับ — รันต่อเพื่อ soft จนครบ generation/time_budget)
+      - เลือกผลที่ fitness สูงสุด; รายละเอียดทุกรอบอยู่ใน "portfolio"
+    """
+    if seed is None:
+        seed = int.from_bytes(os.urandom(8), "big")
+    seed_rng = random.Random(seed)
+    configs = [dict(c) for c in (configs or [{"engine": engine} for _ in range(max(1, runs))])]
+    for c in configs:
+        c.setdefault("seed", seed_rng.getrandbits(64))
+        if params:
+            c.setdefault("params", params)
+
+    shared = {k: data[k] for k in ("courses", "slot_index", "rooms", "constraints", "log") if k in data}
+    timer = None
+    if len(configs) == 1:
+        stop_event = None
+        if time_budget:
+            stop_event = threading.Event()
+            timer = threading.Timer(time_budget, stop_event.set)
+            timer.start()
+        try:
+            result = run_engine(shared, engine=configs[0].get("engine", "ga"), params=configs[0].get("params"),
+                                seed=configs[0]["seed"], cancel_event=cancel_event, stop_event=stop_event)
+        finally:
+            if timer is not None:
+                timer.cancel()
+        results = [result]
+    else:
+        ctx = _mp_context()
+        stop_event = ctx.Event()
+        workers = max(1, min(workers or os.cpu_count() or 1, len(configs)))
+        if time_budget:
+            timer = threading.Timer(time_budget, stop_event.set)
+            timer.start()
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=ctx, initializer=_portfolio_init, initargs=(shared, stop_event),
+            ) as ex:
+                futures = [ex.submit(_portfolio_task, c) for c in configs]
+                pending = set(futures)
+                while pending:
+                    _, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                    if cancel_event is not None and cancel_event.is_set():
+                        stop_event.set()
+                        for f in pending:
+                            f.cancel()
+                        raise GenerationCancelled()
+                results = [f.result() for f in futures]
+        finally:
+            if timer is not None:
+                timer.cancel()
+
+    best = max(results, key=lambda r: r["fitness"])
+    archive = _hall_of_fame([e for r in results for e in r.get("archive", [])],
+                            max(len(r.get("archive", [])) for r in results))
+    return {
+        **best,
+        "archive": archive,
+        "portfolio": [
+            {"engine": r["engine"], "seed": r["seed"], "fitness": r["fitness"],
+             "hard_violations": r["hard_violations"]}
+            for r in results
+        ],
+    }
@@ -0,0 +1,393 @@
+"""
+โจทย์: ตารางดิบ → compile (layer 1-3: ตัดช่วงกิจกรรม, SlotIndex, แตกวิชาเป็นหน่วย) + ตรวจ capacity + fingerprint
+"""
+import hashlib
+import json
+from collections import defaultdict
+from datetime import time
+from typing import List, Tuple, Dict, Any
+
+import pandas as pd
+
+from .common import _persist_value
+
+def _norm(x):
+    return str(x).strip().lower() if pd.notna(x) else ""
+
+# ==================== layer 1 ======================= 
+
+def expand_weekactivities_to_slots(df_week: pd.DataFrame) -> pd.DataFrame:
+    """แตก WeekActivity ออกเป็นช่วงเวลารายชั่วโมง (เช่น 15-17 → 15-16, 16-17)"""
+    if df_week is None or df_week.empty:
+        return pd.DataFrame(columns=["day_of_week", "start_time", "stop_time"])
+    rows = []
+    for _, r in df_week.iterrows():
+        day_th = (r.get("day_activity") or "").strip()
+        st = r.get("start_time_activity")
+        et = r.get("stop_time_activity")
+        if pd.isna(st) or pd.isna(et) or not st or not et:
+            continue
+        sh = int(getattr(st, "hour", 0)); eh = int(getattr(et, "hour", 0))
+        if eh <= sh:
+            continue
+        for h in range(sh, eh):
+            rows.append({"day_of_week": day_th, "start_time": time(h,0), "stop_time": time(h+1,0)})
+    return pd.DataFrame(rows, columns=["day_of_week", "start_time", "stop_time"])
+
+def apply_groupallow_blocking(groupallows: pd.DataFrame, weekactivities: pd.DataFrame) -> pd.DataFrame:
+    """ลบช่วงเวลาของ groupallows ที่ทับกับกิจกรรมออก"""
+    blocked = expand_weekactivities_to_slots(weekactivities)
+    if groupallows.empty or blocked.empty:
+        return groupallows
+    merged = groupallows.merge(
+        blocked, on=["day_of_week", "start_time", "stop_time"], how="left", indicator=True
+    )
+    return merged[merged["_merge"] == "left_only"].drop(columns=["_merge"])
+
+# ==================== layer 2 =======================
+
+class SlotIndex:
+    """
+    ดัชนี slot แบบแยกส่วน (แทน cross join groupallows × rooms):
+      - slots        : ช่วงเวลาไม่ซ้ำ (day, start, stop) → slot id
+      - group_slots  : group_id → slot id ที่อนุญาต (ตัดกิจกรรมออกแล้ว)
+      - rooms_by_type: ประเภทห้อง (normalize) → รายชื่อห้อง
+      - room_blocked : ห้อง → bitmask ของ slot id ที่ถูกจองใน preschedule
+    ขนาดโต G×S + R×S แทน G×S×R แต่ตอบคำถาม "(group, slot, room) วางได้ไหม" ได้เหมือนเดิม
+    รองรับ `key in index` ด้วย key = (group_id, day, start, stop, room) แบบเดียวกับ allow_set เดิม
+    """
+
+    def __init__(self, groupallows: pd.DataFrame, rooms: pd.DataFrame, preschedules: pd.DataFrame | None = None):
+        self.slots: List[Tuple[str, time, time]] = []
+        self.slot_id_of: Dict[Tuple[str, time, time], int] = {}
+        self.group_slots: Dict[int, List[int]] = {}
+
+        if groupallows is not None and not groupallows.empty:
+            seen = defaultdict(set)
+            for gid, d, st, et in groupallows[["group_id","day_of_week","start_time","stop_time"]].itertuples(index=False):
+                if pd.isna(gid):
+                    continue
+                sid = self._intern_slot(d, st, et)
+                if sid not in seen[int(gid)]:
+                    seen[int(gid)].add(sid)
+                    self.group_slots.setdefault(int(gid), []).append(sid)
+        self.group_slot_set = {g: set(sids) for g, sids in self.group_slots.items()}
+
+        self.rooms: List[str] = []
+        self.room_type_of: Dict[str, str] = {}
+        self.rooms_by_type: Dict[str, List[str]] = defaultdict(list)
+        if rooms is not None and not rooms.empty:
+            for name, rtype in rooms[["room_name","room_type"]].itertuples(index=False):
+                if name in self.room_type_of:
+                    continue
+                self.rooms.append(name)
+                self.room_type_of[name] = rtype
+                self.rooms_by_type[_norm(rtype)].append(name)
+        self.room_set = set(self.rooms)
+
+        self.room_blocked: Dict[str, int] = {}
+        self.blocked_count_at: Dict[int, int] = defaultdict(int)
+        blocked = expand_preschedules_to_slots(preschedules)
+        for d, st, et, room in blocked.itertuples(index=False):
+            sid = self.slot_id_of.get((d, st, et))
+            if sid is None or room not in self.room_set or not self.is_room_free(room, sid):
+                continue
+            self.room_blocked[room] = self.room_blocked.get(room, 0) | (1 << sid)
+            self.blocked_count_at[sid] += 1
+
+    @classmethod
+    def from_parts(cls, slots, group_slots, rooms, blocked) -> "SlotIndex":
+        """
+        สร้างจากส่วนที่ compile แล้ว (เช่นจาก snapshot .npz) โดยไม่ต้องผ่าน DataFrame
+          slots: [(day, start, stop)], group_slots: {group_id: [slot id]},
+          rooms: [(room_name, room_type)], blocked: [(room_name, slot id)]
+        """
+        self = cls.__new__(cls)
+        self.slots = [tuple(s) for s in slots]
+        self.slot_id_of = {s: sid for sid, s in enumerate(self.slots)}
+        self.group_slots = {int(g): list(sids) for g, sids in group_slots.items()}
+        self.group_slot_set = {g: set(sids) for g, sids in self.group_slots.items()}
+        self.rooms, self.room_type_of, self.rooms_by_type = [], {}, defaultdict(list)
+        for name, rtype in rooms:
+            if name in self.room_type_of:
+                continue
+            self.rooms.append(name)
+            self.room_type_of[name] = rtype
+            self.rooms_by_type[_norm(rtype)].append(name)
+        self.room_set = set(self.rooms)
+        self.room_blocked, self.blocked_count_at = {}, defaultdict(int)
+        for room, sid in blocked:
+            if room not in self.room_set or not self.is_room_free(room, sid):
+                continue
+            self.room_blocked[room] = self.room_blocked.get(room, 0) | (1 << sid)
+            self.blocked_count_at[sid] += 1
+        return self
+
+    def blocked_pairs(self) -> List[Tuple[str, int]]:
+        """[(ห้อง, slot id)] ที่ถูกจอง เรียงตามห้องแล้ว slot"""
+        return [
+            (room, sid)
+            for room, mask in self.room_blocked.items()
+            for sid in range(mask.bit_length()) if (mask >> sid) & 1
+        ]
+
+    def _intern_slot(self, day, start, stop) -> int:
+        key = (day, start, stop)
+        sid = self.slot_id_of.get(key)
+        if sid is None:
+            sid = len(self.slots)
+            self.slots.append(key)
+            self.slot_id_of[key] = sid
+        return sid
+
+    @property
+    def empty(self) -> bool:
+        return not self.group_slots or not self.rooms
+
+    def group_slot_ids(self, group_id) -> List[int]:
+        if group_id is None or pd.isna(group_id):
+            return []
+        return self.group_slots.get(int(group_id), [])
+
+    def is_room_free(self, room, sid: int) -> bool:
+        """ห้องไม่ถูกจองใน preschedule ที่ slot นี้"""
+        return not (self.room_blocked.get(room, 0) >> sid) & 1
+
+    def is_allowed(self, group_id, day, start, stop, room) -> bool:
+        if group_id is None or pd.isna(group_id) or room not in self.room_set:
+            return False
+        sid = self.slot_id_of.get((day, start, stop))
+        if sid is None or sid not in self.group_slot_set.get(int(group_id), ()):
+            return False
+        return self.is_room_free(room, sid)
+
+    def __contains__(self, key) -> bool:
+        return self.is_allowed(*key)
+
+    def rooms_of_type(self, room_type) -> List[str]:
+        return self.rooms_by_type.get(_norm(room_type), [])
+
+    def compatible_rooms(self, room_type) -> List[str]:
+        """ห้องที่ใช้กับวิชาประเภทนี้ได้ (ไม่ระบุ/ไม่มีห้องประเภทนั้น = ทุกห้อง)"""
+        return self.rooms_of_type(room_type) or self.rooms
+
+    def free_rooms_at(self, sid: int) -> int:
+        return len(self.rooms) - self.blocked_count_at.get(sid, 0)
+
+    def free_rooms(self, sid: int) -> List[str]:
+        """ห้องที่ไม่ถูกจองที่ slot นี้ (slot ที่ไม่มีห้องถูกจอง = self.rooms ไม่สร้าง list ใหม่)"""
+        if not self.blocked_count_at.get(sid):
+            return self.rooms
+        return [r for r in self.rooms if self.is_room_free(r, sid)]
+
+    def capacity(self, group_id) -> int:
+        """จำนวน (slot, ห้อง) ที่วางได้ของ group นี้"""
+        return sum(self.free_rooms_at(sid) for sid in self.group_slot_ids(group_id))
+
+    def days(self) -> List[str]:
+        return sorted({self.slots[sid][0] for sids in self.group_slots.values() for sid in sids})
+
+def build_slot_index(groupallows: pd.DataFrame, rooms: pd.DataFrame, preschedules: pd.DataFrame) -> SlotIndex:
+    """สร้าง SlotIndex จาก groupallows (ตัดกิจกรรมแล้ว) + ห้อง + preschedule ที่จองห้องไว้"""
+    return SlotIndex(groupallows, rooms, preschedules)
+
+def expand_preschedules_to_slots(preschedules: pd.DataFrame) -> pd.DataFrame:
+    """แตก Preschedule เป็นช่วงรายชั่วโมง + ชื่อห้อง (ไทยล้วน)"""
+    if preschedules is None or preschedules.empty:
+        return pd.DataFrame(columns=["day_of_week","start_time","stop_time","room_name"])
+    rows = []
+    for _, r in preschedules.iterrows():
+        day_th = (r.get("day_pre") or "").strip()
+        st = r.get("start_time_pre"); et = r.get("stop_time_pre")
+        room = (r.get("room_name_pre") or "").strip()
+        if pd.isna(st) or pd.isna(et) or not st or not et or not room:
+            continue
+        sh = int(getattr(st, "hour", 0)); eh = int(getattr(et, "hour", 0))
+        if eh <= sh:
+            continue
+        for h in range(sh, eh):
+            rows.append({
+                "day_of_week": day_th, "start_time": time(h,0), "stop_time": time(h+1,0), "room_name": room
+            })
+    return pd.DataFrame(rows, columns=["day_of_week","start_time","stop_time","room_name"])
+
+# ==================== layer 3 =======================
+
+def explode_courses_to_units(courses: pd.DataFrame) -> pd.DataFrame:
+    """
+    แตกแต่ละวิชาออกเป็นหน่วยชั่วโมง:
+      - theory_slot_amount_course → type="theory", N แถว
+      - lab_slot_amount_course    → type="lab",    M แถว
+      หน่วยละ 1 ชั่วโมง
+    """
+    if courses is None or courses.empty:
+        return pd.DataFrame(
+            columns=[
+                "id","teacher_name_course","subject_code_course","subject_name_course",
+                "student_group_name_course","room_type_course","section_course","group_type_id",
+                "type","hours","unit_idx","unit_total"
+            ]
+        )
+    rows = []
+    for _, r in courses.iterrows():
+        theory_n = int(r.get("theory_slot_amount_course") or 0)
+        lab_n    = int(r.get("lab_slot_amount_course") or 0)
+        base = {
+            "id": r.get("id"),
+            "teacher_name_course": r.get("teacher_name_course"),
+            "subject_code_course": r.get("subject_code_course"),
+            "subject_name_course": r.get("subject_name_course"),
+            "student_group_name_course": r.get("student_group_name_course"),
+            "room_type_course": r.get("room_type_course"),
+            "section_course": r.get("section_course"),
+            "group_type_id": r.get("group_type_id"),
+        }
+        for i in range(theory_n):
+            rows.append({**base,"type":"theory","hours":1,"unit_idx":i+1,"unit_total":theory_n})
+        for i in range(lab_n):
+            rows.append({**base,"type":"lab","hours":1,"unit_idx":i+1,"unit_total":lab_n})
+    return pd.DataFrame(rows)
+
+# ==================== Compile =======================
+
+# ตารางดิบของโจทย์หนึ่งชุด: ชื่อตาราง → คอลัมน์ (ตรงกับที่ scheduler.main.fetch_all_from_db ดึงจาก DB)
+# แต่ละตารางส่งเป็น DataFrame หรือ list ของ dict ก็ได้; เวลาเป็น datetime.time หรือข้อความ "HH:MM[:SS]"
+PROBLEM_TABLES = {
+    "courses": (
+        "id", "teacher_name_course", "subject_code_course", "subject_name_course", "student_group_name_course",
+        "room_type_course", "section_course", "theory_slot_amount_course", "lab_slot_amount_course", "group_type_id",
+    ),
+    "preschedules": (
+        "id", "teacher_name_pre", "subject_code_pre", "subject_name_pre", "student_group_name_pre", "room_type_pre",
+        "type_pre", "hours_pre", "section_pre", "day_pre", "start_time_pre", "stop_time_pre", "room_name_pre",
+    ),
+    "weekactivities": (
+        "id", "act_name_activity", "day_activity", "hours_activity", "start_time_activity", "stop_time_activity",
+    ),
+    "rooms": ("id", "room_name", "room_type"),
+    "groupallows": ("id", "group_id", "group_type", "day_of_week", "start_time", "stop_time"),
+}
+_TIME_COLUMNS = {
+    "start_time_pre", "stop_time_pre", "start_time_activity", "stop_time_activity", "start_time", "stop_time",
+}
+
+def _as_time(v):
+    return time.fromisoformat(v) if isinstance(v, str) and v else v
+
+def problem_table(rows, table: str) -> pd.DataFrame:
+    """ตารางดิบหนึ่งตาราง (DataFrame หรือ list ของ dict) → DataFrame ที่ compile_problem ใช้ได้"""
+    if isinstance(rows, pd.DataFrame):
+        return rows
+    df = pd.DataFrame(list(rows or []), columns=list(PROBLEM_TABLES[table]))
+    for col in _TIME_COLUMNS.intersection(df.columns):
+        df[col] = df[col].map(_as_time)
+    if table == "courses":
+        df["group_type_id"] = pd.to_numeric(df["group_type_id"], errors="coerce").astype("Int64")
+    return df
+
+def compile_problem(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    ตารางดิบ {ชื่อตารางใน PROBLEM_TABLES: rows, "constraints": {...}} → โจทย์ที่ engine ใช้ได้ทันที
+      - groupallows : ตัดช่วงที่ชนกิจกรรม (layer 1)
+      - slot_index  : SlotIndex ของ slot/ห้อง/ห้องที่ถูกจอง (layer 2)
+      - courses     : หน่วยชั่วโมงของทุกวิชา (layer 3)
+      - constraints : น้ำหนัก/สวิตช์ของ fitness (ไม่ระบุ = ค่าเริ่มต้น)
+    ไม่แตะ DB — ใช้ได้ทั้งจาก ORM, snapshot หรือสร้างเองใน benchmark
+    ถ้าได้โจทย์ที่ compile แล้ว (มี slot_index เช่นจาก snapshot .npz) คืนสำเนาตื้นโดยไม่ compile ซ้ำ
+    """
+    if "slot_index" in raw:
+        return dict(raw)
+    tables = {t: problem_table(raw.get(t), t) for t in PROBLEM_TABLES}
+    groupallows = apply_groupallow_blocking(tables["groupallows"], tables["weekactivities"])
+    return {
+        **tables,
+        "groupallows": groupallows,
+        "slot_index": build_slot_index(groupallows, tables["rooms"], tables["preschedules"]),
+        "courses": explode_courses_to_units(tables["courses"]),
+        "constraints": dict(raw.get("constraints") or {}),
+    }
+
+def preflight_messages(deficits: List[Dict[str, int]]) -> List[str]:
+    """ข้อความเตือนจาก _preflight_capacity_check"""
+    lines = ["[WARN] slot ไม่พอต่อความต้องการ (group_type_id):"]
+    for d in deficits:
+        lines.append(f" - group_id={d['group_id']}: required={d['required']}, capacity={d['capacity']}, deficit={d['deficit']}")
+    return lines
+
+# ==================== Coverage / Capacity Tools ====================
+
+# บังคับ “วางครบทุกหน่วย” (โทษหนักถ้ายังเหลือ)
+REQUIRE_FULL_COVERAGE    = True
+MISSING_UNIT_PENALTY     = 400
+# ตรวจ capacity ล่วงหน้า (ตั้ง True เพื่อให้ raise หากไม่พอจริง)
+HARD_FAIL_IF_IMPOSSIBLE  = False
+
+def _preflight_capacity_check(data: Dict[str, pd.DataFrame]) -> list[dict]:
+    """
+    ตรวจว่า capacity (จำนวน slot×ห้อง ต่อ group_type_id) เพียงพอกับความต้องการหรือไม่
+    return: รายการ deficit [{'group_id':..., 'required':..., 'capacity':..., 'deficit':...}, ...]
+    """
+    courses = data["courses"]
+    slot_index: SlotIndex = data["slot_index"]
+
+    if courses.empty or slot_index.empty:
+        return []
+
+    # ต้องการต่อ group_type_id = จำนวนหน่วยทุกวิชาใน group นั้น
+    req = courses.groupby("group_type_id", dropna=False).size().rename("required")
+    # ความจุ = จำนวน slot ที่มีให้วาง (distinct by วัน/เวลา/ห้อง)
+    cap = pd.Series(
+        {gid: slot_index.capacity(gid) for gid in slot_index.group_slots}, name="capacity", dtype="int64"
+    )
+    merged = pd.concat([req, cap], axis=1).fillna(0)
+    merged["required"] = merged["required"].astype(int)
+    merged["capacity"] = merged["capacity"].astype(int)
+    merged["deficit"] = (merged["required"] - merged["capacity"]).clip(lower=0).astype(int)
+
+    deficits = []
+    for gid, row in merged.iterrows():
+        if pd.isna(gid):
+            continue
+        if row["deficit"] > 0:
+            deficits.append({
+                "group_id": int(gid),
+                "required": int(row["required"]),
+                "capacity": int(row["capacity"]),
+                "deficit": int(row["deficit"]),
+            })
+    return deficits
+
+
+# ==================== Fingerprint =======================
+
+def problem_fingerprint(data: Dict[str, Any]) -> str:
+    """
+    sha256 ของโจทย์ที่ compile แล้ว (หน่วยวิชา + slot ที่แต่ละกลุ่มใช้ได้ + ห้อง + ห้องที่ถูกจอง)
+    ไม่ขึ้นกับ id ของแถว/ลำดับใน DB — ข้อมูลเหมือนกันได้ค่าเดียวกันเสมอ
+    """
+    def s(v):
+        v = _persist_value(v)
+        return "" if v is None else str(v)
+
+    cols = ["subject_code_course", "subject_name_course", "section_course", "teacher_name_course",
+            "student_group_name_course", "room_type_course", "group_type_id", "type", "hours"]
+    courses = data["courses"]
+    units = sorted(
+        [s(v) for v in row]
+        for row in (courses[cols].itertuples(index=False) if not courses.empty else [])
+    )
+    idx: SlotIndex = data["slot_index"]
+    slot = lambda sid: "|".join(map(str, idx.slots[sid]))
+    payload = {
+        "units": units,
+        "group_slots": {str(g): sorted(map(slot, sids)) for g, sids in sorted(idx.group_slots.items())},
+        "rooms": sorted([r, s(idx.room_type_of[r])] for r in idx.rooms),
+        "blocked": sorted([r, slot(sid)] for r, sid in idx.blocked_pairs()),
+    }
+    return hashlib.sha256(json.dumps(payload, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+def solve_cache_key(fingerprint: str, engine: str, params: Dict[str, Any]) -> str:
+    """คีย์ของ solve cache = โจทย์เดียวกัน + engine/params เดียวกัน"""
+    payload = json.dumps({"problem": fingerprint, "engine": engine, "params": params},
+                         sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
@@ -0,0 +1,176 @@
+"""
+Simulated annealing บนตารางเดียว
+"""
+import math
+import os
+import random
+from time import perf_counter
+from typing import Dict, Any
+
+import pandas as pd
+
+from .common import _check_cancel, RunLog
+from .problem import SlotIndex
+from .placement import _greedy_fill_unassigned, _is_unassigned, find_slot_for_gene, is_conflict, make_allow_set
+from .population import initialize_population
+from .fitness import compile_evaluator, count_hard_violations
+from .operators import block_move, kempe_chain_move, swap_move, MUTATION_OPERATORS
+from .ga import _hall_of_fame, _trace_point, _update_archive, compile_genome_encoder, genome_fingerprint
+
+# ==================== Simulated Annealing =======================
+
+def _cooling(t_hi: float, t_end: float, frac: float, schedule: str) -> float:
+    """อุณหภูมิที่ความคืบหน้า frac (0..1) ของช่วง cooling ปัจจุบัน"""
+    frac = min(max(frac, 0.0), 1.0)
+    if schedule == "linear":
+        return t_hi - (t_hi - t_end) * frac
+    return t_hi * (t_end / t_hi) ** frac   # geometric
+
+def _sa_neighbour(current, op: str, slot_index: SlotIndex, allow_set, rng: random.Random, room_type_of):
+    """
+    สร้างเพื่อนบ้าน 1 ก้าวด้วย operator ชุดเดียวกับ GA (คืน None ถ้าทำไม่ได้)
+      - fill/move: ย้าย gene เดียวไป slot+ห้องที่อนุญาต ไม่ชนกับหน่วยอื่น และห้องตรงประเภท (เหมือน mutate)
+      - swap/kempe/block: swap_move / kempe_chain_move / block_move (ไม่ได้ย้ายจริง = None ไม่ต้องประเมิน)
+    """
+    if op in ("fill", "move"):
+        want_unassigned = op == "fill"
+        pool = [i for i, g in enumerate(current) if _is_unassigned(g) == want_unassigned]
+        if not pool:
+            return None
+        i = rng.choice(pool)
+        slot = find_slot_for_gene(current[i], slot_index, allow_set, rng, max_tries=50)
+        if not slot:
+            return None
+        newg = {**current[i], **slot}
+        if current[i].get("room_type_course") and room_type_of.get(newg["room"]) != current[i]["room_type_course"]:
+            return None
+        if is_conflict([x for j, x in enumerate(current) if j != i], newg):
+            return None
+        out = list(current)
+        out[i] = newg
+        return out
+    out = [dict(g) for g in current]
+    if op == "swap":
+        moved = swap_move(out, allow_set, rng)
+    elif op == "kempe":
+        moved = kempe_chain_move(out, slot_index, rng)
+    else:
+        moved = block_move(out, slot_index, rng)
+    return out if moved else None
+
+def run_simulated_annealing(
+    data: Dict[str, Any],
+    iterations: int = 10000,
+    t_start: float = 200.0,
+    t_end: float = 1.0,
+    cooling: str = "geometric",      # "geometric" | "linear"
+    reheat_after: int = 1500,        # ไม่พบผลดีที่สุดใหม่กี่ก้าว → reheat (0 = ปิด)
+    reheat_ratio: float = 0.5,       # อุณหภูมิหลัง reheat = t_start × ค่านี้ แล้วเย็นลงใหม่ตามก้าวที่เหลือ
+    start: str = "dsatur",           # "dsatur" (constructive) | "random" (initialize_population)
+    mutation_ops=MUTATION_OPERATORS,
+    archive_size: int = 5,           # จำนวนตารางดีที่สุดไม่ซ้ำที่เก็บไว้ (hall of fame)
+    seed: int | None = None,
+    cancel_event=None,
+    stop_event=None,
+    stop_on_feasible: bool = False,
+):
+    """
+    Simulated annealing บนตารางเดียว ใช้ SlotIndex / operator / compiled evaluator ชุดเดียวกับ GA
+      - เริ่มจาก DSatur หรือ initialize_population แล้วเติมที่ขาดแบบ greedy
+      - ยอมรับก้าวที่แย่ลงด้วยความน่าจะเป็น exp(Δ/T) (Metropolis)
+      - ค้างนานเกิน reheat_after ก้าว → กลับไปที่ผลดีที่สุดแล้วเพิ่มอุณหภูมิ (reheat)
+      - ตารางที่ยอมรับและติด top-K (archive_size) เก็บไว้เป็นทางเลือกแบบเดียวกับ GA
+    คืนผลรูปแบบเดียวกับ run_genetic_algorithm
+    """
+    if cooling not in ("geometric", "linear"):
+        raise ValueError(f"ไม่รู้จัก cooling schedule: {cooling}")
+    unknown_ops = set(mutation_ops) - set(MUTATION_OPERATORS)
+    if unknown_ops:
+        raise ValueError(f"ไม่รู้จัก mutation operator: {sorted(unknown_ops)}")
+    if seed is None:
+        seed = int.from_bytes(os.urandom(8), "big")
+    rng = random.Random(seed)
+    log = (data.get("log") or RunLog()).bind(engine="sa", seed=seed)
+    log.event("start", iterations=iterations, t_start=t_start, cooling=cooling)
+    t0 = perf_counter()
+
+    courses = data["courses"]
+    slot_index = data["slot_index"]
+    allow_set = make_allow_set(slot_index)
+    rooms_df = data.get("rooms", pd.DataFrame())
+    room_type_of = {}
+    if (not rooms_df.empty) and ("room_name" in rooms_df.columns) and ("room_type" in rooms_df.columns):
+        room_type_of = dict(zip(rooms_df["room_name"], rooms_df["room_type"]))
+    constraints = data.get("constraints")
+    evaluate = compile_evaluator(constraints)
+
+    population = initialize_population(courses, slot_index, 1, seed=seed, cancel_event=cancel_event,
+                                       dsatur_share=1.0 if start == "dsatur" else 0.0)
+    if not population or not population[0]:
+        return {"fitness": float("-inf"), "schedule": [], "seed": seed, "hard_violations": 0,
+                "violations": {"terms": {}, "reward": 0, "contiguity": 0}, "trace": [], "diversity": []}
+
+    current = _greedy_fill_unassigned(population[0], slot_index, allow_set, room_type_of, rng, cancel_event=cancel_event)
+    current_fit = evaluate(current, allow_set, room_type_of)
+    best, best_fit = current, current_fit
+    encode = compile_genome_encoder(slot_index)
+    archive = []     # top-K ตารางไม่ซ้ำที่เคยยอมรับ [(fitness, genome, individual)]
+    _update_archive(archive, archive_size, current_fit, current, encode(current))
+    trace = []
+    _trace_point(trace, t0, 0, best_fit, best, count_hard_violations(best, allow_set, room_type_of, constraints))
+
+    ops = list(mutation_ops)
+    t_hi, k_cool, since_best = t_start, 0, 0
+    for k in range(iterations):
+        if k % 100 == 0:
+            _check_cancel(cancel_event)
+            if stop_event is not None:
+                if stop_on_feasible and count_hard_violations(best, allow_set, room_type_of, constraints) == 0:
+                    stop_event.set()
+                if stop_event.is_set():
+                    break
+
+        temp = _cooling(t_hi, t_end, (k - k_cool) / max(1, iterations - k_cool), cooling)
+        log.generation(k, best=best_fit, current=current_fit, temperature=round(temp, 2))
+        cand = _sa_neighbour(current, rng.choice(ops), slot_index, allow_set, rng, room_type_of)
+        if cand is None:
+            continue
+        cand_fit = evaluate(cand, allow_set, room_type_of)
+        delta = cand_fit - current_fit
+        if delta >= 0 or rng.random() < math.exp(delta / max(temp, 1e-9)):
+            current, current_fit = cand, cand_fit
+            if archive_size > 0 and (len(archive) < archive_size or current_fit > archive[-1][0]):
+                _update_archive(archive, archive_size, current_fit, current, encode(current))
+            if current_fit > best_fit:
+                best, best_fit = current, current_fit
+                since_best = 0
+                _trace_point(trace, t0, k + 1, best_fit, best,
+                             count_hard_violations(best, allow_set, room_type_of, constraints))
+                continue
+        since_best += 1
+
+        if reheat_after and since_best >= reheat_after:
+            current, current_fit = best, best_fit
+            t_hi, k_cool, since_best = max(t_start * reheat_ratio, t_end), k, 0
+            log.event("reheat", generation=k, temperature=t_hi)
+
+    log.event("finish", generation=k + 1 if iterations else 0, best=best_fit, elapsed=round(perf_counter() - t0, 3))
+
+    best = [dict(g) for g in best]
+    hard = count_hard_violations(best, allow_set, room_type_of, constraints)
+    best_vec = encode(best)
+    hall = [{"fitness": best_fit, "schedule": best}]
+    hall += [{"fitness": fit, "schedule": ind} for fit, vec, ind in archive if vec != best_vec]
+    for e in hall:
+        e["fingerprint"] = genome_fingerprint(e["schedule"])
+        e["hard_violations"] = count_hard_violations(e["schedule"], allow_set, room_type_of, constraints)
+    return {
+        "fitness": best_fit,
+        "schedule": best,
+        "seed": seed,
+        "hard_violations": hard,
+        "violations": evaluate(best, allow_set, room_type_of, detail=True)[1],
+        "trace": trace,
+        "diversity": [],
+        "archive": _hall_of_fame(hall, archive_size),
+    }
@@ -0,0 +1,264 @@
+"""
+snapshot ของโจทย์สำหรับรันนอก DB
+  - ไฟล์ .json : ตารางดิบ {"version", "tables": {ชื่อตาราง: [แถว, ...]}, "constraints": {...}}
+  - โฟลเดอร์   : ตารางดิบ <ชื่อตาราง>.csv ต่อตาราง + constraints.json
+  - ไฟล์ .npz  : โจทย์ที่ compile แล้ว (วิชา/หน่วย/slot ที่อนุญาต/ห้อง/ห้องที่ถูกจอง/น้ำหนัก) เป็น array
+                 บีบอัด — เล็กพอแนบ ticket และโหลดกลับเป็น SlotIndex ได้โดยไม่ต้อง compile ใหม่
+"""
+import json
+import math
+import os
+from datetime import time
+from typing import Dict, Any, List
+
+import numpy as np
+import pandas as pd
+
+from .problem import PROBLEM_TABLES, SlotIndex, compile_problem, explode_courses_to_units, problem_fingerprint
+
+SNAPSHOT_VERSION = 1
+
+# คอลัมน์ตัวเลข (CSV อ่านทุกคอลัมน์เป็นข้อความ — กัน section "01" กลายเป็น 1)
+_NUMERIC_COLUMNS = {
+    "id", "theory_slot_amount_course", "lab_slot_amount_course", "group_type_id",
+    "hours_pre", "hours_activity", "group_id",
+}
+
+def _plain(v):
+    """ค่าจาก DataFrame → ค่าที่ JSON/CSV เก็บได้ (เวลาเป็น "HH:MM:SS", NaN/NA เป็น None)"""
+    if v is None or v is pd.NA or (isinstance(v, float) and math.isnan(v)):
+        return None
+    if isinstance(v, time):
+        return v.isoformat()
+    return v.item() if hasattr(v, "item") else v   # numpy scalar → python
+
+def _csv_value(col: str, v: str):
+    if v == "":
+        return None
+    if col in _NUMERIC_COLUMNS:
+        f = float(v)
+        return int(f) if f.is_integer() else f
+    return v
+
+def snapshot_tables(raw: Dict[str, Any]) -> Dict[str, list]:
+    """ตารางดิบ (DataFrame หรือ list ของ dict) → {ชื่อตาราง: [dict, ...]} เฉพาะคอลัมน์ใน PROBLEM_TABLES"""
+    tables = {}
+    for table, cols in PROBLEM_TABLES.items():
+        rows = raw.get(table)
+        if isinstance(rows, pd.DataFrame):
+            rows = rows.reindex(columns=list(cols)).to_dict("records")
+        tables[table] = [{c: _plain(r.get(c)) for c in cols} for r in (rows or [])]
+    return tables
+
+def save_snapshot(raw: Dict[str, Any], path: str) -> str:
+    """เขียน snapshot: path ลงท้าย .json = ไฟล์เดียว, .npz = โจทย์ที่ compile แล้ว, นอกนั้น = โฟลเดอร์ CSV"""
+    if path.endswith(".npz"):
+        return save_compiled(compile_problem(raw), path)
+    tables = snapshot_tables(raw)
+    constraints = {k: _plain(v) for k, v in (raw.get("constraints") or {}).items()}
+    if path.endswith(".json"):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"version": SNAPSHOT_VERSION, "tables": tables, "constraints": constraints},
+                      f, ensure_ascii=False, separators=(",", ":"))
+        return path
+    os.makedirs(path, exist_ok=True)
+    for table, cols in PROBLEM_TABLES.items():
+        pd.DataFrame(tables[table], columns=list(cols)).to_csv(os.path.join(path, f"{table}.csv"), index=False)
+    with open(os.path.join(path, "constraints.json"), "w", encoding="utf-8") as f:
+        json.dump(constraints, f, ensure_ascii=False, indent=2)
+    return path
+
+def load_snapshot(path: str) -> Dict[str, Any]:
+    """อ่าน snapshot (.json / .npz / โฟลเดอร์ CSV) → ส่งให้ compile_problem ได้ทันที (.npz compile มาแล้ว)"""
+    if path.endswith(".npz"):
+        return load_compiled(path)
+    if os.path.isdir(path):
+        raw: Dict[str, Any] = {}
+        for table in PROBLEM_TABLES:
+            fn = os.path.join(path, f"{table}.csv")
+            rows = pd.read_csv(fn, dtype=str, keep_default_na=False).to_dict("records") if os.path.exists(fn) else []
+            raw[table] = [{k: _csv_value(k, v) for k, v in r.items()} for r in rows]
+        fn = os.path.join(path, "constraints.json")
+        if os.path.exists(fn):
+            with open(fn, encoding="utf-8") as f:
+                raw["constraints"] = json.load(f)
+        return raw
+    with open(path, encoding="utf-8") as f:
+        doc = json.load(f)
+    if doc.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"snapshot ไม่รองรับ (version={doc.get('version')})")
+    return {**doc["tables"], "constraints": doc.get("constraints") or {}}
+
+# ================== compiled snapshot (.npz) ==================
+
+COMPILED_FORMAT = "timetable-problem"
+COMPILED_VERSION = 1
+
+# คอลัมน์ข้อความของหน่วยวิชา (เก็บเป็น id ในตาราง string กลาง; -1 = ไม่มีค่า)
+_UNIT_TEXT_COLUMNS = (
+    "teacher_name_course", "subject_code_course", "subject_name_course",
+    "student_group_name_course", "room_type_course", "section_course",
+)
+
+class _Strings:
+    """intern ข้อความ → id (int32); เก็บลงไฟล์เป็น utf-8 ต่อกัน + offsets"""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def __call__(self, v) -> int:
+        v = _plain(v)
+        if v is None:
+            return -1
+        v = str(v)
+        sid = self.ids.get(v)
+        if sid is None:
+            sid = self.ids[v] = len(self.values)
+            self.values.append(v)
+        return sid
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        encoded = [v.encode("utf-8") for v in self.values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return {"strings": np.frombuffer(b"".join(encoded), dtype=np.uint8), "string_offsets": offsets}
+
+def _decode_strings(blob: np.ndarray, offsets: np.ndarray) -> List[str | None]:
+    """คืน list ของข้อความ + None ท้ายสุด (ให้ id -1 ชี้ None ได้ตรง ๆ)"""
+    raw, bounds = blob.tobytes(), offsets.tolist()
+    return [raw[a:b].decode("utf-8") for a, b in zip(bounds, bounds[1:])] + [None]
+
+def _seconds(t) -> int:
+    return t.hour * 3600 + t.minute * 60 + t.second
+
+def _time(s: int) -> time:
+    return time(s // 3600, s % 3600 // 60, s % 60)
+
+def _int_or(v, missing: int = -1) -> int:
+    v = _plain(v)
+    return missing if v is None else int(v)
+
+def compiled_arrays(data: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """
+    โจทย์ที่ compile แล้ว → array ของ .npz
+      courses : course_id, course_text (C×6 string id), course_group (-1 = ไม่มี)
+      units   : unit_course (แถวใน courses), unit_type (string id), unit_hours/unit_idx/unit_total
+      slots   : slot_day (string id), slot_start/slot_stop (วินาทีจากเที่ยงคืน)
+      allowed : group_ids + group_offsets + group_slot_ids (CSR: slot ของกลุ่ม i = ids[offsets[i]:offsets[i+1]])
+      rooms   : room_id, room_name, room_type (string id)
+      blocked : blocked_room (string id), blocked_slot (slot id)
+      meta    : JSON (format, version, fingerprint, constraints)
+    ลำดับแถว/slot/ห้องคงเดิมทุกอย่าง → seed เดียวกันได้ตารางเดียวกับรันบนโจทย์ต้นฉบับ ทุก process
+    (engine ไม่วนตามลำดับ hash; ยกเว้นรอบที่หยุดด้วย time_budget / หยุดเมื่ออีกรอบได้ hard = 0 ซึ่งขึ้นกับเวลา)
+    """
+    strings = _Strings()
+    units = data["courses"]
+    course_row: Dict[tuple, int] = {}
+    course_id, course_text, course_group = [], [], []
+    unit_course, unit_type, unit_hours, unit_idx, unit_total = [], [], [], [], []
+    for r in (units.to_dict("records") if not units.empty else []):
+        key = (_plain(r.get("id")),) + tuple(_plain(r.get(c)) for c in _UNIT_TEXT_COLUMNS) + (_plain(r.get("group_type_id")),)
+        row = course_row.get(key)
+        if row is None:
+            row = course_row[key] = len(course_id)
+            course_id.append(_int_or(r.get("id")))
+            course_text.append([strings(r.get(c)) for c in _UNIT_TEXT_COLUMNS])
+            course_group.append(_int_or(r.get("group_type_id")))
+        unit_course.append(row)
+        unit_type.append(strings(r.get("type")))
+        unit_hours.append(_int_or(r.get("hours"), 1))
+        unit_idx.append(_int_or(r.get("unit_idx"), 1))
+        unit_total.append(_int_or(r.get("unit_total"), 1))
+
+    idx: SlotIndex = data["slot_index"]
+    group_ids = list(idx.group_slots)
+    group_offsets = np.zeros(len(group_ids) + 1, dtype=np.int32)
+    np.cumsum([len(idx.group_slots[g]) for g in group_ids], out=group_offsets[1:])
+    rooms = data.get("rooms")
+    if rooms is None or rooms.empty:
+        rooms = pd.DataFrame({"id": [None] * len(idx.rooms), "room_name": idx.rooms,
+                              "room_type": [idx.room_type_of[r] for r in idx.rooms]})
+    blocked = idx.blocked_pairs()
+
+    arrays = {
+        "course_id": np.array(course_id, dtype=np.int64),
+        "course_text": np.array(course_text, dtype=np.int32).reshape(-1, len(_UNIT_TEXT_COLUMNS)),
+        "course_group": np.array(course_group, dtype=np.int64),
+        "unit_course": np.array(unit_course, dtype=np.int32),
+        "unit_type": np.array(unit_type, dtype=np.int32),
+        "unit_hours": np.array(unit_hours, dtype=np.int16),
+        "unit_idx": np.array(unit_idx, dtype=np.int16),
+        "unit_total": np.array(unit_total, dtype=np.int16),
+        "slot_day": np.array([strings(d) for d, _, _ in idx.slots], dtype=np.int32),
+        "slot_start": np.array([_seconds(st) for _, st, _ in idx.slots], dtype=np.int32),
+        "slot_stop": np.array([_seconds(et) for _, _, et in idx.slots], dtype=np.int32),
+        "group_ids": np.array(group_ids, dtype=np.int64),
+        "group_offsets": group_offsets,
+        "group_slot_ids": np.array([sid for g in group_ids for sid in idx.group_slots[g]], dtype=np.int32),
+        "room_id": np.array([_int_or(v) for v in rooms["id"]], dtype=np.int64),
+        "room_name": np.array([strings(v) for v in rooms["room_name"]], dtype=np.int32),
+        "room_type": np.array([strings(v) for v in rooms["room_type"]], dtype=np.int32),
+        "blocked_room": np.array([strings(r) for r, _ in blocked], dtype=np.int32),
+        "blocked_slot": np.array([sid for _, sid in blocked], dtype=np.int32),
+    }
+    meta = {
+        "format": COMPILED_FORMAT,
+        "version": COMPILED_VERSION,
+        "fingerprint": problem_fingerprint(data),
+        "constraints": {k: _plain(v) for k, v in (data.get("constraints") or {}).items()},
+    }
+    arrays.update(strings.arrays())
+    arrays["meta"] = np.frombuffer(json.dumps(meta, ensure_ascii=False).encode("utf-8"), dtype=np.uint8)
+    return arrays
+
+def save_compiled(data: Dict[str, Any], path: str) -> str:
+    """เขียนโจทย์ที่ compile แล้วเป็น .npz (บีบอัด)"""
+    with open(path, "wb") as f:
+        np.savez_compressed(f, **compiled_arrays(data))
+    return path
+
+def read_compiled_meta(arrays) -> Dict[str, Any]:
+    meta = json.loads(arrays["meta"].tobytes().decode("utf-8"))
+    if meta.get("format") != COMPILED_FORMAT or meta.get("version") != COMPILED_VERSION:
+        raise ValueError(f"snapshot .npz ไม่รองรับ (format={meta.get('format')}, version={meta.get('version')})")
+    return meta
+
+def compiled_from_arrays(arrays) -> Dict[str, Any]:
+    """array ของ .npz → โจทย์ที่ compile แล้ว {"courses", "rooms", "slot_index", "constraints"}"""
+    meta = read_compiled_meta(arrays)
+    text = _decode_strings(arrays["strings"], arrays["string_offsets"])
+
+    course_id = arrays["course_id"].tolist()
+    course_text = [[text[i] for i in row] for row in arrays["course_text"].tolist()]
+    course_group = [pd.NA if g == -1 else g for g in arrays["course_group"].tolist()]
+    rows = []
+    for c, t, hours, i, n in zip(arrays["unit_course"].tolist(), arrays["unit_type"].tolist(),
+                                 arrays["unit_hours"].tolist(), arrays["unit_idx"].tolist(),
+                                 arrays["unit_total"].tolist()):
+        rows.append({"id": course_id[c], **dict(zip(_UNIT_TEXT_COLUMNS, course_text[c])),
+                     "group_type_id": course_group[c], "type": text[t], "hours": hours,
+                     "unit_idx": i, "unit_total": n})
+    courses = pd.DataFrame(rows) if rows else explode_courses_to_units(None)
+
+    slots = [(text[d], _time(st), _time(et)) for d, st, et in zip(
+        arrays["slot_day"].tolist(), arrays["slot_start"].tolist(), arrays["slot_stop"].tolist())]
+    offsets, sids = arrays["group_offsets"].tolist(), arrays["group_slot_ids"].tolist()
+    group_slots = {g: sids[offsets[i]:offsets[i + 1]] for i, g in enumerate(arrays["group_ids"].tolist())}
+    rooms = pd.DataFrame({
+        "id": pd.array([None if v == -1 else v for v in arrays["room_id"].tolist()], dtype="Int64"),
+        "room_name": [text[i] for i in arrays["room_name"].tolist()],
+        "room_type": [text[i] for i in arrays["room_type"].tolist()],
+    })
+    blocked = [(text[r], s) for r, s in zip(arrays["blocked_room"].tolist(), arrays["blocked_slot"].tolist())]
+    return {
+        "courses": courses,
+        "rooms": rooms,
+        "slot_index": SlotIndex.from_parts(slots, group_slots, zip(rooms["room_name"], rooms["room_type"]), blocked),
+        "constraints": meta.get("constraints") or {},
+    }
+
+def load_compiled(path: str) -> Dict[str, Any]:
+    """อ่าน .npz → โจทย์ที่ compile แล้ว (ส่งให้ run_portfolio / engine ได้ทันที)"""
+    with np.load(path, allow_pickle=False) as arrays:
+        return compiled_from_arrays(arrays)
@@ -0,0 +1,407 @@
+"""
+two-phase (engine "ga_matching"): เฟส 1 ค้นหาเฉพาะเวลา แล้วเฟส 2 จัดห้องครั้งเดียวด้วย matching
+
+เฟส 1 gene ไม่มีห้อง (room = PENDING_ROOM) — operator สุ่มแค่ slot ของกลุ่ม ไม่สุ่มห้อง
+ข้อบังคับของเฟส 1: ครู/กลุ่มนักศึกษาไม่ชน, slot อยู่ใน group allow และจำนวนคาบต่อ slot ไม่เกินห้องว่าง
+  ความจุต่อ slot คิดแบบเดียวกับ matching: วิชาที่มีห้องประเภทตรงกันใช้ได้เฉพาะห้องประเภทนั้น
+  ที่เหลือใช้ห้องว่างไหนก็ได้ → คาบที่จับคู่ได้สูงสุด = Σ min(n_ประเภท, ห้องว่างประเภทนั้น) + min(n_อื่น, ห้องว่างที่เหลือ)
+  (ห้องแต่ละประเภทไม่ทับกัน ค่านี้จึงเท่ากับ maximum matching พอดี — ผ่านเฟส 1 ได้ = matching วางครบ)
+"""
+import random
+from collections import Counter, defaultdict
+from typing import List, Dict, Any
+
+import pandas as pd
+
+from .common import _check_cancel
+from .problem import SlotIndex, _norm
+from .placement import _contiguity_score, _is_unassigned
+from .population import initialize_population
+from .fitness import DEFAULT_CONSTRAINTS, _lab_order_penalty, course_key
+from .operators import MUTATION_OPERATORS, _consecutive_runs, assign_rooms_by_matching
+
+# ห้องของ gene ในเฟส 1 (ยังไม่จัด) — แทนที่ด้วยห้องจริงตอน decode เท่านั้น
+PENDING_ROOM = ""
+
+def _sid_of(slot_index: SlotIndex, g):
+    return slot_index.slot_id_of.get((g["day_of_week"], g["start_time"], g["stop_time"]))
+
+def _unplaced(g) -> Dict[str, Any]:
+    return {**g, "day_of_week": None, "start_time": None, "stop_time": None, "room": None, "assigned": False}
+
+class _Load:
+    """การใช้ slot ของ individual หนึ่ง: ครู/กลุ่มที่ไม่ว่าง + จำนวนคาบต่อ (slot, ประเภทห้อง)"""
+
+    def __init__(self, space: "TimeSpace", genes=()):
+        self.space = space
+        self.teacher, self.group = Counter(), Counter()
+        self.typed, self.other = Counter(), Counter()   # (sid, ประเภท) → คาบ / sid → คาบที่ไม่มีประเภท
+        self.matched = Counter()                         # sid → Σ min(n_ประเภท, ห้องว่างประเภทนั้น)
+        for g in genes:
+            if not _is_unassigned(g):
+                sid = _sid_of(space.slot_index, g)
+                if sid is not None:
+                    self.add(g, sid)
+
+    def add(self, g, sid: int) -> None:
+        self.teacher[(g["teacher"], sid)] += 1
+        self.group[(g["student_group"], sid)] += 1
+        cls = self.space.room_class(g)
+        if cls is None:
+            self.other[sid] += 1
+        else:
+            if self.typed[(sid, cls)] < self.space.free_of(sid, cls):
+                self.matched[sid] += 1
+            self.typed[(sid, cls)] += 1
+
+    def remove(self, g, sid: int) -> None:
+        self.teacher[(g["teacher"], sid)] -= 1
+        self.group[(g["student_group"], sid)] -= 1
+        cls = self.space.room_class(g)
+        if cls is None:
+            self.other[sid] -= 1
+        else:
+            self.typed[(sid, cls)] -= 1
+            if self.typed[(sid, cls)] < self.space.free_of(sid, cls):
+                self.matched[sid] -= 1
+
+    def fits(self, g, sid: int) -> bool:
+        """วาง g ลง sid ได้: ครู/กลุ่มว่าง และยังมีห้องว่างให้ matching (คาบเดิมใน slot ไม่หลุด)"""
+        if self.teacher[(g["teacher"], sid)] or self.group[(g["student_group"], sid)]:
+            return False
+        cls = self.space.room_class(g)
+        if cls is not None and self.typed[(sid, cls)] >= self.space.free_of(sid, cls):
+            return False
+        return self.other[sid] + self.matched[sid] < self.space.free_total(sid)
+
+class TimeSpace:
+    """
+    ตัวแทนการค้นหาของเฟส 1 (interface เดียวกับ ga.GeneSpace):
+    initialize / crossover / mutate / fill / fitness / hard_violations ทำงานบนเวลาอย่างเดียว
+    decode = จัดห้องทีละ slot ด้วย assign_rooms_by_matching (เรียกครั้งเดียวตอนจบ)
+    """
+
+    def __init__(self, courses: pd.DataFrame, slot_index: SlotIndex, constraints: Dict[str, Any] | None = None):
+        self.courses = courses
+        self.slot_index = slot_index
+        self._class_of: Dict[Any, str | None] = {}
+        self._free: Dict[tuple, int] = {}
+        c = {**DEFAULT_CONSTRAINTS, **(constraints or {})}
+        self.c = c
+        self.order_args = (c["lab_before_theory_penalty"], c["lab_without_theory_penalty"])
+        self.contig_args = (c["contig_adjacent_bonus"], c["contig_gap_penalty"],
+                            c["contig_segment_penalty"], c["contig_same_room"])
+
+    # ----- ความจุห้องต่อ slot -----
+
+    def room_class(self, g) -> str | None:
+        """ประเภทห้องที่ matching บังคับ (None = ไม่ระบุ/ไม่มีห้องประเภทนั้น ใช้ห้องไหนก็ได้)"""
+        rtype = g.get("room_type_course")
+        cls = self._class_of.get(rtype, 0)
+        if cls == 0:
+            cls = self._class_of[rtype] = _norm(rtype) if self.slot_index.rooms_of_type(rtype) else None
+        return cls
+
+    def free_of(self, sid: int, cls: str) -> int:
+        key = (sid, cls)
+        n = self._free.get(key)
+        if n is None:
+            n = self._free[key] = sum(
+                1 for room in self.slot_index.rooms_by_type.get(cls, []) if self.slot_index.is_room_free(room, sid)
+            )
+        return n
+
+    def wrong_type(self, g) -> bool:
+        """ระบุประเภทห้องแต่ไม่มีห้องประเภทนั้นเลย → matching ให้ห้องอื่น ผิดประเภทแน่นอน (เหมือนโหมดปกติ)"""
+        req = str(g.get("room_type_course") or "").strip()
+        return bool(req) and self.room_class(g) is None
+
+    def free_total(self, sid: int) -> int:
+        return self.slot_index.free_rooms_at(sid)
+
+    def unmatched(self, load: _Load) -> int:
+        """จำนวนคาบที่ matching จะจัดห้องให้ไม่ได้ (เกินความจุของ slot)"""
+        n_typed = Counter()
+        for (sid, _cls), n in load.typed.items():
+            n_typed[sid] += n
+        missing = 0
+        for sid in set(n_typed) | set(load.other):
+            placed = load.matched[sid] + min(load.other[sid], self.free_total(sid) - load.matched[sid])
+            missing += n_typed[sid] + load.other[sid] - placed
+        return missing
+
+    def place(self, g, sid: int) -> Dict[str, Any]:
+        day, st, et = self.slot_index.slots[sid]
+        return {**g, "day_of_week": day, "start_time": st, "stop_time": et, "room": PENDING_ROOM, "assigned": True}
+
+    def allowed(self, g, sid) -> bool:
+        gid = g.get("group_type_id")
+        return sid is not None and not pd.isna(gid) and sid in self.slot_index.group_slot_set.get(int(gid), ())
+
+    def pick_slot(self, g, load: _Load, rng: random.Random, tries: int = 50, exclude=None):
+        """slot ที่อนุญาตของกลุ่ม (สุ่มไม่ซ้ำ ไม่เกิน tries ตัว) ที่วาง g ได้ — None ถ้าไม่มี"""
+        gid = g.get("group_type_id")
+        if gid is None or pd.isna(gid):
+            return None
+        sids = self.slot_index.group_slot_ids(gid)
+        for sid in rng.sample(sids, min(tries, len(sids))):
+            if sid != exclude and load.fits(g, sid):
+                return sid
+        return None
+
+    # ----- interface ของ GA -----
+
+    def initialize(self, n: int, seed, cancel_event=None, dsatur_share: float = 0.0):
+        """ประชากรเริ่มต้นจากตัวสร้างชุดเดียวกับโหมดปกติ แล้วตัดห้องทิ้ง (เก็บเฉพาะเวลา)"""
+        population = initialize_population(self.courses, self.slot_index, n, seed=seed,
+                                           cancel_event=cancel_event, dsatur_share=dsatur_share)
+        return [[g if _is_unassigned(g) else {**g, "room": PENDING_ROOM} for g in ind] for ind in population]
+
+    def fitness(self, individual) -> int:
+        """
+        fitness ของเฟส 1 (ไม่มีเทอมห้องชน/ประเภทห้อง — matching กันไว้ให้แล้ว)
+        คาบที่เกินความจุของ slot นับเหมือน unassigned เพราะ matching จะจัดห้องให้ไม่ได้
+        """
+        c = self.c
+        penalty = reward = missing = 0
+        seen_t, seen_s = set(), set()
+        load = _Load(self)
+        for g in individual:
+            if _is_unassigned(g):
+                penalty += c["unassigned_penalty"]
+                missing += 1
+                continue
+            sid = _sid_of(self.slot_index, g)
+            if c["teacher_conflict_enabled"]:
+                t = (g["teacher"], sid)
+                if t in seen_t:
+                    penalty += c["teacher_conflict_penalty"]
+                seen_t.add(t)
+            if c["student_conflict_enabled"]:
+                s = (g["student_group"], sid)
+                if s in seen_s:
+                    penalty += c["student_conflict_penalty"]
+                seen_s.add(s)
+            if c["group_allow_enabled"] and not self.allowed(g, sid):
+                penalty += c["group_allow_penalty"]
+            if c["room_type_enabled"] and self.wrong_type(g):
+                penalty += c["room_type_penalty"]
+            if sid is not None:
+                load.add(g, sid)
+            reward += c["placed_reward"]
+
+        over = self.unmatched(load)
+        penalty += over * c["unassigned_penalty"]
+        reward -= over * c["placed_reward"]
+        missing += over
+        if c["lab_order_enabled"]:
+            penalty += _lab_order_penalty(individual, *self.order_args)
+        contig = _contiguity_score(individual, *self.contig_args) if c["contiguity_enabled"] else 0
+        if c["full_coverage_enabled"] and missing > 0:
+            penalty += c["missing_unit_penalty"] * missing
+        return reward - penalty + contig
+
+    def hard_violations(self, individual) -> int:
+        """เหมือน count_hard_violations ของตารางที่ decode แล้ว (คาบเกินความจุ = unassigned หลัง matching)"""
+        c = self.c
+        violations = 0
+        seen_t, seen_s = set(), set()
+        load = _Load(self)
+        for g in individual:
+            if _is_unassigned(g):
+                violations += 1
+                continue
+            sid = _sid_of(self.slot_index, g)
+            if c["teacher_conflict_enabled"]:
+                t = (g["teacher"], sid)
+                violations += t in seen_t
+                seen_t.add(t)
+            if c["student_conflict_enabled"]:
+                s = (g["student_group"], sid)
+                violations += s in seen_s
+                seen_s.add(s)
+            if c["group_allow_enabled"]:
+                violations += not self.allowed(g, sid)
+            if c["room_type_enabled"]:
+                violations += self.wrong_type(g)
+            if sid is not None:
+                load.add(g, sid)
+        return violations + self.unmatched(load)
+
+    def crossover(self, parent1, parent2, rng: random.Random, cancel_event=None):
+        """one-point by-course แล้วซ่อม: คาบที่ slot ไม่อนุญาต/ชน/เต็ม หา slot ใหม่ ไม่ได้ = unassigned"""
+        b1, b2 = defaultdict(list), defaultdict(list)
+        for g in parent1: b1[course_key(g)].append(g)
+        for g in parent2: b2[course_key(g)].append(g)
+
+        child, load = [], _Load(self)
+        for k in dict.fromkeys([*b1, *b2]):
+            src = b1 if rng.random() < 0.5 else b2
+            for g in src.get(k, ()):
+                if _is_unassigned(g):
+                    child.append(dict(g)); continue
+                sid = _sid_of(self.slot_index, g)
+                if not (self.allowed(g, sid) and load.fits(g, sid)):
+                    _check_cancel(cancel_event)
+                    sid = self.pick_slot(g, load, rng)
+                if sid is None:
+                    child.append(_unplaced(g)); continue
+                load.add(g, sid)
+                child.append(self.place(g, sid))
+        return child
+
+    def mutate(self, individual, mut_rate: float, rng: random.Random, cancel_event=None,
+               operators=MUTATION_OPERATORS):
+        """FILL → MOVE → SWAP → KEMPE → BLOCK แบบเดียวกับ operators.mutate แต่ย้ายเฉพาะเวลา"""
+        if not individual:
+            return individual
+        out = [dict(g) for g in individual]
+        load = _Load(self, out)
+
+        # (A) FILL / (B) MOVE
+        for op, pick in (("fill", True), ("move", False)):
+            if op not in operators:
+                continue
+            rate = max(mut_rate, 0.5) if pick else mut_rate
+            for i, g in enumerate(out):
+                if _is_unassigned(g) != pick or rng.random() >= rate:
+                    continue
+                _check_cancel(cancel_event)
+                old = None if pick else _sid_of(self.slot_index, g)
+                if old is not None:
+                    load.remove(g, old)
+                sid = self.pick_slot(g, load, rng, exclude=old)
+                if sid is None:
+                    if old is not None:
+                        load.add(g, old)
+                    continue
+                load.add(g, sid)
+                out[i] = self.place(g, sid)
+
+        # (C) SWAP
+        if "swap" in operators and len(out) >= 2 and rng.random() < mut_rate:
+            self._swap(out, load, rng)
+
+        # (D) KEMPE
+        if "kempe" in operators and rng.random() < mut_rate:
+            _check_cancel(cancel_event)
+            if self._kempe(out, rng):
+                load = _Load(self, out)
+
+        # (E) BLOCK
+        if "block" in operators and rng.random() < mut_rate:
+            _check_cancel(cancel_event)
+            self._block(out, load, rng)
+        return out
+
+    def _swap(self, out, load: _Load, rng: random.Random) -> bool:
+        i, j = rng.sample(range(len(out)), 2)
+        gi, gj = out[i], out[j]
+        if _is_unassigned(gi) or _is_unassigned(gj):
+            return False
+        si, sj = _sid_of(self.slot_index, gi), _sid_of(self.slot_index, gj)
+        if si == sj or not (self.allowed(gi, sj) and self.allowed(gj, si)):
+            return False
+        load.remove(gi, si); load.remove(gj, sj)
+        if load.fits(gi, sj):
+            load.add(gi, sj)
+            if load.fits(gj, si):
+                load.add(gj, si)
+                out[i], out[j] = self.place(gi, sj), self.place(gj, si)
+                return True
+            load.remove(gi, sj)
+        load.add(gi, si); load.add(gj, sj)
+        return False
+
+    def _kempe(self, out, rng: random.Random) -> bool:
+        """
+        Kempe chain ระหว่าง slot A, B (เชื่อมกันถ้าครูหรือกลุ่มเดียวกัน ไม่มีห้องในเฟสนี้) แล้วสลับทั้ง chain
+        ยกเลิกถ้ามีคาบไปลง slot ที่ไม่อนุญาต หรือหลังสลับ slot ใดเกินความจุมากขึ้น
+        """
+        placed = [i for i, g in enumerate(out) if not _is_unassigned(g)]
+        if not placed:
+            return False
+        start = rng.choice(placed)
+        a = _sid_of(self.slot_index, out[start])
+        choices = [sid for sid in self.slot_index.group_slot_ids(out[start].get("group_type_id")) if sid != a]
+        if a is None or not choices:
+            return False
+        b = rng.choice(choices)
+        sid_of = {i: _sid_of(self.slot_index, out[i]) for i in placed}
+        in_slot = {a: [i for i in placed if sid_of[i] == a], b: [i for i in placed if sid_of[i] == b]}
+
+        chain, stack = {start}, [start]
+        while stack:
+            i = stack.pop()
+            for j in in_slot[b if sid_of[i] == a else a]:
+                if j not in chain and (out[i]["teacher"] == out[j]["teacher"]
+                                       or out[i]["student_group"] == out[j]["student_group"]):
+                    chain.add(j)
+                    stack.append(j)
+
+        moved = {i: b if sid_of[i] == a else a for i in chain}
+        if not all(self.allowed(out[i], sid) for i, sid in moved.items()):
+            return False
+        before, after = _Load(self), _Load(self)
+        for i in in_slot[a] + in_slot[b]:
+            before.add(out[i], sid_of[i])
+            after.add(out[i], moved.get(i, sid_of[i]))
+        if self.unmatched(after) > self.unmatched(before):
+            return False
+        for i, sid in moved.items():
+            out[i] = self.place(out[i], sid)
+        return True
+
+    def _block(self, out, load: _Load, rng: random.Random, max_tries: int = 20) -> bool:
+        """ย้ายทุกคาบของวิชาที่อยู่วันเดียวกันไปเป็นก้อนต่อเนื่องใหม่ (เหมือน operators.block_move ไม่มีห้อง)"""
+        blocks = defaultdict(list)
+        for i, g in enumerate(out):
+            if not _is_unassigned(g):
+                blocks[(course_key(g), g["day_of_week"])].append(i)
+        if not blocks:
+            return False
+        block = sorted(rng.choice(list(blocks.values())), key=lambda i: out[i]["start_time"])
+        runs = _consecutive_runs(self.slot_index, out[block[0]].get("group_type_id"), len(block))
+        if not runs:
+            return False
+        old = [_sid_of(self.slot_index, out[i]) for i in block]
+        if None in old:
+            return False
+        for i, sid in zip(block, old):
+            load.remove(out[i], sid)
+        for _ in range(max_tries):
+            run = rng.choice(runs)
+            added = []
+            for i, sid in zip(block, run):
+                if not load.fits(out[i], sid):
+                    break
+                load.add(out[i], sid)
+                added.append((i, sid))
+            if len(added) == len(block):
+                for i, sid in added:
+                    out[i] = self.place(out[i], sid)
+                return True
+            for i, sid in added:
+                load.remove(out[i], sid)
+        for i, sid in zip(block, old):
+            load.add(out[i], sid)
+        return False
+
+    def fill(self, individual, rng: random.Random, cancel_event=None):
+        """เติมคาบที่ยัง unassigned ลง slot แรกที่วางได้ (ลองทุก slot ของกลุ่ม)"""
+        out = [dict(g) for g in individual]
+        load = _Load(self, out)
+        for i, g in enumerate(out):
+            if not _is_unassigned(g):
+                continue
+            _check_cancel(cancel_event)
+            gid = g.get("group_type_id")
+            sid = self.pick_slot(g, load, rng, tries=len(self.slot_index.group_slot_ids(gid)))
+            if sid is not None:
+                load.add(g, sid)
+                out[i] = self.place(g, sid)
+        return out
+
+    def decode(self, individual) -> List[Dict[str, Any]]:
+        """เฟส 2: จัดห้องทีละ slot ด้วย matching (คาบที่เกินความจุกลายเป็น unassigned)"""
+        return assign_rooms_by_matching(individual, self.slot_index)
@@ -142,13 +142,16 @@ document.getElementById('btnConfirmDeleteAllGenerated')?.addEventListener('click
   }
 });
 
-async function loadGeneratedTable() {
+// โหลดทีละหน้า (keyset pagination): cursor = next_cursor ของหน้าก่อน → ต่อท้ายตารางเดิม
+async function loadGeneratedTable(cursor = null) {
   const tbody = document.querySelector('#generatedTable tbody');
   if (!tbody) return;
-  tbody.innerHTML = `<tr><td colspan="12" class="text-center text-muted py-3">กำลังโหลด...</td></tr>`;
+  const moreRow = tbody.querySelector('tr.generated-more');
+  if (cursor && moreRow) moreRow.innerHTML = `<td colspan="12" class="text-center text-muted py-3">กำลังโหลด...</td>`;
+  else tbody.innerHTML = `<tr><td colspan="12" class="text-center text-muted py-3">กำลังโหลด...</td></tr>`;
 
   try {
-    const res = await fetch('/api/schedule/generated/');
+    const res = await fetch('/api/schedule/generated/' + (cursor ? `?cursor=${encodeURIComponent(cursor)}` : ''));
     if (!res.ok) throw new Error(`HTTP ${res.status}`);
     const data = await res.json();
     const rows = data.results || [];
@@ -171,12 +174,12 @@ async function loadGeneratedTable() {
       return `<span class="badge" ${attr}>${d || "—"}</span>`;
     };
 
-    if (!rows.length) {
+    if (!rows.length && !cursor) {
       tbody.innerHTML = `<tr><td colspan="12" class="text-center text-muted">ไม่มีข้อมูล</td></tr>`;
       return;
     }
 
-    tbody.innerHTML = rows.map(g => `
+    const html = rows.map(g => `
       <tr data-id="${g.id}">
         <td><span class="badge" style="background:#00000020;color:#111;">${esc(g.teacher)}</span></td>
         <td><span class="badge bg-primary">${esc(g.subject_code)}</span></td>
@@ -199,6 +202,17 @@ async function loadGeneratedTable() {
         </td>
       </tr>
     `).join('');
+    tbody.querySelector('tr.generated-more')?.remove();
+    if (cursor) tbody.insertAdjacentHTML('beforeend', html);
+    else tbody.innerHTML = html;
+    if (data.has_more) {
+      tbody.insertAdjacentHTML('beforeend', `
+        <tr class="generated-more"><td colspan="12" class="text-center py-2">
+          <button class="btn btn-outline-secondary btn-sm">โหลดเพิ่ม</button>
+        </td></tr>`);
+      tbody.querySelector('tr.generated-more button')
+        .addEventListener('click', () => loadGeneratedTable(data.next_cursor));
+    }
   } catch (e) {
     tbody.innerHTML = `<tr><td colspan="12" class="text-center text-danger">โหลดข้อมูลไม่สำเร็จ</td></tr>`;
   }
@@ -228,11 +242,14 @@ function generateSchedule() {
   })
   .then(async (r) => {
     if (r.status === 204) { setModalState("error", { message: "ยกเลิกแล้ว" }); return; }
-    const d = await r.json().catch(()=> ({}));
+    let d = await r.json().catch(()=> ({}));
 
     if (r.status === 409) { setModalState("error", { message: d?.message || "ระบบกำลังทำงานอยู่" }); return; }
-    if (r.ok && (d.status === "success" || !d.status)) setModalState("success");
-    else setModalState("error", { message: d?.message || "เกิดข้อผิดพลาด" });
+    // โหมดคิว (GA_SOLVER_MODE = "queue"): ได้ 202 + job_id → ถามสถานะจนงานจบ
+    if (r.status === 202 && d.job_id) d = await pollSolveJob(d.job_id, genCtrl.signal);
+    if (d.status === "cancelled") { setModalState("error", { message: "ยกเลิกแล้ว" }); return; }
+    if (r.ok && (d.status === "success" || d.status === "done" || !d.status)) setModalState("success");
+    else setModalState("error", { message: d?.error || d?.message || "เกิดข้อผิดพลาด" });
   })
   .catch((e) => {
     if (e.name !== "AbortError") setModalState("error", { message: "เกิดข้อผิดพลาดในการสร้าง" });
@@ -241,6 +258,22 @@ function generateSchedule() {
 }
 
 
+async function pollSolveJob(jobId, signal) {
+  while (true) {
+    const r = await fetch(`/api/schedule/jobs/${jobId}/`, { signal });
+    const d = await r.json().catch(()=> ({}));
+    if (!r.ok) return { status: "error", message: d?.message };
+    if (d.status === "queued") {
+      setModalState("processing", { message: `รอคิวลำดับที่ ${d.position}` });
+    } else if (d.status === "running") {
+      setModalState("processing", { message: "กำลังประมวลผล" });
+    } else {
+      return d;
+    }
+    await new Promise(res => setTimeout(res, 1500));
+  }
+}
+
 async function doCancelGeneration() {
   try { genCtrl?.abort(); } catch {}
   try {
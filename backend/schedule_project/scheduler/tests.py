@@ -1,3 +1,305 @@
-from django.test import TestCase
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from datetime import time
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from .models import GeneratedSchedule, SolveJob
+from .solver import (
+    compile_problem, count_hard_violations, pack_schedule, problem_fingerprint, run_portfolio, unpack_schedule,
+)
+from .solver.packing import PERSIST_FIELDS
+from .solver.placement import find_slot_for_gene
+from .solver.problem import SlotIndex
+from .solver.snapshot import load_snapshot, save_snapshot
+
+
+def synthetic_problem(n_courses: int = 12) -> dict:
+    """โจทย์เล็ก ๆ แบบไม่พึ่ง DB: 2 กลุ่มเวลา × 2 วัน × 4 คาบ, ห้องหลายประเภท, ห้องถูกจองล่วงหน้า 1 ช่วง"""
+    days = ["จันทร์", "อังคาร"]
+    return {
+        "courses": [
+            {"id": i, "teacher_name_course": f"ครู{i % 4}", "subject_code_course": f"S{i}",
+             "subject_name_course": f"วิชา{i}", "student_group_name_course": f"กลุ่ม{i % 3}",
+             "room_type_course": ["ปฏิบัติ", "บรรยาย", ""][i % 3], "section_course": "1",
+             "theory_slot_amount_course": 2, "lab_slot_amount_course": 1, "group_type_id": 1 + i % 2}
+            for i in range(n_courses)
+        ],
+        "rooms": [{"id": 1, "room_name": "L1", "room_type": "ปฏิบัติ"},
+                  {"id": 2, "room_name": "L2", "room_type": "ปฏิบัติ"},
+                  {"id": 3, "room_name": "R1", "room_type": "บรรยาย"},
+                  {"id": 4, "room_name": "R2", "room_type": "บรรยาย"}],
+        "groupallows": [
+            {"id": k, "group_id": g, "group_type": f"ประเภท{g}", "day_of_week": d,
+             "start_time": time(h), "stop_time": time(h + 1)}
+            for k, (g, d, h) in enumerate((g, d, h) for g in (1, 2) for d in days for h in range(8, 12))
+        ],
+        "preschedules": [{"id": 1, "day_pre": "จันทร์", "start_time_pre": time(8), "stop_time_pre": time(10),
+                          "room_name_pre": "L1"}],
+    }
+
+
+def _run_python(args, hash_seed: str) -> str:
+    """รัน python ใน process ใหม่ด้วย PYTHONHASHSEED ที่กำหนด (ลำดับ hash ของ str ต่างกันเหมือนต่างเครื่อง/ต่างรอบ)"""
+    env = {**os.environ, "PYTHONHASHSEED": hash_seed}
+    out = subprocess.run([sys.executable, *args], capture_output=True, text=True, check=True,
+                         env=env, cwd=settings.BASE_DIR)
+    return out.stdout
+
+
+_SOLVE_SCRIPT = """
+import json, sys
+from scheduler.solver.cli import schedule_records, solve_problem
+from scheduler.solver.snapshot import load_snapshot
+params = {"sa": {"iterations": 1500}}.get(sys.argv[2], {"generations": 25, "pop_size": 12})
+solved = solve_problem(load_snapshot(sys.argv[1]), engine=sys.argv[2], seed=11, params=params)
+print(json.dumps({"fitness": solved["report"]["fitness"], "schedule": schedule_records(solved["schedule"])}))
+"""
+
+
+class SolverDeterminismTests(SimpleTestCase):
+    """seed เดียวกันบนโจทย์ .npz เดียวกัน → ตารางเดียวกัน แม้ลำดับ hash ของแต่ละ process ต่างกัน"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.npz = save_snapshot(synthetic_problem(), os.path.join(cls.tmp.name, "problem.npz"))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+        super().tearDownClass()
+
+    def test_same_seed_same_schedule_across_processes(self):
+        for engine in ("ga", "ga_matching", "sa"):
+            with self.subTest(engine=engine):
+                runs = [json.loads(_run_python(["-c", _SOLVE_SCRIPT, self.npz, engine], hash_seed=h))
+                        for h in ("1", "2")]
+                self.assertTrue(runs[0]["schedule"])
+                self.assertEqual(runs[0], runs[1])
+
+
+class CliReproducibilityTests(SimpleTestCase):
+    """report ของ CLI มีทุกอย่างที่ต้องใช้รันซ้ำ: รันสองครั้งด้วย --seed เดียวกัน → ผลเหมือนกัน"""
+
+    def test_same_seed_same_output(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            npz = save_snapshot(synthetic_problem(), os.path.join(tmp, "problem.npz"))
+            outputs = []
+            for h in ("1", "2"):
+                report_path = os.path.join(tmp, f"report{h}.json")
+                stdout = _run_python(["-m", "scheduler.solver", npz, "--seed", "5", "--format", "csv",
+                                      "--param", "generations=20", "--param", "pop_size=10",
+                                      "--report", report_path], hash_seed=h)
+                with open(report_path, encoding="utf-8") as f:
+                    report = json.load(f)
+                # ต่างกันได้เฉพาะเวลา/รหัส log ของรอบนั้น
+                del report["log_id"], report["timings"]
+                report["trace"] = [point[1:] for point in report["trace"]]
+                outputs.append((stdout, report))
+        self.assertIn("subject_code", outputs[0][0])
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_unknown_param_is_usage_error(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            npz = save_snapshot(synthetic_problem(), os.path.join(tmp, "problem.npz"))
+            out = subprocess.run([sys.executable, "-m", "scheduler.solver", npz, "--engine", "sa",
+                                  "--param", "generations=5"],
+                                 capture_output=True, text=True, cwd=settings.BASE_DIR)
+        self.assertEqual(out.returncode, 2)
+        self.assertIn("generations", out.stderr)
+        self.assertNotIn("Traceback", out.stderr)
+
+
+class SolverPipelineTests(SimpleTestCase):
+    """compile → portfolio → pack บนโจทย์สังเคราะห์ (ไม่แตะ DB)"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.problem = compile_problem(synthetic_problem())
+
+    def test_portfolio_schedules_every_unit(self):
+        result = run_portfolio(self.problem, runs=2, workers=2, seed=3, params={"generations": 10, "pop_size": 8})
+        self.assertEqual(len(result["portfolio"]), 2)
+        self.assertEqual(result["fitness"], max(r["fitness"] for r in result["portfolio"]))
+        self.assertEqual(len(result["schedule"]), len(self.problem["courses"]))
+        placed = [r for r in result["schedule"] if r["assigned"]]
+        self.assertTrue(placed)
+        # ห้องที่ถูกจองล่วงหน้า (L1 จันทร์ 08:00-10:00) ห้ามถูกใช้
+        for r in placed:
+            self.assertFalse(r["room"] == "L1" and r["day_of_week"] == "จันทร์" and r["start_time"] < time(10))
+
+    def test_trace_ends_at_returned_fitness(self):
+        for engine, params in (("ga", {"generations": 10, "pop_size": 8}),
+                               ("ga_matching", {"generations": 10, "pop_size": 8}),
+                               ("sa", {"iterations": 800})):
+            with self.subTest(engine=engine):
+                result = run_portfolio(self.problem, runs=1, seed=5, engine=engine, params=params)
+                self.assertEqual(result["trace"][-1][2], result["fitness"])
+                self.assertEqual(result["trace"][-1][3], result["hard_violations"])
+
+    def test_pack_unpack_round_trip(self):
+        result = run_portfolio(self.problem, runs=1, seed=3, params={"generations": 5, "pop_size": 8})
+        placed = [r for r in result["schedule"] if r["assigned"]]
+        rows = unpack_schedule(pack_schedule(result["schedule"]))
+        self.assertEqual(len(rows), len(placed))
+        for row, orig in zip(rows, placed):
+            self.assertTrue(row["assigned"])
+            for f in PERSIST_FIELDS:
+                self.assertEqual(row[f], orig[f], f)
+        self.assertEqual(unpack_schedule(b""), [])
+
+
+class HardViolationTests(SimpleTestCase):
+    """count_hard_violations นับเฉพาะข้อบังคับที่เปิดอยู่ (ตรงกับ ConstraintProfile)"""
+
+    def test_disabled_terms_are_not_counted(self):
+        gene = {"subject_code": "S1", "subject_name": "วิชา1", "section": "1", "type": "theory",
+                "teacher": "ครู", "student_group": "กลุ่ม", "day_of_week": "จันทร์",
+                "start_time": time(8), "stop_time": time(9), "room": "R1", "group_type_id": 1,
+                "room_type_course": "ปฏิบัติ", "assigned": True}
+        # สองคาบของครู/กลุ่มเดียวกันในเวลาเดียวกัน ต่างห้อง; R2 เป็นห้องบรรยาย (ผิดประเภท)
+        individual = [gene, {**gene, "subject_code": "S2", "room": "R2"}]
+        allow_set = {(1, "จันทร์", time(8), time(9), "R1"), (1, "จันทร์", time(8), time(9), "R2")}
+        room_type_of = {"R1": "ปฏิบัติ", "R2": "บรรยาย"}
+        self.assertEqual(count_hard_violations(individual, allow_set, room_type_of), 3)
+        off = {"teacher_conflict_enabled": False, "student_conflict_enabled": False, "room_type_enabled": False}
+        self.assertEqual(count_hard_violations(individual, allow_set, room_type_of, off), 0)
+        self.assertEqual(count_hard_violations(individual, set(), room_type_of, off), 2)
+        self.assertEqual(count_hard_violations(individual, set(), room_type_of, {**off, "group_allow_enabled": False}), 0)
+
+
+class PlacementTests(SimpleTestCase):
+    def test_find_slot_uses_only_free_rooms(self):
+        # 20 ห้อง × 2 slot ถูกจองหมดเหลือคู่เดียว (R7, slot 1) — ต้องเจอทุกครั้งแม้ max_tries น้อย
+        slots = [("จันทร์", time(8), time(9)), ("จันทร์", time(9), time(10))]
+        rooms = [(f"R{i}", "บรรยาย") for i in range(20)]
+        blocked = [(f"R{i}", sid) for i in range(20) for sid in (0, 1) if (i, sid) != (7, 1)]
+        index = SlotIndex.from_parts(slots, {1: [0, 1]}, rooms, blocked)
+        rng = random.Random(0)
+        for _ in range(20):
+            slot = find_slot_for_gene({"group_type_id": 1}, index, index, rng, max_tries=3)
+            self.assertEqual((slot["room"], slot["start_time"]), ("R7", time(9)))
+
+
+class SnapshotRoundTripTests(SimpleTestCase):
+    """snapshot ทุกรูปแบบโหลดกลับแล้วได้โจทย์เดียวกัน (problem_fingerprint เท่ากัน)"""
+
+    def test_formats_keep_fingerprint(self):
+        raw = synthetic_problem()
+        expected = problem_fingerprint(compile_problem(raw))
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ("problem.json", "csv", "problem.npz"):
+                with self.subTest(format=name):
+                    path = save_snapshot(raw, os.path.join(tmp, name))
+                    self.assertEqual(problem_fingerprint(compile_problem(load_snapshot(path))), expected)
+
+    def test_fingerprint_ignores_row_ids(self):
+        raw = synthetic_problem()
+        shuffled = {**raw, "courses": [{**c, "id": 100 + c["id"]} for c in reversed(raw["courses"])]}
+        self.assertEqual(problem_fingerprint(compile_problem(shuffled)), problem_fingerprint(compile_problem(raw)))
+
+
+class GeneratedScheduleApiTests(TestCase):
+    """keyset pagination ของตารางที่สร้างแล้ว และ conditional GET (ETag → 304)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("tester", password="x")
+        other = User.objects.create_user("other", password="x")
+        rows = [
+            GeneratedSchedule(subject_code=f"S{i}", subject_name=f"วิชา{i}", teacher=f"ครู{i % 2}",
+                              room=f"R{i % 3}", day_of_week=day, start_time=time(h), stop_time=time(h + 1),
+                              created_by=cls.user)
+            for i, (day, h) in enumerate((d, h) for d in ("อังคาร", "จันทร์") for h in (10, 8, 9, 8))
+        ]
+        rows.append(GeneratedSchedule(subject_code="X", subject_name="อื่น", day_of_week="จันทร์",
+                                      start_time=time(8), stop_time=time(9), created_by=other))
+        GeneratedSchedule.objects.bulk_create(rows)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def _pages(self, url, params):
+        items, cursor = [], None
+        while True:
+            resp = self.client.get(url, {**params, **({"cursor": cursor} if cursor else {})})
+            self.assertEqual(resp.status_code, 200)
+            page = resp.json()
+            self.assertLessEqual(page["count"], params["limit"])
+            items.append(page)
+            cursor = page["next_cursor"]
+            if not page["has_more"]:
+                self.assertIsNone(cursor)
+                return items
+
+    def test_keyset_pages_cover_all_rows_in_order(self):
+        pages = self._pages("/api/schedule/generated/", {"limit": 3})
+        rows = [r for p in pages for r in p["results"]]
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(len(rows), 8)
+        self.assertEqual(len({r["id"] for r in rows}), 8)
+        days = [r["day_of_week"] for r in rows]
+        self.assertEqual(days, ["จันทร์"] * 4 + ["อังคาร"] * 4)
+        for a, b in zip(rows, rows[1:]):
+            if a["day_of_week"] == b["day_of_week"]:
+                self.assertLessEqual((a["start_time"], a["id"]), (b["start_time"], b["id"]))
+
+    def test_view_api_total_entries_counts_filtered_rows(self):
+        pages = self._pages("/api/schedule/view-generated/", {"limit": 2, "teacher": "ครู0", "fields": "id,Teacher"})
+        self.assertEqual({p["total_entries"] for p in pages}, {4})
+        rows = [r for p in pages for r in p["schedules"]]
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(set(rows[0]), {"id", "Teacher"})
+
+    def test_bad_cursor_and_field(self):
+        self.assertEqual(self.client.get("/api/schedule/generated/", {"cursor": "!!"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/schedule/generated/", {"fields": "nope"}).status_code, 400)
+
+    def test_etag_not_modified_until_data_changes(self):
+        url = "/api/schedule/list/"
+        first = self.client.get(url, {"view": "teacher"})
+        self.assertEqual(first.status_code, 200)
+        etag = first["ETag"]
+        again = self.client.get(url, {"view": "teacher"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(again.status_code, 304)
+
+        GeneratedSchedule.objects.create(subject_code="S9", subject_name="วิชา9", teacher="ครู9",
+                                         day_of_week="พุธ", start_time=time(8), stop_time=time(9),
+                                         created_by=self.user)
+        changed = self.client.get(url, {"view": "teacher"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], etag)
+        self.assertIn("ครู9", [r["key"] for r in changed.json()["results"]])
+
+
+@override_settings(GA_SOLVER_MODE="queue")
+class SolveQueueApiTests(TestCase):
+    """โหมดคิว: user ละไม่เกิน 1 งานที่ค้าง กดซ้ำได้งานเดิม"""
+
+    def setUp(self):
+        self.user = User.objects.create_user("tester", password="x")
+        self.client.force_login(self.user)
+
+    def test_repeat_click_returns_pending_job(self):
+        first = self.client.post("/api/schedule/generate/", "{}", content_type="application/json")
+        self.assertEqual(first.status_code, 202)
+        self.assertFalse(first.json()["existing"])
+        again = self.client.post("/api/schedule/generate/", "{}", content_type="application/json")
+        self.assertEqual(again.status_code, 202)
+        self.assertTrue(again.json()["existing"])
+        self.assertEqual(again.json()["job_id"], first.json()["job_id"])
+        self.assertEqual(SolveJob.objects.filter(created_by=self.user).count(), 1)
+
+        SolveJob.objects.filter(pk=first.json()["job_id"]).update(status=SolveJob.DONE)
+        after = self.client.post("/api/schedule/generate/", "{}", content_type="application/json")
+        self.assertFalse(after.json()["existing"])
+        self.assertNotEqual(after.json()["job_id"], first.json()["job_id"])
@@ -34,7 +34,15 @@ urlpatterns = [
     path("api/schedule/detail/", views.schedule_detail_api, name="schedule_detail"),
     path('api/schedule/timetable/', views.timetable_by_entity, name='timetable_by_entity'),
     path('api/schedule/cancel/', views.cancel_generation, name='cancel_generation'),
+    path("api/schedule/jobs/", views.list_solve_jobs, name="list_solve_jobs"),
+    path("api/schedule/jobs/<int:pk>/", views.solve_job_status, name="solve_job_status"),
     path("api/schedule/list/", views.list_generated_entities_api, name="list_generated_entities"),
+    path("api/schedule/runs/", views.list_generation_runs, name="list_generation_runs"),
+    path("api/schedule/runs/<int:pk>/trace/", views.generation_run_trace, name="generation_run_trace"),
+    path("api/schedule/runs/<int:pk>/violations/", views.generation_run_violations, name="generation_run_violations"),
+    path("api/schedule/runs/<int:pk>/alternatives/", views.generation_run_alternatives, name="generation_run_alternatives"),
+    path("api/schedule/runs/<int:pk>/activate/", views.activate_generation_run_api, name="activate_generation_run"),
+    path("api/schedule/constraints/", views.constraint_profile_api, name="constraint_profile"),
 
     # Pre-Schedule APIs
     path("api/pre/", views.get_pre, name="get_pre"),
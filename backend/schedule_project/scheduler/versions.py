@@ -0,0 +1,139 @@
+"""
+ตัวนับเวอร์ชันข้อมูลต่อ user (DataVersion) สำหรับ conditional GET (ETag / Last-Modified → 304)
+
+- model ในแต่ละ scope ถูก save/delete → signal จด (user, scope) ว่าเปลี่ยน
+- ระหว่าง request (DataVersionMiddleware) หรือใน collect_bumps() จะรวมไว้ แล้วเพิ่มตัวนับครั้งเดียวตอนจบ
+  (ลบ/เพิ่มทีละหลายพันแถวก็ UPDATE ตัวนับแค่ scope ละครั้ง และเกิดหลังข้อมูล commit แล้ว)
+- การเขียนแบบ bulk (bulk_create/bulk_update/update) ไม่มี signal — ผู้เขียนต้องเรียก mark_changed เอง
+- view ที่อ่านอย่างเดียวครอบด้วย @versioned("timetable", ...) : ETag มาจากตัวนับ ไม่ต้องรัน query หนักของ view
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .models import (
+    CourseSchedule, DataVersion, GeneratedSchedule, PreSchedule, RoomType, StudentGroup, Teacher, WeekActivity,
+)
+
+# scope → model ที่ endpoint ใน scope นั้นอ่าน
+SCOPE_MODELS = {
+    "timetable": (GeneratedSchedule, PreSchedule, WeekActivity, CourseSchedule),
+    "lookups": (Teacher, RoomType, StudentGroup),
+}
+
+_pending: ContextVar[set | None] = ContextVar("data_version_pending", default=None)
+
+
+def bump_versions(keys) -> None:
+    """เพิ่มตัวนับของ (user_id, scope) แต่ละคู่ทีละ 1 (สร้างแถวถ้ายังไม่มี)"""
+    now = timezone.now()
+    for user_id, scope in sorted(keys):
+        if DataVersion.objects.filter(created_by_id=user_id, scope=scope).update(
+            version=F("version") + 1, updated_at=now,
+        ):
+            continue
+        try:
+            with transaction.atomic():
+                DataVersion.objects.create(created_by_id=user_id, scope=scope, version=1)
+        except IntegrityError:   # request อื่นเพิ่งสร้างแถวนี้
+            DataVersion.objects.filter(created_by_id=user_id, scope=scope).update(
+                version=F("version") + 1, updated_at=now,
+            )
+
+
+def mark_changed(user_id, *scopes) -> None:
+    """จดว่าข้อมูลของ user ใน scope เหล่านี้เปลี่ยน (อยู่ใน collect_bumps = รวมไว้ก่อน, นอกนั้นเพิ่มทันที)"""
+    if user_id is None:
+        return
+    keys = {(user_id, scope) for scope in scopes}
+    pending = _pending.get()
+    if pending is None:
+        bump_versions(keys)
+    else:
+        pending.update(keys)
+
+
+@contextmanager
+def collect_bumps():
+    """รวมการเปลี่ยนแปลงในบล็อกนี้ แล้วเพิ่มตัวนับครั้งเดียวตอนออก (หลัง transaction ข้างในจบแล้ว)"""
+    pending = set()
+    token = _pending.set(pending)
+    try:
+        yield pending
+    finally:
+        _pending.reset(token)
+        if pending:
+            bump_versions(pending)
+
+
+class DataVersionMiddleware:
+    """ทุก request: รวม signal ของการเขียนทั้งหมด แล้วเพิ่มตัวนับ scope ละครั้งตอนตอบกลับ"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with collect_bumps():
+            return self.get_response(request)
+
+
+def _model_changed(sender, instance, **kwargs):
+    mark_changed(getattr(instance, "created_by_id", None), *_SCOPES_OF[sender])
+
+
+_SCOPES_OF = {}
+for _scope, _models in SCOPE_MODELS.items():
+    for _model in _models:
+        _SCOPES_OF.setdefault(_model, []).append(_scope)
+
+
+def connect_signals() -> None:
+    """เรียกจาก SchedulerConfig.ready()"""
+    for model in _SCOPES_OF:
+        post_save.connect(_model_changed, sender=model, dispatch_uid=f"data_version_save_{model.__name__}")
+        post_delete.connect(_model_changed, sender=model, dispatch_uid=f"data_version_delete_{model.__name__}")
+
+
+def current_versions(request, scopes) -> tuple:
+    """(ETag, Last-Modified) ของ user จากตัวนับของ scopes — คำนวณครั้งเดียวต่อ request"""
+    cached = getattr(request, "_data_versions", None)
+    if cached is None:
+        rows = dict(
+            (scope, (version, updated_at))
+            for scope, version, updated_at in DataVersion.objects.filter(
+                created_by=request.user, scope__in=scopes,
+            ).values_list("scope", "version", "updated_at")
+        )
+        tag = "-".join(f"{scope}{rows.get(scope, (0, None))[0]}" for scope in scopes)
+        stamps = [u for _, u in rows.values() if u is not None]
+        cached = request._data_versions = (f'"u{request.user.pk}-{tag}"', max(stamps) if stamps else None)
+    return cached
+
+
+def versioned(*scopes):
+    """
+    conditional GET จากตัวนับของ scopes: If-None-Match/If-Modified-Since ตรง = 304 (ไม่เรียก view)
+    ผู้ใช้ที่ไม่ได้ล็อกอินผ่านไปที่ view ตามปกติ; ทุกคำตอบบังคับ revalidate (private, no-cache)
+    """
+    def decorator(view):
+        conditional = condition(
+            etag_func=lambda request, *a, **kw: current_versions(request, scopes)[0],
+            last_modified_func=lambda request, *a, **kw: current_versions(request, scopes)[1],
+        )(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                return view(request, *args, **kwargs)
+            response = conditional(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
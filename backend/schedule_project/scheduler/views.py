@@ -1,8 +1,10 @@
+import base64
 import csv
 import json
 import logging
 import os
 import re
+import sys
 from datetime import datetime, date, time, timedelta
 from io import StringIO
 from django.http import JsonResponse
@@ -10,7 +12,7 @@ from django.shortcuts import render
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils.dateparse import parse_time
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.conf import settings
 from django.db.models import Case, When, Value, IntegerField, Q
 from django.views.decorators.http import require_GET
@@ -31,10 +33,14 @@ import math
 from pathlib import Path
 
 # views.py
-from .main import run_genetic_algorithm_from_db, GenerationCancelled
-from .models import WeekActivity, PreSchedule, CourseSchedule, ScheduleInfo
+# solver (pandas/numpy) และ PDF (pdfkit) import ใน view ที่ใช้เท่านั้น — หน้า CRUD/คำสั่งทั่วไปไม่ต้องโหลด
+# (วัดได้ด้วย python manage.py startup_benchmark)
+from .jobs import (
+    enqueue_user_job, start_inline_job, run_job, job_status, request_cancel, user_has_running_job,
+)
+from .models import WeekActivity, PreSchedule, CourseSchedule, ScheduleInfo, ConstraintProfile, SolveJob
+from .versions import versioned
 
-from threading import Event, Lock
 from django.views.decorators.http import require_POST
 
 from .models import (
@@ -47,7 +53,8 @@ from .models import (
     Subject,
     Teacher,
     DAY_CHOICES,
-    GeneratedSchedule
+    GeneratedSchedule,
+    GenerationRun,
 )
 
 logger = logging.getLogger(__name__)
@@ -64,17 +71,25 @@ def to_int(v, default=0) -> int:
     except Exception:
         return default
 
-DAY_ORDER = Case(
-    When(Day__in=["จันทร์", "จ.", "Mon", "MON", "monday"], then=Value(1)),
-    When(Day__in=["อังคาร", "อ.", "Tue", "TUE", "tuesday"], then=Value(2)),
-    When(Day__in=["พุธ", "พ.", "Wed", "WED", "wednesday"], then=Value(3)),
-    When(Day__in=["พฤหัสบดี", "พฤ.", "Thu", "THU", "thursday"], then=Value(4)),
-    When(Day__in=["ศุกร์", "ศ.", "Fri", "FRI", "friday"], then=Value(5)),
-    When(Day__in=["เสาร์", "ส.", "Sat", "SAT", "saturday"], then=Value(6)),
-    When(Day__in=["อาทิตย์", "อา.", "Sun", "SUN", "sunday"], then=Value(7)),
-    default=Value(99),
-    output_field=IntegerField(),
-)
+DAY_ALIASES = [
+    ["จันทร์", "จ.", "Mon", "MON", "monday"],
+    ["อังคาร", "อ.", "Tue", "TUE", "tuesday"],
+    ["พุธ", "พ.", "Wed", "WED", "wednesday"],
+    ["พฤหัสบดี", "พฤ.", "Thu", "THU", "thursday"],
+    ["ศุกร์", "ศ.", "Fri", "FRI", "friday"],
+    ["เสาร์", "ส.", "Sat", "SAT", "saturday"],
+    ["อาทิตย์", "อา.", "Sun", "SUN", "sunday"],
+]
+
+def day_order(field: str) -> Case:
+    """ลำดับวัน (จันทร์=1 … อาทิตย์=7, อื่น ๆ=99) ของคอลัมน์ field — ใช้ order_by/annotate ใน DB"""
+    return Case(
+        *[When(**{f"{field}__in": names}, then=Value(i)) for i, names in enumerate(DAY_ALIASES, start=1)],
+        default=Value(99),
+        output_field=IntegerField(),
+    )
+
+DAY_ORDER = day_order("Day")
 
 def _overlap_q(day_field, start_field, stop_field, day, start, stop):
     """
@@ -87,51 +102,18 @@ def slot_start_hour(ts: str) -> int:
     m = re.search(r"(\d{1,2})(?::\d{2})?", ts or "")
     return int(m.group(1)) if m else 0
 
-# close ga 
-cancel_event = Event()
-generation_lock = Lock()
-generation_running = False
-
+# -------------------- GA cancel --------------------
 @login_required(login_url="/login/")
 @require_POST
 def cancel_generation(request):
-    cancel_event.set()
-    return HttpResponse(status=204)
-
-# -------------------- GA generate --------------------
-@login_required(login_url="/login/")
-@require_http_methods(["POST"])
-def generate_schedule_api(request):
-    """
-    รัน GA แบบ ผูก user + กันรันซ้อน + ยกเลิกได้
-    * ต้องแก้ใน main.run_genetic_algorithm_from_db(...) ให้รับ user และ filter ด้วย created_by=user
-    """
-    global generation_running
-    if not generation_lock.acquire(blocking=False):
-        return JsonResponse({"status": "busy", "message": "already running"}, status=409)
-
+    """ยกเลิกงาน solve ของ user นี้ (body {"job_id": n} = เฉพาะงานนั้น, ไม่ส่ง = ทุกงานที่ค้าง)"""
     try:
-        if generation_running:
-            return JsonResponse({"status": "busy", "message": "already running"}, status=409)
-
-        generation_running = True
-        cancel_event.clear()
-
-        try:
-            result = run_genetic_algorithm_from_db(request.user, cancel_event=cancel_event)
-            return JsonResponse(_san(result), json_dumps_params={"ensure_ascii": False})
-
-        except GenerationCancelled:
-            return HttpResponse(status=204)
-
-        except Exception as e:
-            logger.exception(f"[{request.user}] GA error")
-            return JsonResponse({"status": "error", "message": str(e)}, status=500,
-                                json_dumps_params={"ensure_ascii": False})
-    finally:
-        generation_running = False
-        cancel_event.clear()
-        generation_lock.release()
+        payload = json.loads(request.body or "{}")
+    except ValueError:
+        payload = {}
+    job_id = to_int(payload.get("job_id"), 0) or None
+    request_cancel(request.user, job_id)
+    return HttpResponse(status=204)
 
 # ------------------------- pages -------------------------
 @login_required(login_url="/login/")
@@ -222,23 +204,18 @@ SLOT_TIME_MAPPING = {
 }
 
 # ========== Generate Schedule API ==========
-try:
-    import numpy as np
-except Exception:
-    class np:
-        integer = ()
-        floating = ()
-        bool_ = ()
-
 def _san(v):
     # --- แก้ชนิดที่ JSON ไม่รู้จัก ---
-    if isinstance(v, (np.integer,)):           # np.int64, np.int32
-        return int(v)
-    if isinstance(v, (np.floating,)):          # np.float64
-        f = float(v)
-        return None if (math.isnan(f) or math.isinf(f)) else f
-    if isinstance(v, (np.bool_,)):             # np.bool_
-        return bool(v)
+    # ไม่ import numpy เอง: ถ้ายังไม่ถูกโหลด ค่าก็ไม่มีทางเป็นชนิดของ numpy
+    np = sys.modules.get("numpy")
+    if np is not None:
+        if isinstance(v, (np.integer,)):           # np.int64, np.int32
+            return int(v)
+        if isinstance(v, (np.floating,)):          # np.float64
+            f = float(v)
+            return None if (math.isnan(f) or math.isinf(f)) else f
+        if isinstance(v, (np.bool_,)):             # np.bool_
+            return bool(v)
 
     if isinstance(v, Decimal):
         return float(v)
@@ -316,35 +293,69 @@ def create_schedule_csv_file():
 @require_http_methods(["POST"])
 def generate_schedule_api(request):
     """
-    รัน GA แบบ ผูก user + กันรันซ้อน + ยกเลิกได้
-    * ต้องแก้ใน main.run_genetic_algorithm_from_db(...) ให้รับ user และ filter ด้วย created_by=user
+    สั่ง solve ตารางของ user ผ่านคิวงาน (scheduler.jobs) — user ละ 1 งานที่รันพร้อมกัน, user ต่างกันไม่รอกัน
+      - GA_SOLVER_MODE "inline": รันใน request นี้เลย ตอบผลเต็มเหมือนเดิม (409 ถ้า user นี้มีงานรันอยู่)
+      - GA_SOLVER_MODE "queue" : เข้าคิวแล้วตอบ 202 + job_id/position ให้ถามสถานะที่ /api/schedule/jobs/<id>/
+        (user มีงานค้างอยู่แล้ว → ไม่เข้าคิวซ้ำ ตอบ 202 ด้วยงานเดิมพร้อม "existing": true)
+    body: {"runs", "workers", "engine", "fresh"}; staff ส่ง "priority" ได้ (-10..10)
     """
-    global generation_running
-    if not generation_lock.acquire(blocking=False):
-        return JsonResponse({"status": "busy", "message": "already running"}, status=409)
+    from .solver import ENGINES
 
+    # portfolio: {"runs": N, "workers": M} (ไม่ส่ง body = ใช้ค่าจาก settings)
+    # {"fresh": true} = ไม่ใช้ผลจาก cache แม้ข้อมูลไม่เปลี่ยน
     try:
-        if generation_running:
-            return JsonResponse({"status": "busy", "message": "already running"}, status=409)
+        payload = json.loads(request.body or "{}")
+    except ValueError:
+        payload = {}
+    if not isinstance(payload, dict):
+        return JsonResponse({"status": "error", "message": "body ต้องเป็น JSON object"}, status=400,
+                            json_dumps_params={"ensure_ascii": False})
+    max_runs = getattr(settings, "GA_PORTFOLIO_MAX_RUNS", 8)
+    runs = max(1, min(to_int(payload.get("runs"), getattr(settings, "GA_PORTFOLIO_RUNS", 1)), max_runs))
+    workers = to_int(payload.get("workers"), 0) or getattr(settings, "GA_PORTFOLIO_WORKERS", None)
+    engine = norm(payload.get("engine")) or getattr(settings, "GA_ENGINE", "ga")
+    if engine not in ENGINES:
+        return JsonResponse({"status": "error", "message": f"ไม่รู้จัก engine: {engine}"}, status=400,
+                            json_dumps_params={"ensure_ascii": False})
+    params = {"runs": runs, "workers": workers, "fresh": bool(payload.get("fresh"))}
 
-        generation_running = True
-        cancel_event.clear()
+    if getattr(settings, "GA_SOLVER_MODE", "inline") == "queue":
+        priority = max(-10, min(to_int(payload.get("priority"), 0), 10)) if request.user.is_staff else 0
+        job, created = enqueue_user_job(request.user, engine=engine, params=params, priority=priority)
+        return JsonResponse(_san({"status": "queued", **job_status(job), "existing": not created}), status=202,
+                            json_dumps_params={"ensure_ascii": False})
 
-        try:
-            result = run_genetic_algorithm_from_db(cancel_event=cancel_event, user=request.user)
-            return JsonResponse(_san(result), json_dumps_params={"ensure_ascii": False})
+    job = start_inline_job(request.user, engine=engine, params=params)
+    if job is None:
+        return JsonResponse({"status": "busy", "message": "already running"}, status=409)
+    result = run_job(job)
+    if result.get("status") == "cancelled":
+        return HttpResponse(status=204)
+    if result.get("status") == "error":
+        return JsonResponse(result, status=500, json_dumps_params={"ensure_ascii": False})
+    return JsonResponse(_san({**result, "job_id": job.id}), json_dumps_params={"ensure_ascii": False})
+
+@login_required(login_url="/login/")
+@require_http_methods(["GET"])
+def solve_job_status(request, pk: int):
+    """สถานะงาน solve: status, position (ลำดับในคิว, 0 = ไม่ได้รอแล้ว), result เมื่อเสร็จ"""
+    job = SolveJob.objects.filter(pk=pk, created_by=request.user).first()
+    if job is None:
+        return JsonResponse({"status": "error", "message": "ไม่พบงานนี้"}, status=404,
+                            json_dumps_params={"ensure_ascii": False})
+    return JsonResponse(_san(job_status(job)), json_dumps_params={"ensure_ascii": False})
 
-        except GenerationCancelled:
-            return HttpResponse(status=204)
+@login_required(login_url="/login/")
+@require_http_methods(["GET"])
+def list_solve_jobs(request):
+    """งาน solve ล่าสุดของ user (?active=1 = เฉพาะที่ยังค้างอยู่)"""
+    qs = SolveJob.objects.filter(created_by=request.user)
+    if request.GET.get("active") in ("1", "true"):
+        qs = qs.filter(status__in=(SolveJob.QUEUED, SolveJob.RUNNING))
+    limit = max(1, min(to_int(request.GET.get("limit"), 20), 100))
+    return JsonResponse(_san({"jobs": [job_status(j) for j in qs[:limit]]}),
+                        json_dumps_params={"ensure_ascii": False})
 
-        except Exception as e:
-            logger.exception(f"[{request.user}] GA error")
-            return JsonResponse({"status": "error", "message": str(e)}, status=500,
-                                json_dumps_params={"ensure_ascii": False})
-    finally:
-        generation_running = False
-        cancel_event.clear()
-        generation_lock.release()
 # ========== View Schedule API ==========
 
 @login_required(login_url="/login/")
@@ -399,50 +410,300 @@ def view_schedule_api(request):
         return JsonResponse({"status": "error", "message": f"ไม่สามารถดึงข้อมูลได้: {e}"},
                             status=500, json_dumps_params={"ensure_ascii": False})
 
+# ========== GeneratedSchedule listing (keyset pagination) ==========
+# ทั้งสอง endpoint เรียงตาม (ลำดับวัน, start_time, id) และแบ่งหน้าด้วย cursor ของแถวสุดท้าย
+# (ไม่ใช้ OFFSET — หน้าถัดไปเริ่มต่อจาก key เดิมได้เลย แม้ตารางเปลี่ยนระหว่างเลื่อนดู)
+#   ?limit=N          จำนวนแถวต่อหน้า (ค่าเริ่มต้น settings.GENERATED_PAGE_SIZE, สูงสุด GENERATED_PAGE_MAX)
+#   ?cursor=...       next_cursor จากหน้าก่อน
+#   ?fields=a,b       เลือกเฉพาะคอลัมน์ที่ต้องการ (ชื่อตาม response ของ endpoint นั้น)
+#   ?teacher= &room= &group= &day=   กรองใน DB (ตรงตัว)
+# response: count = จำนวนแถวในหน้านี้, next_cursor/has_more สำหรับหน้าถัดไป
+# (view_generated_schedule_api เดิมคืนทุกแถวในครั้งเดียว ตอนนี้คืนทีละหน้าเหมือนกัน แต่ total_entries
+#  ยังเป็นจำนวนแถวทั้งหมดที่ตรงตัวกรอง — COUNT ครั้งเดียวต่อ request ไม่ขึ้นกับ cursor)
+GENERATED_FILTERS = {"teacher": "teacher", "room": "room", "group": "student_group", "day": "day_of_week"}
+
+def _hhmm(t):
+    return t.strftime("%H:%M") if t else ""
+
+def _text(v):
+    return v or ""
+
+# ชื่อใน response → (field ของ GeneratedSchedule, แปลงค่า)
+GENERATED_LIST_FIELDS = {
+    "id": ("id", None),
+    "teacher": ("teacher", None),
+    "subject_code": ("subject_code", None),
+    "subject_name": ("subject_name", None),
+    "type": ("type", None),
+    "student_group": ("student_group", None),
+    "hours": ("hours", None),
+    "section": ("section", None),
+    "day_of_week": ("day_of_week", None),
+    "start_time": ("start_time", _hhmm),
+    "stop_time": ("stop_time", _hhmm),
+    "room": ("room", None),
+}
+GENERATED_VIEW_FIELDS = {
+    "id": ("id", None),
+    "Course_Code": ("subject_code", _text),
+    "Subject_Name": ("subject_name", _text),
+    "Teacher": ("teacher", _text),
+    "Room": ("room", _text),
+    "Type": ("type", _text),
+    "Student_Group": ("student_group", _text),
+    "Day": ("day_of_week", _text),
+    "StartTime": ("start_time", _hhmm),
+    "StopTime": ("stop_time", _hhmm),
+    "Hour": ("start_time", lambda t: t.hour if t else None),
+}
+
+def _encode_cursor(day_idx: int, start: time, pk: int) -> str:
+    raw = json.dumps([day_idx, start.isoformat() if start else None, pk], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        day_idx, start, pk = json.loads(raw)
+        return int(day_idx), (time.fromisoformat(start) if start else None), int(pk)
+    except (ValueError, TypeError):
+        raise ValueError("cursor ไม่ถูกต้อง")
+
+def _generated_page(request, spec: dict, with_total: bool = False) -> dict:
+    """
+    หน้าหนึ่งของ GeneratedSchedule ของ user ตาม query string (ดูหัวข้อด้านบน)
+    คืน {"results", "count", "next_cursor", "has_more", "fields"} (+ "total" = จำนวนแถวที่ตรงตัวกรองทั้งหมด
+    ถ้า with_total); ValueError ถ้า fields/cursor ไม่ถูกต้อง
+    """
+    fields = [f.strip() for f in (request.GET.get("fields") or "").split(",") if f.strip()] or list(spec)
+    unknown = sorted(set(fields) - set(spec))
+    if unknown:
+        raise ValueError(f"ไม่รู้จัก field: {', '.join(unknown)}")
+    page_max = getattr(settings, "GENERATED_PAGE_MAX", 1000)
+    limit = max(1, min(to_int(request.GET.get("limit"), getattr(settings, "GENERATED_PAGE_SIZE", 200)), page_max))
+
+    qs = GeneratedSchedule.objects.filter(created_by=request.user).annotate(day_idx=day_order("day_of_week"))
+    for param, column in GENERATED_FILTERS.items():
+        value = norm(request.GET.get(param))
+        if value:
+            qs = qs.filter(**{column: value})
+    total = qs.count() if with_total else None
+    cursor = request.GET.get("cursor")
+    if cursor:
+        day_idx, start, pk = _decode_cursor(cursor)
+        qs = qs.filter(
+            Q(day_idx__gt=day_idx)
+            | Q(day_idx=day_idx, start_time__gt=start)
+            | Q(day_idx=day_idx, start_time=start, id__gt=pk)
+        )
+    columns = sorted({spec[f][0] for f in fields} | {"id", "start_time"})
+    rows = list(qs.order_by("day_idx", "start_time", "id").values("day_idx", *columns)[:limit + 1])
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    results = []
+    for r in rows:
+        item = {}
+        for f in fields:
+            column, fmt = spec[f]
+            item[f] = fmt(r[column]) if fmt else r[column]
+        results.append(item)
+    last = rows[-1] if rows else None
+    page = {
+        "results": results,
+        "count": len(results),
+        "next_cursor": _encode_cursor(last["day_idx"], last["start_time"], last["id"]) if has_more else None,
+        "has_more": has_more,
+        "fields": fields,
+    }
+    if with_total:
+        page["total"] = total
+    return page
+
 @login_required(login_url="/login/")
 @require_http_methods(["GET"])
 def view_generated_schedule_api(request):
+    """
+    ตารางที่สร้างแล้ว (คอลัมน์แบบ Course_Code/StartTime/...) ทีละหน้า — ดู GENERATED_VIEW_FIELDS
+    schedules = แถวของหน้านี้ (ใช้ next_cursor ขอหน้าถัดไป), total_entries = จำนวนแถวทั้งหมดที่ตรงตัวกรอง
+    """
     try:
-        qs = GeneratedSchedule.objects.filter(created_by=request.user)\
-                                      .order_by("day_of_week", "start_time", "id")
-        schedules = [{
-            "Course_Code": g.subject_code or "",
-            "Subject_Name": g.subject_name or "",
-            "Teacher": g.teacher or "",
-            "Room": g.room or "",
-            "Type": g.type or "",
-            "Student_Group": g.student_group or "",
-            "Day": g.day_of_week or "",
-            "StartTime": g.start_time.strftime("%H:%M") if g.start_time else "",
-            "StopTime": g.stop_time.strftime("%H:%M") if g.stop_time else "",
-            "Hour": int(g.start_time.strftime("%H")) if g.start_time else None,
-        } for g in qs]
-        return JsonResponse({"status": "success", "total_entries": len(schedules), "schedules": schedules},
+        page = _generated_page(request, GENERATED_VIEW_FIELDS, with_total=True)
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400,
                             json_dumps_params={"ensure_ascii": False})
     except Exception as e:
         logger.error(f"[{request.user}] view_generated_schedule_api error: {e}")
         return JsonResponse({"status": "error", "message": f"ไม่สามารถดึงข้อมูลที่สร้างแล้วได้: {e}"},
                             status=500, json_dumps_params={"ensure_ascii": False})
+    schedules = page.pop("results")
+    total = page.pop("total")
+    return JsonResponse({"status": "success", "total_entries": total, "schedules": schedules, **page},
+                        json_dumps_params={"ensure_ascii": False})
 
 @login_required(login_url="/login/")
 @require_http_methods(["GET"])
 def list_generated_schedules(request):
+    """แถว GeneratedSchedule ของ user ทีละหน้า — ดู GENERATED_LIST_FIELDS"""
     try:
-        qs = (GeneratedSchedule.objects.filter(created_by=request.user)
-              .order_by("-id")
-              .values("id","teacher","subject_code","subject_name","type",
-                      "student_group","hours","section","day_of_week",
-                      "start_time","stop_time","room"))
-        items = []
-        for r in qs:
-            r["start_time"] = r["start_time"].strftime("%H:%M") if r["start_time"] else ""
-            r["stop_time"]  = r["stop_time"].strftime("%H:%M")  if r["stop_time"]  else ""
-            items.append(r)
-        return JsonResponse({"status": "success", "results": items})
+        page = _generated_page(request, GENERATED_LIST_FIELDS)
+    except ValueError as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=400,
+                            json_dumps_params={"ensure_ascii": False})
     except Exception as e:
         logger.error(f"[{request.user}] list_generated_schedules error: {e}")
         return JsonResponse({"status": "error", "message": str(e)}, status=500,
                             json_dumps_params={"ensure_ascii": False})
+    return JsonResponse({"status": "success", **page}, json_dumps_params={"ensure_ascii": False})
+
+@login_required(login_url="/login/")
+@require_http_methods(["GET"])
+def list_generation_runs(request):
+    """ประวัติการรัน GA ของ user (ไม่รวม trace เพื่อให้ payload เล็ก)"""
+    limit = max(1, min(to_int(request.GET.get("limit"), 20), 200))
+    qs = (GenerationRun.objects.filter(created_by=request.user)
+          .order_by("-created_at", "-id")
+          .values("id", "engine", "params", "seed", "input_fingerprint", "is_active", "active_alternative",
+                  "best_fitness", "hard_violations", "unassigned",
+                  "total_entries", "duration_sec", "timings", "created_at")[:limit])
+    return JsonResponse({"status": "success", "results": _san(list(qs))},
+                        json_dumps_params={"ensure_ascii": False})
+
+@login_required(login_url="/login/")
+@require_http_methods(["GET"])
+def generation_run_trace(request, pk: int):
+    """
+    anytime trace ของการรันหนึ่งครั้ง: [elapsed_sec, generation, best_fitness, hard_violations, unassigned]
+    + ความหลากหลายของประชากรทุก generation: [generation, unique_genomes, mean_hamming, injected]
+    """
+    run = GenerationRun.objects.filter(pk=pk, created_by=request.user).first()
+    if run is None:
+        return JsonResponse({"status": "error", "message": "ไม่พบการรันนี้"}, status=404,
+                            json_dumps_params={"ensure_ascii": False})
+    return JsonResponse({
+        "status": "success",
+        "run_id": run.id,
+        "duration_sec": run.duration_sec,
+        "columns": ["elapsed_sec", "generation", "best_fitness", "hard_violations", "unassigned"],
+        "trace": run.trace,
+        "diversity_columns": ["generation", "unique_genomes", "mean_hamming", "injected"],
+        "diversity": run.diversity,
+    }, json_dumps_params={"ensure_ascii": False})
+
+@login_required(login_url="/login/")
+@require_http_methods(["GET"])
+def generation_run_violations(request, pk: int):
+    """การละเมิดแยกตามข้อบังคับ + id ของหน่วยที่ผิด ของตารางจากการรันหนึ่งครั้ง"""
+    run = GenerationRun.objects.filter(pk=pk, created_by=request.user).only("id", "hard_violations", "violations").first()
+    if run is None:
+        return JsonResponse({"status": "error", "message": "ไม่พบการรันนี้"}, status=404,
+                            json_dumps_params={"ensure_ascii": False})
+    return JsonResponse({
+        "status": "success",
+        "run_id": run.id,
+        "hard_violations": run.hard_violations,
+        "violations": run.violations,
+    }, json_dumps_params={"ensure_ascii": False})
+
+@login_required(login_url="/login/")
+@require_http_methods(["POST"])
+def activate_generation_run_api(request, pk: int):
+    """
+    สลับตารางที่ใช้งานไปเป็นผลของ run นี้ (ไม่รัน GA ใหม่)
+    body {"alternative": n} = ใช้ตารางทางเลือกอันดับ n ของ run (0/ไม่ส่ง = ผลหลัก)
+    """
+    from .main import activate_generation_run
+
+    run = GenerationRun.objects.filter(pk=pk, created_by=request.user).first()
+    if run is None:
+        return JsonResponse({"status": "error", "message": "ไม่พบการรันนี้"}, status=404,
+                            json_dumps_params={"ensure_ascii": False})
+    try:
+        payload = json.loads(request.body or "{}")
+    except ValueError:
+        payload = {}
+    alternative = max(0, to_int(payload.get("alternative"), 0))
+    if alternative and not run.alternatives.filter(rank=alternative).exists():
+        return JsonResponse({"status": "error", "message": "ไม่พบตารางทางเลือกนี้"}, status=404,
+                            json_dumps_params={"ensure_ascii": False})
+    # กันสลับซ้อนกับงาน solve ของ user นี้ที่กำลังเขียน GeneratedSchedule อยู่
+    if user_has_running_job(request.user):
+        return JsonResponse({"status": "busy", "message": "already running"}, status=409)
+    try:
+        persisted = activate_generation_run(run, alternative=alternative)
+    except Exception as e:
+        logger.exception(f"[{request.user}] activate run {pk} error")
+        return JsonResponse({"status": "error", "message": str(e)}, status=500,
+                            json_dumps_params={"ensure_ascii": False})
+    return JsonResponse({"status": "success", "run_id": run.id, "alternative": alternative, "persisted": persisted},
+                        json_dumps_params={"ensure_ascii": False})
+
+@login_required(login_url="/login/")
+@require_http_methods(["GET"])
+def generation_run_alternatives(request, pk: int):
+    """ตารางทางเลือก (hall of fame) ของการรันหนึ่งครั้ง: rank 0 = ผลหลัก"""
+    run = (GenerationRun.objects.filter(pk=pk, created_by=request.user)
+           .only("id", "best_fitness", "hard_violations", "unassigned", "total_entries",
+                 "genome_fingerprint", "is_active", "active_alternative").first())
+    if run is None:
+        return JsonResponse({"status": "error", "message": "ไม่พบการรันนี้"}, status=404,
+                            json_dumps_params={"ensure_ascii": False})
+    results = [{
+        "rank": 0, "fitness": run.best_fitness, "hard_violations": run.hard_violations,
+        "unassigned": run.unassigned, "total_entries": run.total_entries,
+        "genome_fingerprint": run.genome_fingerprint,
+    }]
+    results += list(run.alternatives.values("rank", "fitness", "hard_violations", "unassigned",
+                                            "total_entries", "genome_fingerprint"))
+    for r in results:
+        r["is_active"] = run.is_active and r["rank"] == run.active_alternative
+    return JsonResponse({"status": "success", "run_id": run.id, "results": results},
+                        json_dumps_params={"ensure_ascii": False})
+
+@login_required(login_url="/login/")
+@require_http_methods(["GET", "POST"])
+def constraint_profile_api(request):
+    """
+    GET  = น้ำหนัก/สวิตช์ fitness ของ user
+    POST = แก้เฉพาะ key ที่ส่งมา เช่น {"contiguity_enabled": false, "room_type_penalty": 200}
+           {"reset": true} = กลับไปใช้ค่าเริ่มต้น
+    """
+    from .main import DEFAULT_CONSTRAINTS, load_constraint_profile
+
+    if request.method == "POST":
+        try:
+            payload = json.loads(request.body or "{}")
+        except ValueError:
+            return HttpResponseBadRequest("invalid JSON")
+        if not isinstance(payload, dict):
+            return JsonResponse({"status": "error", "message": "body ต้องเป็น JSON object"}, status=400,
+                                json_dumps_params={"ensure_ascii": False})
+        reset = payload.pop("reset", False)
+        unknown = sorted(set(payload) - set(DEFAULT_CONSTRAINTS))
+        if unknown:
+            return JsonResponse({"status": "error", "message": f"ไม่รู้จัก key: {', '.join(unknown)}"}, status=400,
+                                json_dumps_params={"ensure_ascii": False})
+        updates = {}
+        for k, v in payload.items():
+            if isinstance(DEFAULT_CONSTRAINTS[k], bool):
+                if not isinstance(v, bool):
+                    return JsonResponse({"status": "error", "message": f"{k} ต้องเป็น true/false"}, status=400,
+                                        json_dumps_params={"ensure_ascii": False})
+                updates[k] = v
+            else:
+                n = to_int(v, None)
+                if n is None:
+                    return JsonResponse({"status": "error", "message": f"{k} ต้องเป็นจำนวนเต็ม"}, status=400,
+                                        json_dumps_params={"ensure_ascii": False})
+                updates[k] = n
+        # ตรวจครบแล้วค่อยเขียน: reset + ค่าใหม่ใน transaction เดียว (ผิดกลางทางไม่เหลือโปรไฟล์ที่ถูกลบครึ่ง ๆ)
+        with transaction.atomic():
+            if reset:
+                ConstraintProfile.objects.filter(created_by=request.user).delete()
+            if updates:
+                ConstraintProfile.objects.update_or_create(created_by=request.user, defaults=updates)
+    return JsonResponse({"status": "success", "constraints": load_constraint_profile(request.user)},
+                        json_dumps_params={"ensure_ascii": False})
 
 @login_required(login_url="/login/")
 @require_http_methods(["POST"])
@@ -3018,6 +3279,7 @@ def meta_stop_times(request):
 # ---------------- lookups (filter by user) ----------------
 @login_required(login_url="/login/")
 @require_GET
+@versioned("lookups")
 def teachers_lookup(request):
     q = (request.GET.get("q") or "").strip()
     qs = Teacher.objects.filter(created_by=request.user)
@@ -3029,6 +3291,7 @@ def teachers_lookup(request):
 
 @login_required(login_url="/login/")
 @require_GET
+@versioned("lookups")
 def room_types_lookup(request):
     q = (request.GET.get("q") or "").strip()
     qs = RoomType.objects.filter(created_by=request.user)
@@ -3040,6 +3303,7 @@ def room_types_lookup(request):
 
 @login_required(login_url="/login/")
 @require_GET
+@versioned("lookups")
 def student_groups_lookup(request):
     q = (request.GET.get("q") or "").strip()
     qs = StudentGroup.objects.filter(created_by=request.user).select_related("group_type")
@@ -3053,6 +3317,7 @@ def student_groups_lookup(request):
 # ---------------- list/view entities (GA/Pre/Activity) ----------------
 @login_required(login_url="/login/")
 @require_http_methods(["GET"])
+@versioned("timetable")
 def list_generated_entities_api(request):
     view = (request.GET.get("view") or "teacher").lower().strip()
     field_map = {"teacher":"teacher","room":"room",
@@ -3070,6 +3335,7 @@ def list_generated_entities_api(request):
 
 @login_required(login_url="/login/")
 @require_http_methods(["GET"])
+@versioned("timetable")
 def schedule_detail_api(request):
     """
     ?view=teacher|room|student_group  & key=<ชื่อ>
@@ -3148,6 +3414,7 @@ def _fmt(t):
     return t.strftime("%H:%M") if t else ""
 
 @require_GET
+@versioned("timetable")
 def timetable_by_entity(request):
     view = (request.GET.get("view") or "teacher").lower().strip()
     key  = (request.GET.get("key")  or "").strip()
@@ -3163,9 +3430,10 @@ def timetable_by_entity(request):
     )
 
 def _lookup_section_for_ga(g):
-    """พยายามหา section จาก CourseSchedule เมื่อ GeneratedSchedule.section ว่าง"""
+    """พยายามหา section จาก CourseSchedule (ของเจ้าของแถวเท่านั้น) เมื่อ GeneratedSchedule.section ว่าง"""
     from .models import CourseSchedule
-    qs = CourseSchedule.objects.filter(subject_code_course=g.subject_code)
+    # กรอง created_by เสมอ: view นี้ครอบด้วย @versioned("timetable") — ข้อมูลของ user อื่นไม่เพิ่มตัวนับของ user นี้
+    qs = CourseSchedule.objects.filter(created_by_id=g.created_by_id, subject_code_course=g.subject_code)
 
     if g.teacher:
         qs = qs.filter(teacher_name_course=g.teacher)
@@ -3178,7 +3446,7 @@ def _lookup_section_for_ga(g):
         return one.section_course or ""
 
     # สำรอง: ถ้า filter ข้างบนไม่เหลืออันเดียว ลองใช้ตัวกรองที่อ่อนลง
-    alt = CourseSchedule.objects.filter(subject_code_course=g.subject_code).first()
+    alt = CourseSchedule.objects.filter(created_by_id=g.created_by_id, subject_code_course=g.subject_code).first()
     return (alt.section_course if alt else "") or ""
 
 def _collect_timetable_items(view: str, key: str, user):